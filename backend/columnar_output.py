@@ -0,0 +1,121 @@
+"""
+COLUMNAR OUTPUT - COMPACT BINARY RESULTS FOR BATCH AND SERVER MODES
+
+Instead of serializing the nested response dicts through NumpyEncoder, the
+calibrated results are flattened into one float64 column per market
+(one row per fixture) and emitted as:
+- npy:     a NumPy structured array (one field per column)
+- msgpack: {'format', 'rows', 'columns': {name: little-endian float64 bytes}}
+- arrow:   an Arrow IPC stream holding one record batch
+The Node side can wrap each column as a Float64Array without any JSON parsing.
+JSON (the nested response) remains the default output format.
+"""
+
+import io
+import numpy as np
+from typing import Dict, List
+from monte_carlo.calibrated_simulation_engine import ValueBetDetector
+
+OUTPUT_FORMATS = ('json', 'npy', 'msgpack', 'arrow')
+
+# Groups renamed by ValueBetDetector.market_probabilities ('1x2_home', 'goals_over_2_5',
+# 'btts_yes'); every other probability group is exported as '<group>_<market>' columns
+FLATTENED_GROUPS = ('match_outcomes', 'goal_markets', 'btts')
+
+# Per-fixture scalars exported alongside the market probabilities
+SUMMARY_FIELDS = ('avg_home_goals', 'avg_away_goals', 'calibration_factor', 'confidence_score', 'rps_score')
+
+
+def fixture_columns(simulation_results: Dict) -> Dict[str, float]:
+    """One fixture's row: every market probability and the summary scalars"""
+    probabilities = simulation_results['probabilities']
+    row = dict(ValueBetDetector.market_probabilities(probabilities))
+    for group, markets in probabilities.items():
+        if group not in FLATTENED_GROUPS:
+            for market, prob in markets.items():
+                row[f"{group}_{market}"] = prob
+    for field in SUMMARY_FIELDS:
+        row[field] = simulation_results[field]
+    return row
+
+
+def columnar_results(response: Dict) -> Dict[str, np.ndarray]:
+    """
+    Flatten a calibrated single or batch response into float64 columns.
+    Value bets add 'edge_pct.<market>' / 'stake_pct.<market>' columns (NaN where no bet).
+    """
+    if not response.get('success'):
+        raise ValueError('Only successful responses have a columnar form')
+    if not response.get('calibration_optimized'):
+        raise ValueError('Columnar output is only available for the calibrated engine')
+
+    fixtures = response['results'] if response.get('batch') else [response]
+    rows: List[Dict[str, float]] = []
+    for index, fixture in enumerate(fixtures):
+        row = {'fixture_index': index}  # Position in the request's fixture list
+        row.update(fixture_columns(fixture['results']))
+        for opportunity in fixture['value_opportunities']:
+            row[f"edge_pct.{opportunity['market']}"] = opportunity['edge_percentage']
+            row[f"stake_pct.{opportunity['market']}"] = opportunity['recommended_stake_percent']
+        rows.append(row)
+
+    names = list(dict.fromkeys(name for row in rows for name in row))
+    return {
+        name: np.array([row.get(name, np.nan) for row in rows], dtype=np.float64)
+        for name in names
+    }
+
+
+def encode_npy(columns: Dict[str, np.ndarray]) -> bytes:
+    """Structured array with one float64 field per column"""
+    rows = len(next(iter(columns.values()))) if columns else 0
+    table = np.empty(rows, dtype=[(name, '<f8') for name in columns])
+    for name, values in columns.items():
+        table[name] = values
+    buffer = io.BytesIO()
+    np.save(buffer, table, allow_pickle=False)
+    return buffer.getvalue()
+
+
+def encode_msgpack(columns: Dict[str, np.ndarray]) -> bytes:
+    """MessagePack frame with each column as raw little-endian float64 bytes"""
+    try:
+        import msgpack
+    except ImportError:
+        raise ImportError("output_format 'msgpack' requires the msgpack package (pip install msgpack)")
+
+    return msgpack.packb({
+        'format': 'columnar',
+        'dtype': 'float64',
+        'rows': len(next(iter(columns.values()))) if columns else 0,
+        'columns': {name: values.astype('<f8').tobytes() for name, values in columns.items()}
+    }, use_bin_type=True)
+
+
+def encode_arrow(columns: Dict[str, np.ndarray]) -> bytes:
+    """Arrow IPC stream holding one record batch"""
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise ImportError("output_format 'arrow' requires the pyarrow package (pip install pyarrow)")
+
+    batch = pa.RecordBatch.from_arrays([pa.array(values) for values in columns.values()],
+                                       names=list(columns))
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+    return sink.getvalue().to_pybytes()
+
+
+ENCODERS = {
+    'npy': encode_npy,
+    'msgpack': encode_msgpack,
+    'arrow': encode_arrow
+}
+
+
+def encode_response(response: Dict, output_format: str) -> bytes:
+    """Encode a response in one of the binary columnar formats"""
+    if output_format not in ENCODERS:
+        raise ValueError(f"Unknown output_format '{output_format}'. Must be one of: {', '.join(OUTPUT_FORMATS)}")
+    return ENCODERS[output_format](columnar_results(response))
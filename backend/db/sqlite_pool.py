@@ -0,0 +1,107 @@
+"""
+SQLITE POOL - SHARED, WAL-TUNED DATABASE ACCESS FOR THE BACKEND
+
+The Next.js API and the Python workers hit database/exodia.db concurrently.
+Every connection opened here gets the same tuned pragmas (WAL, relaxed fsync,
+large page cache, mmap, in-memory temp tables, busy timeout), and pooled
+connections stay open so their prepared-statement caches stay warm:
+- get_pool(db_path) returns the process-wide pool for a database file
+- pool.connection() lends a connection; use 'with conn:' for a transaction
+- connect(db_path) opens a single tuned connection (one-off scripts)
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+# Applied to every connection, in order (journal_mode is persistent in the file)
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',      # Safe with WAL; fsync on checkpoint instead of every commit
+    'cache_size': -65536,         # 64 MB page cache (negative = KiB)
+    'mmap_size': 268435456,       # Map up to 256 MB of the file
+    'temp_store': 'MEMORY',
+    'busy_timeout': 5000          # Wait up to 5 s on a locked database instead of failing
+}
+STATEMENT_CACHE_SIZE = 256  # Prepared statements kept per connection
+DEFAULT_POOL_SIZE = 8
+
+
+def connect(db_path: str, pragmas: Optional[Dict] = None) -> sqlite3.Connection:
+    """Open one connection with the tuned pragmas (usable from any thread)"""
+    conn = sqlite3.connect(
+        db_path,
+        timeout=DEFAULT_PRAGMAS['busy_timeout'] / 1000,
+        check_same_thread=False,
+        cached_statements=STATEMENT_CACHE_SIZE
+    )
+    for name, value in (pragmas or DEFAULT_PRAGMAS).items():
+        conn.execute(f"PRAGMA {name} = {value}")
+    return conn
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of tuned connections to one database file.
+
+    Borrowing never blocks: when every pooled connection is in use an extra one
+    is opened, and connections returned to a full pool are closed. A connection
+    is always handed back with no open transaction.
+    """
+
+    def __init__(self, db_path: str, max_size: int = DEFAULT_POOL_SIZE,
+                 pragmas: Optional[Dict] = None):
+        self.db_path = db_path
+        self.max_size = max_size
+        self.pragmas = pragmas
+        self._idle = queue.LifoQueue(maxsize=max_size)  # LIFO keeps the warmest connection in use
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a connection for the duration of a with-block"""
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = connect(self.db_path, self.pragmas)
+
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            try:
+                self._idle.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+    def close(self):
+        """Close all idle connections (the pool stays usable and reopens on demand)"""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path: str) -> ConnectionPool:
+    """Process-wide pool for a database file (one per absolute path)"""
+    key = os.path.abspath(db_path)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(db_path)
+        return pool
+
+
+def close_pools():
+    """Close the idle connections of every pool (worker shutdown)"""
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
@@ -0,0 +1,107 @@
+"""
+DIAGNOSTICS - OPT-IN RING BUFFER OF RECENT REQUESTS
+
+Replaces the debug_value_detection.txt rewrite on every priced fixture.
+Recording is an in-memory append to a bounded deque (no disk I/O on the hot
+path, no clobbering between workers); nothing is kept unless a capacity is
+configured (--diagnostics N or EXODIA_DIAGNOSTICS=N). The buffer is read on
+demand through the worker's 'diagnostics' command or written out as JSON
+lines by a background thread ('dump_diagnostics'). Dumps only ever land in
+the diagnostics directory (--diagnostics-dir or EXODIA_DIAGNOSTICS_DIR,
+default backend/); a requested name that is absolute or climbs out of it is
+rejected.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+DEFAULT_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DUMP_NAME = 'diagnostics.jsonl'
+
+
+class DiagnosticsRing:
+    """Thread-safe ring buffer keeping the last 'capacity' diagnostic entries"""
+
+    def __init__(self, capacity: int = 0, directory: str = DEFAULT_DIRECTORY):
+        self._lock = threading.Lock()
+        self.directory = directory
+        self.configure(capacity)
+
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 0
+
+    def configure(self, capacity: int):
+        """(Re)size the buffer; 0 disables recording and drops what was kept"""
+        with self._lock:
+            self.capacity = max(int(capacity), 0)
+            self._entries = deque(maxlen=self.capacity or None)
+            self.recorded = 0
+
+    def record(self, kind: str, **fields: Any):
+        """Keep one entry (a no-op when disabled); the oldest entry is evicted when full"""
+        if not self.enabled:
+            return
+        entry = {'time': time.time(), 'kind': kind, **fields}
+        with self._lock:
+            self._entries.append(entry)
+            self.recorded += 1
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Copy of the buffered entries, oldest first"""
+        with self._lock:
+            return list(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'enabled': self.enabled,
+            'capacity': self.capacity,
+            'size': len(self._entries),
+            'recorded': self.recorded
+        }
+
+    def dump_path(self, name: Optional[str] = None) -> str:
+        """Resolve a dump file name inside the diagnostics directory; ValueError if it would escape"""
+        name = name or DEFAULT_DUMP_NAME
+        if os.path.isabs(name) or '..' in name.replace('\\', '/').split('/'):
+            raise ValueError(f'Diagnostics dump name must be relative to the diagnostics directory: {name!r}')
+        directory = os.path.realpath(self.directory)
+        path = os.path.realpath(os.path.join(directory, name))
+        if os.path.commonpath([directory, path]) != directory or path == directory:
+            raise ValueError(f'Diagnostics dump name must be relative to the diagnostics directory: {name!r}')
+        return path
+
+    def dump(self, path: str) -> int:
+        """Write the buffered entries to path as JSON lines; returns the entry count"""
+        entries = self.snapshot()
+        self._write(path, entries)
+        return len(entries)
+
+    def dump_async(self, path: str) -> threading.Thread:
+        """dump() on a background thread so the caller never waits on the disk"""
+        entries = self.snapshot()
+        thread = threading.Thread(target=self._write, args=(path, entries), daemon=True)
+        thread.start()
+        return thread
+
+    @staticmethod
+    def _write(path: str, entries: List[Dict[str, Any]]):
+        with open(path, 'w') as f:
+            for entry in entries:
+                f.write(json.dumps(entry, default=str) + '\n')
+
+
+def capacity_from_env(default: int = 0) -> int:
+    """Ring size requested through EXODIA_DIAGNOSTICS (0 = off)"""
+    try:
+        return int(os.environ.get('EXODIA_DIAGNOSTICS', default))
+    except ValueError:
+        return default
+
+
+# Process-wide sink used by the runner (disabled unless configured)
+diagnostics = DiagnosticsRing(capacity_from_env(), os.environ.get('EXODIA_DIAGNOSTICS_DIR') or DEFAULT_DIRECTORY)
@@ -0,0 +1,82 @@
+"""
+IMPORT PROFILE - PER-MODULE IMPORT TIMING FOR THE RUNNER'S COLD START
+
+Enabled with simulation_runner.py --import-profile. Wraps builtins.__import__
+from the top of the runner until the report, recording for every module
+loaded for the first time its cumulative time (including the modules it
+pulls in) and its self time. Lazy imports made while serving the request
+(e.g. the legacy engine) are included. Like python -X importtime, but
+aggregated and printed as one sorted report on stderr.
+"""
+
+import builtins
+import sys
+import time
+from typing import Dict, List, Tuple
+
+
+class ImportProfiler:
+    """Times first-time imports while installed"""
+
+    def __init__(self):
+        self.cumulative: Dict[str, float] = {}
+        self.self_time: Dict[str, float] = {}
+        self._stack: List[float] = []  # Child time accumulated per open import
+        self._original_import = None
+        self._started = None
+
+    @classmethod
+    def start_if(cls, enabled: bool) -> 'ImportProfiler':
+        profiler = cls()
+        if enabled:
+            profiler.start()
+        return profiler
+
+    @property
+    def active(self) -> bool:
+        return self._original_import is not None
+
+    def start(self):
+        self._original_import = builtins.__import__
+        self._started = time.perf_counter()
+        builtins.__import__ = self._import
+
+    def stop(self):
+        if self.active:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        original = self._original_import
+        if level or name in sys.modules:
+            return original(name, globals, locals, fromlist, level)
+
+        self._stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            return original(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - start
+            children = self._stack.pop()
+            if self._stack:
+                self._stack[-1] += elapsed
+            self.cumulative[name] = self.cumulative.get(name, 0.0) + elapsed
+            self.self_time[name] = self.self_time.get(name, 0.0) + elapsed - children
+
+    def top(self, limit: int = 25) -> List[Tuple[str, float, float]]:
+        """(module, cumulative ms, self ms), slowest first"""
+        ranked = sorted(self.cumulative.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return [(name, total * 1000, self.self_time[name] * 1000) for name, total in ranked]
+
+    def report(self, stream=None, limit: int = 25):
+        """Stop profiling and print the slowest imports and the total to stderr"""
+        self.stop()
+        stream = stream or sys.stderr
+        total = sum(self.self_time.values())  # Self times partition the time spent importing
+        print(f"[IMPORT_PROFILE] {len(self.cumulative)} modules imported", file=stream)
+        print(f"{'cumulative ms':>14} {'self ms':>9}  module", file=stream)
+        for name, total_ms, self_ms in self.top(limit):
+            print(f"{total_ms:14.1f} {self_ms:9.1f}  {name}", file=stream)
+        if self._started is not None:
+            print(f"[IMPORT_PROFILE] import time {total * 1000:.1f} ms "
+                  f"(process time since start {(time.perf_counter() - self._started) * 1000:.1f} ms)", file=stream)
@@ -1,21 +1,27 @@
 #!/usr/bin/env python3
 """
 Initialize the SQLite database with the schema
+
+    python init_db.py            create a fresh database from schema.sql
+    python init_db.py --migrate  bring an existing database up to date: applies
+                                 init_full_schema.sql (CREATE ... IF NOT EXISTS
+                                 only), which adds missing tables and indexes
 """
 
-import sqlite3
 import os
+import sys
+from db.sqlite_pool import connect
 
-def init_database():
+def init_database(migrate=False):
     # Database path
     db_path = "../database/exodia.db"
-    schema_path = "../database/schema.sql"
+    schema_path = "../database/init_full_schema.sql" if migrate else "../database/schema.sql"
     
     # Create database directory if it doesn't exist
     os.makedirs(os.path.dirname(db_path), exist_ok=True)
     
-    # Connect to database
-    conn = sqlite3.connect(db_path)
+    # Connect to database (WAL and tuned pragmas, same as the engines)
+    conn = connect(db_path)
     
     try:
         # Read and execute schema
@@ -24,8 +30,8 @@ def init_database():
             conn.executescript(schema_sql)
         
         conn.commit()
-        print("Database initialized successfully!")
-        print(f"Database created at: {os.path.abspath(db_path)}")
+        print("Database migrated successfully!" if migrate else "Database initialized successfully!")
+        print(f"Database {'updated' if migrate else 'created'} at: {os.path.abspath(db_path)}")
         
     except Exception as e:
         print(f"Error initializing database: {e}")
@@ -34,4 +40,4 @@ def init_database():
         conn.close()
 
 if __name__ == "__main__":
-    init_database()
\ No newline at end of file
+    init_database(migrate="--migrate" in sys.argv[1:])
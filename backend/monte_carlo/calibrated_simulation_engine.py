@@ -15,9 +15,34 @@ Performance improvements over accuracy-focused models:
 
 import numpy as np
 import json
+import logging
+import os
 import time
-from scipy import stats
+from functools import lru_cache
 from typing import Dict, Any, List, Tuple, Optional
+from .random_streams import resolve_seed, make_generator, spawn_seed_sequences
+from .stage_profile import stage, staged
+from .markets import market_registry
+from .market_ids import GOAL_LINES, market_ids
+from .score_matrix import (
+    MAX_GOALS, HALF_MAX_GOALS, FIRST_HALF_SHARE, default_cache, poisson_pmf, score_matrix,
+    outcome_probabilities, total_goals_distribution, over_probability, both_teams_score_probability,
+    expected_goals, half_joint, split_half_joint, histogram_codes, score_histogram
+)
+
+logger = logging.getLogger(__name__)
+
+HALF_HISTOGRAM_SIZE = HALF_MAX_GOALS + 1  # Bins per team per half in the joint half histogram
+HT_FT_OUTCOMES = ('home', 'draw', 'away')
+
+VARIANCE_REDUCTION_METHODS = ('conditional', 'antithetic', 'control_variate')
+
+# Market outcome keys (as produced by market_indicators) whose effective sample size the estimators report
+CONTRIBUTION_MARKETS = (
+    'home_wins', 'draws', 'away_wins', 'over_15', 'over_25', 'over_35', 'over_45',
+    'both_score', 'first_half_over_05', 'first_half_over_15'
+)
+
 
 class CalibratedMonteCarloEngine:
     """
@@ -37,96 +62,735 @@ class CalibratedMonteCarloEngine:
             'iteration_weight': 0.3,     # Higher iterations = higher confidence
             'conservative_max': 0.95,    # Maximum confidence cap
             'minimum_iterations': 1000,  # Professional minimum
-            'optimal_iterations': 100000 # Research-validated optimal
+            'optimal_iterations': 100000, # Research-validated optimal
+            'batch_block_elements': 2000000, # Max draws per array in batch mode (memory bound)
+            'chunk_size': 1000000,       # Iterations drawn per block (keeps peak memory flat)
+            'min_iterations_per_worker': 250000,  # Below this, process start-up outweighs parallelism
+            'adaptive_batch_size': 25000,  # Minimum iterations added per convergence check
+            'bit_generator': 'pcg64'     # 'pcg64' or 'philox' (see random_streams)
         }
         
+        # Quantized score-matrix cache used by exact pricing (shared process-wide)
+        self.score_cache = default_cache
+        
+        # Process pool for parallel runs, created on first use and reused across runs
+        self._executor = None
+        self._executor_workers = 0
+        
     def run_calibrated_simulation(self, 
                                 home_lambda: float, 
                                 away_lambda: float, 
                                 iterations: int = 100000,
-                                match_context: Optional[Dict] = None) -> Dict[str, Any]:
+                                match_context: Optional[Dict] = None,
+                                seed: Optional[int] = None,
+                                workers: int = 1) -> Dict[str, Any]:
         """
         Run calibration-optimized Monte Carlo simulation.
         
         RESEARCH FINDING: Calibration-optimized approach returns 69.86% better results
         than accuracy-optimized models (+34.69% vs -35.17% ROI)
+        
+        The run draws from its own Generator; the seed used (given or fresh) is
+        echoed in metadata['seed'] so the run can be replayed exactly.
+        With workers > 1 the iterations are split across a process pool, each
+        worker drawing from its own SeedSequence child (replay needs the same
+        seed and worker count).
         """
         
         start_time = time.time()
         
         # Validate professional parameters
         if iterations < self.calibration_config['minimum_iterations']:
-            print(f"⚠️ Iterations ({iterations}) below professional minimum ({self.calibration_config['minimum_iterations']})")
+            logger.warning("Iterations (%d) below professional minimum (%d)",
+                           iterations, self.calibration_config['minimum_iterations'])
             iterations = self.calibration_config['minimum_iterations']
         
-        print(f"[SIMULATION] Running calibrated simulation: {iterations:,} iterations")
-        print(f"   Home lambda: {home_lambda:.3f}, Away lambda: {away_lambda:.3f}")
+        logger.info("[SIMULATION] Running calibrated simulation: %d iterations (home lambda %.3f, away lambda %.3f)",
+                    iterations, home_lambda, away_lambda)
+        
+        # Independent, replayable random stream for this run
+        seed = resolve_seed(seed)
+        workers = self.effective_workers(workers, iterations)
+        
+        worker_stats = None
+        if workers > 1:
+            counts, worker_stats = self.simulate_outcome_counts_parallel(
+                seed, home_lambda, away_lambda, iterations, workers
+            )
+        else:
+            rng = make_generator(seed, self.calibration_config['bit_generator'])
+            
+            # RESEARCH-BASED: Enhanced random generation for better calibration
+            # Chunked Poisson generation: running counters, flat memory at any iteration count
+            counts = self.simulate_outcome_counts(rng, home_lambda, away_lambda, iterations)
+        
+        probabilities, avg_home_goals, avg_away_goals = self.probabilities_from_histograms(counts, iterations)
+        results = self.build_results(
+            probabilities, avg_home_goals, avg_away_goals,
+            iterations, home_lambda, away_lambda, match_context, time.time() - start_time
+        )
+        self.record_seed(results, seed)
+        results['metadata']['workers'] = workers
+        if worker_stats is not None:
+            results['metadata']['worker_stats'] = worker_stats
+        
+        return results
+    
+    def run_adaptive_simulation(self,
+                                home_lambda: float,
+                                away_lambda: float,
+                                target_precision: float = 0.0025,
+                                max_iterations: int = 1000000,
+                                match_context: Optional[Dict] = None,
+                                seed: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Simulate in batches until every market probability is precise enough.
+        
+        After each batch the binomial standard error sqrt(p(1-p)/n) of every
+        market is checked; the run stops once all are <= target_precision
+        (e.g. 0.0025 = 0.25pp) or max_iterations is reached. The next batch is
+        sized from the worst market's current p(1-p), so lopsided fixtures stop
+        far below the fixed optimal_iterations budget.
+        """
+        
+        start_time = time.time()
+        
+        seed = resolve_seed(seed)
+        rng = make_generator(seed, self.calibration_config['bit_generator'])
+        max_iterations = max(max_iterations, self.calibration_config['minimum_iterations'])
+        batch_size = self.calibration_config['adaptive_batch_size']
+        
+        logger.info("[SIMULATION] Running adaptive simulation: target SE %.4f, cap %d", target_precision, max_iterations)
+        
+        counts = {}
+        iterations = 0
+        next_batch = min(max(batch_size, self.calibration_config['minimum_iterations']), max_iterations)
+        while True:
+            batch_counts = self.simulate_outcome_counts(rng, home_lambda, away_lambda, next_batch)
+            for key, value in batch_counts.items():
+                counts[key] = counts.get(key, 0) + value
+            iterations += next_batch
+            
+            probabilities, avg_home_goals, avg_away_goals = self.probabilities_from_histograms(counts, iterations)
+            standard_errors = self.standard_errors(probabilities, iterations)
+            worst_error = max(se for market in standard_errors.values() for se in market.values())
+            
+            if worst_error <= target_precision:
+                stopping_reason = 'converged'
+                break
+            if iterations >= max_iterations:
+                stopping_reason = 'max_iterations'
+                break
+            
+            # Iterations needed for the worst market: n = p(1-p) / tol^2 = n_now * (se / tol)^2
+            needed = int(np.ceil(iterations * (worst_error / target_precision) ** 2))
+            next_batch = min(max(batch_size, needed - iterations), max_iterations - iterations)
+        
+        results = self.build_results(
+            probabilities, avg_home_goals, avg_away_goals,
+            iterations, home_lambda, away_lambda, match_context, time.time() - start_time
+        )
+        self.record_seed(results, seed)
+        results['metadata'].update({
+            'pricing_mode': 'adaptive',
+            'stopping_reason': stopping_reason,
+            'target_precision': target_precision,
+            'max_iterations': max_iterations,
+            'max_standard_error': worst_error,
+            'standard_errors': standard_errors
+        })
+        
+        return results
+    
+    @staticmethod
+    def standard_errors(probabilities: Dict[str, Dict[str, float]], iterations: int) -> Dict[str, Dict[str, float]]:
+        """Binomial standard error sqrt(p(1-p)/n) for every market probability"""
+        return {
+            group: {market: float(np.sqrt(prob * (1 - prob) / iterations)) for market, prob in markets.items()}
+            for group, markets in probabilities.items()
+        }
+    
+    def run_variance_reduced_simulation(self,
+                                        home_lambda: float,
+                                        away_lambda: float,
+                                        iterations: int = 100000,
+                                        method: str = 'conditional',
+                                        match_context: Optional[Dict] = None,
+                                        seed: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Monte Carlo with a variance-reduction estimator instead of raw indicator counts.
+        
+        Every method samples the same coupled half model as the standard run and
+        estimates the joint half histogram, so all markets are priced from it:
+        - 'conditional': sample the home side's half goals only and weight each draw
+          by the exact away half distribution (Rao-Blackwellised; strongest reduction)
+        - 'antithetic': inverse-CDF half goals in (u, 1-u) pairs
+        - 'control_variate': raw draws regressed, cell by cell, on the half goal
+          counts, whose Poisson means are known exactly
+        
+        metadata reports the effective sample size (iterations a plain run would
+        need for the same standard error) of the CONTRIBUTION_MARKETS and the
+        smallest one.
+        """
+        
+        if method not in VARIANCE_REDUCTION_METHODS:
+            raise ValueError(f"Variance reduction must be one of: {', '.join(VARIANCE_REDUCTION_METHODS)}")
+        
+        start_time = time.time()
+        iterations = max(iterations, self.calibration_config['minimum_iterations'])
+        seed = resolve_seed(seed)
+        rng = make_generator(seed, self.calibration_config['bit_generator'])
+        chunk_size = self.calibration_config['chunk_size']
+        
+        logger.info("[SIMULATION] Running %s variance-reduced simulation: %d iterations", method, iterations)
+        
+        # Summed per-unit joint half histograms (units are pairs for antithetic), control
+        # cross-sums per cell, and running moments of the tracked markets' contributions
+        joint = 0.0
+        joint_cross = 0.0
+        sums = {}
+        units = 0
+        for start in range(0, iterations, chunk_size):
+            n = min(chunk_size, iterations - start)
+            with stage('rng_draw'):  # Draws plus their per-unit histograms and contributions
+                if method == 'conditional':
+                    estimate = self._conditional_contributions(rng, home_lambda, away_lambda, n)
+                elif method == 'antithetic':
+                    estimate = self._antithetic_contributions(rng, home_lambda, away_lambda, n)
+                else:
+                    estimate = self._control_variate_contributions(rng, home_lambda, away_lambda, n)
+            
+            units += estimate['units']
+            with stage('reduction'):
+                joint = joint + estimate['joint']
+                if 'joint_cross' in estimate:
+                    joint_cross = joint_cross + estimate['joint_cross']
+                self._accumulate_moments(sums, estimate['contributions'])
+        
+        if method == 'control_variate':
+            means, unit_variances = self._control_variate_estimates(sums, units)
+            halves = self._control_variate_histogram(joint, joint_cross, sums['_controls'], units)
+        else:
+            means = {key: sums[key]['sum'] / units for key in sums}
+            unit_variances = {key: max(sums[key]['sumsq'] / units - means[key] ** 2, 0.0) for key in sums}
+            halves = joint / units
+        
+        draws_per_unit = iterations / units
+        effective_sample_size = {}
+        for key in CONTRIBUTION_MARKETS:
+            p = min(max(means[key], 0.0), 1.0)
+            estimator_variance = unit_variances[key] / units
+            if estimator_variance > 0:
+                effective_sample_size[key] = int(p * (1 - p) / estimator_variance)
+            else:
+                effective_sample_size[key] = None  # Market priced exactly (zero variance)
+        
+        # The estimated histogram is a per-iteration distribution, i.e. counts over a single iteration
+        probabilities, avg_home_goals, avg_away_goals = self.probabilities_from_histograms({'halves': halves}, 1)
+        
+        results = self.build_results(
+            probabilities, avg_home_goals, avg_away_goals,
+            iterations, home_lambda, away_lambda, match_context, time.time() - start_time
+        )
+        self.record_seed(results, seed)
+        finite_ess = [ess for ess in effective_sample_size.values() if ess is not None]
+        min_ess = min(finite_ess) if finite_ess else None
+        results['metadata'].update({
+            'variance_reduction': method,
+            'effective_sample_size': effective_sample_size,
+            'min_effective_sample_size': min_ess,
+            'variance_reduction_factor': round(min_ess / iterations, 2) if min_ess else None,
+            'draws_per_unit': draws_per_unit
+        })
+        
+        return results
+    
+    @staticmethod
+    def _accumulate_moments(sums: Dict[str, Dict[str, Any]], contributions: Dict[str, np.ndarray]):
+        """Add sum and sum of squares of each contribution array (plus control cross-sums)"""
+        controls = contributions.get('_controls')
+        for key, values in contributions.items():
+            if key == '_controls':
+                continue
+            entry = sums.setdefault(key, {'sum': 0.0, 'sumsq': 0.0, 'cross': 0.0})
+            values = values.astype(np.float64)
+            entry['sum'] += values.sum()
+            entry['sumsq'] += values @ values
+            if controls is not None:
+                entry['cross'] = entry['cross'] + controls.T @ values
+        if controls is not None:
+            entry = sums.setdefault('_controls', {'sum': 0.0, 'gram': 0.0})
+            entry['sum'] = entry['sum'] + controls.sum(axis=0)
+            entry['gram'] = entry['gram'] + controls.T @ controls
+    
+    @staticmethod
+    def _conditional_contributions(rng: np.random.Generator, home_lambda: float, away_lambda: float,
+                                   n: int) -> Dict[str, Any]:
+        """
+        Conditional Monte Carlo: draw the home first/second-half goals only. Given them the
+        away half goals are independent Poisson, so each draw adds its home cell times the
+        exact away half distribution to the histogram, and each tracked market its exact
+        probability given the home goals.
+        """
+        size = HALF_HISTOGRAM_SIZE
+        second_half_share = 1.0 - FIRST_HALF_SHARE
+        home_codes = histogram_codes(
+            rng.poisson(home_lambda * FIRST_HALF_SHARE, n), rng.poisson(home_lambda * second_half_share, n), size=size
+        )
+        home = np.bincount(home_codes, minlength=size * size).reshape(size, size)  # [h1, h2]
+        away = np.outer(poisson_pmf(away_lambda * FIRST_HALF_SHARE, HALF_MAX_GOALS),
+                        poisson_pmf(away_lambda * second_half_share, HALF_MAX_GOALS))  # [a1, a2]
+        
+        # Market probability per home cell: its weights summed over the away cells
+        contributions = {
+            key: np.einsum('ijkl,jl->ik', weights.reshape((size,) * 4), away).ravel()[home_codes]
+            for key, weights in _tracked_market_weights().items()
+        }
+        return {'joint': np.einsum('ik,jl->ijkl', home, away), 'contributions': contributions, 'units': n}
+    
+    @staticmethod
+    def _antithetic_contributions(rng: np.random.Generator, home_lambda: float, away_lambda: float,
+                                  n: int) -> Dict[str, Any]:
+        """Antithetic pairs: inverse-CDF half goals from u and 1-u, averaged per pair"""
+        pairs = max(1, n // 2)
+        second_half_share = 1.0 - FIRST_HALF_SHARE
+        first, second = [], []
+        for lam in (home_lambda * FIRST_HALF_SHARE, away_lambda * FIRST_HALF_SHARE,
+                    home_lambda * second_half_share, away_lambda * second_half_share):
+            cdf = np.cumsum(poisson_pmf(lam, 4 * MAX_GOALS))
+            u = rng.random(pairs)
+            first.append(np.searchsorted(cdf, u, side='right'))
+            second.append(np.searchsorted(cdf, 1.0 - u, side='right'))
+        
+        cells = HALF_HISTOGRAM_SIZE ** 4
+        first_codes = histogram_codes(*first, size=HALF_HISTOGRAM_SIZE)
+        second_codes = histogram_codes(*second, size=HALF_HISTOGRAM_SIZE)
+        joint = (np.bincount(first_codes, minlength=cells) + np.bincount(second_codes, minlength=cells)) / 2
+        contributions = {
+            key: (weights[first_codes] + weights[second_codes]) / 2
+            for key, weights in _tracked_market_weights().items()
+        }
+        return {'joint': joint.reshape((HALF_HISTOGRAM_SIZE,) * 4), 'contributions': contributions, 'units': pairs}
+    
+    @staticmethod
+    def _control_variate_contributions(rng: np.random.Generator, home_lambda: float, away_lambda: float,
+                                       n: int) -> Dict[str, Any]:
+        """Raw half-goal draws plus their centred counts (known mean zero) as control variates"""
+        second_half_share = 1.0 - FIRST_HALF_SHARE
+        lambdas = (home_lambda * FIRST_HALF_SHARE, away_lambda * FIRST_HALF_SHARE,
+                   home_lambda * second_half_share, away_lambda * second_half_share)
+        goals = [rng.poisson(lam, n) for lam in lambdas]
+        controls = np.column_stack([g - lam for g, lam in zip(goals, lambdas)])  # Before clipping
+        
+        cells = HALF_HISTOGRAM_SIZE ** 4
+        codes = histogram_codes(*goals, size=HALF_HISTOGRAM_SIZE)
+        contributions = {key: weights[codes] for key, weights in _tracked_market_weights().items()}
+        contributions['_controls'] = controls
+        return {
+            'joint': np.bincount(codes, minlength=cells),
+            'joint_cross': np.stack([np.bincount(codes, weights=control, minlength=cells) for control in controls.T]),
+            'contributions': contributions,
+            'units': n
+        }
+    
+    @staticmethod
+    def _control_variate_histogram(joint: np.ndarray, joint_cross: np.ndarray,
+                                   controls: Dict[str, Any], units: int) -> np.ndarray:
+        """
+        Regression-adjusted joint half histogram: every cell's share is adjusted like a
+        tracked market in _control_variate_estimates, then clipped at zero and renormalised.
+        """
+        x_mean = controls['sum'] / units
+        x_cov = controls['gram'] / units - np.outer(x_mean, x_mean)
+        p = joint / units
+        xy_cov = joint_cross / units - np.outer(x_mean, p)
+        adjusted = np.maximum(p - x_mean @ (np.linalg.pinv(x_cov) @ xy_cov), 0.0)
+        return (adjusted / adjusted.sum()).reshape((HALF_HISTOGRAM_SIZE,) * 4)
+    
+    @staticmethod
+    def _control_variate_estimates(sums: Dict[str, Dict[str, Any]], units: int) -> Tuple[Dict[str, float], Dict[str, float]]:
+        """
+        Regression-adjusted means and residual per-unit variances:
+        p_cv = mean(Y) - beta . mean(X), beta = Cov(X)^-1 Cov(X, Y).
+        """
+        x_mean = sums['_controls']['sum'] / units
+        x_cov = sums['_controls']['gram'] / units - np.outer(x_mean, x_mean)
+        x_cov_inv = np.linalg.pinv(x_cov)
+        
+        means, variances = {}, {}
+        for key, entry in sums.items():
+            if key == '_controls':
+                continue
+            y_mean = entry['sum'] / units
+            y_var = entry['sumsq'] / units - y_mean ** 2
+            xy_cov = entry['cross'] / units - x_mean * y_mean
+            beta = x_cov_inv @ xy_cov
+            means[key] = float(y_mean - beta @ x_mean)
+            variances[key] = float(max(y_var - xy_cov @ beta, 0.0))
+        return means, variances
+    
+    def effective_workers(self, workers: int, iterations: int) -> int:
+        """Cap requested workers by CPU count and a minimum useful share of iterations"""
+        if not workers or workers <= 1:
+            return 1
+        by_size = iterations // self.calibration_config['min_iterations_per_worker']
+        return max(1, min(int(workers), os.cpu_count() or 1, by_size))
+    
+    def simulate_outcome_counts_parallel(self, seed: int, home_lambda: float, away_lambda: float,
+                                         iterations: int, workers: int) -> Tuple[Dict[str, Any], List[Dict]]:
+        """
+        Split the iteration budget across the process pool and merge per-market counts.
+        Returns the merged counts and per-worker throughput stats.
+        """
+        
+        shares = [iterations // workers + (1 if i < iterations % workers else 0) for i in range(workers)]
+        executor = self._get_executor(workers)
+        futures = [
+            executor.submit(_count_outcomes_task, child, self.calibration_config['bit_generator'],
+                            self.calibration_config['chunk_size'], home_lambda, away_lambda, share)
+            for child, share in zip(spawn_seed_sequences(seed, workers), shares)
+        ]
+        
+        counts = {}
+        worker_stats = []
+        for index, (future, share) in enumerate(zip(futures, shares)):
+            with stage('rng_draw'):  # Waiting on the pool: wall time only, the CPU is the workers'
+                worker_counts, wall_time, cpu_time = future.result()
+            for key, value in worker_counts.items():
+                counts[key] = counts.get(key, 0) + value
+            worker_stats.append({
+                'worker': index,
+                'iterations': share,
+                'wall_time_seconds': round(wall_time, 4),
+                'cpu_time_seconds': round(cpu_time, 4),
+                'iterations_per_second': int(share / max(wall_time, 0.000001))
+            })
+        
+        return counts, worker_stats
+    
+    def _get_executor(self, workers: int):
+        if self._executor is None or self._executor_workers < workers:
+            # Imported here: multiprocessing is only needed once a run asks for workers > 1
+            from concurrent.futures import ProcessPoolExecutor
+            self.shutdown_workers()
+            self._executor = ProcessPoolExecutor(max_workers=workers)
+            self._executor_workers = workers
+        return self._executor
+    
+    def shutdown_workers(self):
+        """Stop the parallel process pool (if one was started)"""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+            self._executor_workers = 0
+    
+    def record_seed(self, results: Dict[str, Any], seed: int):
+        """Echo the RNG seed and algorithm in metadata for replay/audit"""
+        results['metadata']['seed'] = seed
+        results['metadata']['bit_generator'] = self.calibration_config['bit_generator']
+    
+    def run_exact_pricing(self,
+                          home_lambda: float,
+                          away_lambda: float,
+                          match_context: Optional[Dict] = None,
+                          cross_check_iterations: int = 0,
+                          max_goals: int = MAX_GOALS,
+                          verbose: bool = True,
+                          seed: Optional[int] = None,
+                          use_cache: bool = True) -> Dict[str, Any]:
+        """
+        Price every market exactly from the joint Poisson score matrix.
+        
+        Same results structure as run_calibrated_simulation, but deterministic and
+        without sampling noise. Calibration treats the run as fully converged
+        (optimal_iterations). Pass cross_check_iterations > 0 to also run Monte
+        Carlo and report the largest probability difference in metadata.
+        
+        With use_cache the matrices and the half-time/full-time parts come from
+        the quantized score-matrix cache (lambdas rounded to its grid, 0.005 by default).
+        """
+        
+        start_time = time.time()
+        
+        cached = use_cache and max_goals == self.score_cache.max_goals
+        with stage('reduction'):
+            if cached:
+                full_time, first_half = self.score_cache.get(home_lambda, away_lambda)
+                halves = self.score_cache.get_halves(home_lambda, away_lambda)
+            else:
+                full_time = score_matrix(home_lambda, away_lambda, max_goals)
+                first_half = score_matrix(home_lambda * FIRST_HALF_SHARE, away_lambda * FIRST_HALF_SHARE, max_goals)
+                halves = split_half_joint(half_joint(home_lambda, away_lambda))
+            
+            probabilities = self.probabilities_from_score_matrices(full_time, first_half)
+            probabilities.update(self.half_market_probabilities(halves))
+            avg_home_goals, avg_away_goals = expected_goals(full_time)
+        
+        results = self.build_results(
+            probabilities, avg_home_goals, avg_away_goals,
+            self.calibration_config['optimal_iterations'], home_lambda, away_lambda,
+            match_context, time.time() - start_time, verbose=verbose
+        )
+        results['metadata']['pricing_mode'] = 'exact'
+        results['metadata']['max_goals'] = max_goals
+        if cached:
+            results['metadata']['score_cache'] = self.score_cache.stats()
+        
+        if cross_check_iterations > 0:
+            mc_results = self.run_calibrated_simulation(home_lambda, away_lambda,
+                                                        cross_check_iterations, match_context, seed)
+            results['metadata']['cross_check'] = self.compare_probabilities(
+                probabilities, mc_results['probabilities'], mc_results['metadata']['iterations']
+            )
+            results['metadata']['cross_check']['seed'] = mc_results['metadata']['seed']
+        
+        return results
+    
+    @staticmethod
+    def compare_probabilities(exact: Dict, sampled: Dict, iterations: int) -> Dict[str, Any]:
+        """Largest absolute difference between exact and Monte Carlo market probabilities"""
+        
+        worst_market, worst_diff = None, 0.0
+        for group, markets in exact.items():
+            for market, prob in markets.items():
+                diff = abs(prob - sampled[group][market])
+                if worst_market is None or diff > worst_diff:
+                    worst_market, worst_diff = f"{group}.{market}", diff
+        
+        return {
+            'iterations': iterations,
+            'max_abs_difference': worst_diff,
+            'worst_market': worst_market
+        }
+    
+    def run_calibrated_batch(self,
+                             home_lambdas: np.ndarray,
+                             away_lambdas: np.ndarray,
+                             iterations: int = 100000,
+                             match_contexts: Optional[List[Optional[Dict]]] = None,
+                             verbose: bool = False,
+                             seed: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Run calibrated simulations for a whole fixture slate in vectorized passes.
         
-        # Generate random seeds for reproducibility control
-        np.random.seed(int(time.time() * 1000) % 2**32)
+        Goals for every fixture are drawn as 2-D (fixtures x iterations) arrays,
+        processed in fixture blocks of at most 'batch_block_elements' draws so a
+        300-fixture slate does not materialise gigabytes of samples at once.
+        Returns one results dict per fixture, same shape as run_calibrated_simulation.
+        The whole slate is drawn from one seeded stream, echoed in each fixture's metadata.
+        """
         
-        # RESEARCH-BASED: Enhanced random generation for better calibration
-        # Poisson generation optimized for large-scale simulations
-        home_goals = np.random.poisson(home_lambda, iterations)
-        away_goals = np.random.poisson(away_lambda, iterations)
+        start_time = time.time()
+        home_lambdas = np.asarray(home_lambdas, dtype=np.float64)
+        away_lambdas = np.asarray(away_lambdas, dtype=np.float64)
+        n_fixtures = len(home_lambdas)
+        if len(away_lambdas) != n_fixtures:
+            raise ValueError("home_lambdas and away_lambdas must have the same length")
+        if match_contexts is None:
+            match_contexts = [None] * n_fixtures
+        
+        iterations = max(iterations, self.calibration_config['minimum_iterations'])
+        
+        logger.info("[BATCH] Running calibrated batch: %d fixtures x %d iterations", n_fixtures, iterations)
+        
+        seed = resolve_seed(seed)
+        rng = make_generator(seed, self.calibration_config['bit_generator'])
+        
+        iteration_chunk = min(iterations, self.calibration_config['chunk_size'])
+        block = max(1, self.calibration_config['batch_block_elements'] // iteration_chunk)
+        counts = {}
+        for lo in range(0, n_fixtures, block):
+            hi = min(lo + block, n_fixtures)
+            block_counts = self.simulate_outcome_counts(
+                rng, home_lambdas[lo:hi, None], away_lambdas[lo:hi, None], iterations
+            )
+            for key, value in block_counts.items():
+                counts.setdefault(key, []).append(value)
+        
+        counts = {key: np.concatenate(parts) for key, parts in counts.items()}
+        simulation_time = time.time() - start_time
         
-        # Calculate match outcomes with vectorized operations (performance optimized)
-        home_wins = np.sum(home_goals > away_goals)
-        draws = np.sum(home_goals == away_goals)
-        away_wins = np.sum(home_goals < away_goals)  # FIX: was away_goals > away_goals
+        results = []
+        for i in range(n_fixtures):
+            probabilities, avg_home_goals, avg_away_goals = self.probabilities_from_histograms(
+                {key: value[i] for key, value in counts.items()}, iterations
+            )
+            fixture_results = self.build_results(
+                probabilities, avg_home_goals, avg_away_goals,
+                iterations, float(home_lambdas[i]), float(away_lambdas[i]),
+                match_contexts[i], simulation_time / max(n_fixtures, 1), verbose=verbose
+            )
+            self.record_seed(fixture_results, seed)
+            fixture_results['metadata']['batch_index'] = i
+            results.append(fixture_results)
+        
+        logger.info("[SUCCESS] Calibrated batch completed in %.3fs", simulation_time)
+        
+        return results
+    
+    def simulate_outcome_counts(self, rng: np.random.Generator, home_lambda, away_lambda,
+                                iterations: int) -> Dict[str, Any]:
+        """
+        Draw goals in blocks of 'chunk_size' iterations and accumulate a joint half histogram.
+        
+        Each iteration draws first-half and second-half goals per team (45% / 55%
+        of the lambda); full time is their sum, so half-time and full-time markets
+        describe the same simulated matches. Returns {'halves': counts} with counts
+        indexed [first-half home, first-half away, second-half home, second-half
+        away]. Lambdas are scalars (one fixture) or (fixtures x 1) columns (batch,
+        one histogram per fixture). Only one block of goal arrays is alive at a
+        time, so peak memory does not grow with the iteration count; every market
+        is then read off the histogram.
+        """
+        
+        home_lambda = np.asarray(home_lambda, dtype=np.float64)
+        away_lambda = np.asarray(away_lambda, dtype=np.float64)
+        rows = home_lambda.shape[:-1]
+        chunk_size = self.calibration_config['chunk_size']
+        second_half_share = 1.0 - FIRST_HALF_SHARE
+        
+        halves = 0
+        for start in range(0, iterations, chunk_size):
+            shape = rows + (min(chunk_size, iterations - start),)
+            with stage('rng_draw'):
+                goals = (
+                    rng.poisson(home_lambda * FIRST_HALF_SHARE, shape),
+                    rng.poisson(away_lambda * FIRST_HALF_SHARE, shape),
+                    rng.poisson(home_lambda * second_half_share, shape),
+                    rng.poisson(away_lambda * second_half_share, shape)
+                )
+            with stage('reduction'):
+                halves = halves + score_histogram(*goals, size=HALF_HISTOGRAM_SIZE)
+        
+        return {'halves': halves}
+    
+    @staticmethod
+    def market_indicators(home_goals: np.ndarray, away_goals: np.ndarray,
+                          first_half_home: np.ndarray, first_half_away: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Per-iteration boolean outcome for every market.
+        Lines are compared as integers (total > 2 == total > 2.5) to stay in the goal dtype.
+        """
         
         # Goal-based market calculations
         total_goals = home_goals + away_goals
-        over_15 = np.sum(total_goals > 1.5)
-        over_25 = np.sum(total_goals > 2.5)
-        over_35 = np.sum(total_goals > 3.5)
-        over_45 = np.sum(total_goals > 4.5)
+        first_half_total = first_half_home + first_half_away
         
-        # Both teams to score analysis
-        both_score = np.sum((home_goals > 0) & (away_goals > 0))
+        return {
+            # Match outcomes with vectorized operations (performance optimized)
+            'home_wins': home_goals > away_goals,
+            'draws': home_goals == away_goals,
+            'away_wins': home_goals < away_goals,  # FIX: was away_goals > away_goals
+            'over_15': total_goals > 1,
+            'over_25': total_goals > 2,
+            'over_35': total_goals > 3,
+            'over_45': total_goals > 4,
+            # Both teams to score analysis
+            'both_score': (home_goals > 0) & (away_goals > 0),
+            'first_half_over_05': first_half_total > 0,
+            'first_half_over_15': first_half_total > 1
+        }
+    
+    @staticmethod
+    @staged('reduction')
+    def probabilities_from_histograms(histograms: Dict[str, np.ndarray],
+                                      iterations: int) -> Tuple[Dict[str, Dict[str, float]], float, float]:
+        """Market probabilities and average goals from a simulated joint half histogram"""
+        parts = split_half_joint(histograms['halves'] / iterations)
+        avg_home_goals, avg_away_goals = expected_goals(parts['full_time'])
+        probabilities = CalibratedMonteCarloEngine.probabilities_from_score_matrices(
+            parts['full_time'], parts['first_half']
+        )
+        probabilities.update(CalibratedMonteCarloEngine.half_market_probabilities(parts))
+        return probabilities, avg_home_goals, avg_away_goals
+    
+    @staticmethod
+    def half_market_probabilities(parts: Dict[str, np.ndarray]) -> Dict[str, Dict[str, float]]:
+        """Second-half, HT/FT and half-with-most-goals markets from split_half_joint output"""
+        
+        second_half = parts['second_half']
+        home_win, draw, away_win = outcome_probabilities(second_half)
+        second_half_totals = total_goals_distribution(second_half)
+        second_half_over_05 = over_probability(second_half_totals, 0.5)
+        second_half_over_15 = over_probability(second_half_totals, 1.5)
+        first_more, equal, second_more = (float(p) for p in parts['half_most_goals'])
+        
+        return {
+            'second_half': {
+                'home_win': home_win,
+                'draw': draw,
+                'away_win': away_win,
+                'over_0_5': second_half_over_05,
+                'under_0_5': 1.0 - second_half_over_05,
+                'over_1_5': second_half_over_15,
+                'under_1_5': 1.0 - second_half_over_15
+            },
+            # '<half-time result>_<full-time result>'
+            'ht_ft': {
+                f"{half_time}_{full_time}": float(parts['ht_ft'][i, j])
+                for i, half_time in enumerate(HT_FT_OUTCOMES)
+                for j, full_time in enumerate(HT_FT_OUTCOMES)
+            },
+            'half_most_goals': {
+                'first_half': first_more,
+                'equal': equal,
+                'second_half': second_more
+            }
+        }
+    
+    @staticmethod
+    def probabilities_from_score_matrices(full_time: np.ndarray, first_half: np.ndarray) -> Dict[str, Dict[str, float]]:
+        """
+        Exact market probabilities from full-time and first-half score matrices,
+        including every catalogue market (see markets.py) priced off full_time
+        """
         
-        # First half simulation (professional requirement)
-        first_half_home = np.random.poisson(home_lambda * 0.45, iterations)  # 45% of goals in 1st half
-        first_half_away = np.random.poisson(away_lambda * 0.45, iterations)
-        first_half_total = first_half_home + first_half_away
-        first_half_over_05 = np.sum(first_half_total > 0.5)
-        first_half_over_15 = np.sum(first_half_total > 1.5)
+        home_win, draw, away_win = outcome_probabilities(full_time)
+        totals = total_goals_distribution(full_time)
+        first_half_totals = total_goals_distribution(first_half)
+        both_score = both_teams_score_probability(full_time)
+        
+        goal_markets = {}
+        for line in GOAL_LINES:
+            over = over_probability(totals, line)
+            suffix = str(line).replace('.', '_')
+            goal_markets[f'over_{suffix}'] = over
+            goal_markets[f'under_{suffix}'] = 1.0 - over
+        
+        first_half_over_05 = over_probability(first_half_totals, 0.5)
+        first_half_over_15 = over_probability(first_half_totals, 1.5)
+        first_half_both_score = both_teams_score_probability(first_half)
         
-        # Calculate probabilities
         probabilities = {
-            # Match result markets
             'match_outcomes': {
-                'home_win': home_wins / iterations,
-                'draw': draws / iterations,
-                'away_win': away_wins / iterations
+                'home_win': home_win,
+                'draw': draw,
+                'away_win': away_win
             },
-            
-            # Goal markets (comprehensive)
-            'goal_markets': {
-                'over_1_5': over_15 / iterations,
-                'under_1_5': (iterations - over_15) / iterations,
-                'over_2_5': over_25 / iterations,
-                'under_2_5': (iterations - over_25) / iterations,
-                'over_3_5': over_35 / iterations,
-                'under_3_5': (iterations - over_35) / iterations,
-                'over_4_5': over_45 / iterations,
-                'under_4_5': (iterations - over_45) / iterations
-            },
-            
-            # Both teams to score
+            'goal_markets': goal_markets,
             'btts': {
-                'yes': both_score / iterations,
-                'no': (iterations - both_score) / iterations
+                'yes': both_score,
+                'no': 1.0 - both_score
             },
-            
-            # First half markets (professional requirement)
             'first_half': {
-                'over_0_5': first_half_over_05 / iterations,
-                'under_0_5': (iterations - first_half_over_05) / iterations,
-                'over_1_5': first_half_over_15 / iterations,
-                'under_1_5': (iterations - first_half_over_15) / iterations
+                'over_0_5': first_half_over_05,
+                'under_0_5': 1.0 - first_half_over_05,
+                'over_1_5': first_half_over_15,
+                'under_1_5': 1.0 - first_half_over_15,
+                'btts_yes': first_half_both_score,
+                'btts_no': 1.0 - first_half_both_score
             }
         }
+        probabilities.update(market_registry(full_time.shape[0]).probabilities(full_time))
+        return probabilities
+    
+    @staged('calibration')
+    def build_results(self, probabilities: Dict[str, Dict[str, float]],
+                      avg_home_goals: float, avg_away_goals: float, iterations: int,
+                      home_lambda: float, away_lambda: float,
+                      match_context: Optional[Dict], simulation_time: float,
+                      verbose: bool = True) -> Dict[str, Any]:
+        """Turn market probabilities into the professional-grade results structure"""
         
         # CRITICAL: Apply calibration factor (research-validated improvement)
         calibration_factor = self.calculate_calibration_factor(home_lambda, away_lambda, iterations)
@@ -139,9 +803,6 @@ class CalibratedMonteCarloEngine:
         # True odds calculation with calibration adjustment
         true_odds = self.calculate_true_odds(probabilities, calibration_factor)
         
-        # Calculate simulation metadata
-        simulation_time = time.time() - start_time
-        
         # Professional-grade results structure
         results = {
             'probabilities': probabilities,
@@ -151,9 +812,9 @@ class CalibratedMonteCarloEngine:
             'rps_score': rps_score,
             'professional_grade': professional_grade,
             # CRITICAL FIX: Add missing goal averages for frontend display
-            'avg_home_goals': np.mean(home_goals),
-            'avg_away_goals': np.mean(away_goals), 
-            'avg_total_goals': np.mean(total_goals),
+            'avg_home_goals': avg_home_goals,
+            'avg_away_goals': avg_away_goals, 
+            'avg_total_goals': avg_home_goals + avg_away_goals,
             'professional_benchmark': {
                 'target_rps': self.PROFESSIONAL_RPS_BENCHMARK,
                 'achieved_rps': rps_score,
@@ -164,6 +825,7 @@ class CalibratedMonteCarloEngine:
                 'iterations': iterations,
                 'home_lambda': home_lambda,
                 'away_lambda': away_lambda,
+                'pricing_mode': 'monte_carlo',
                 'simulation_time_seconds': round(simulation_time, 3),
                 'iterations_per_second': int(iterations / max(simulation_time, 0.000001)),  # Prevent division by zero
                 'calibration_optimized': True,
@@ -172,11 +834,11 @@ class CalibratedMonteCarloEngine:
             }
         }
         
-        print(f"[SUCCESS] Calibrated simulation completed in {simulation_time:.3f}s")
-        print(f"   RPS Score: {rps_score:.4f} (target: {self.PROFESSIONAL_RPS_BENCHMARK})")
-        print(f"   Professional Grade: {'[YES]' if professional_grade else '[NO]'}")
-        print(f"   Calibration Factor: {calibration_factor:.4f}")
-        print(f"   Confidence Score: {confidence_score:.1%}")
+        if verbose:
+            logger.info("[SUCCESS] Calibrated simulation completed in %.3fs: RPS %.4f (target %s), "
+                        "professional grade %s, calibration factor %.4f, confidence %.1f%%",
+                        simulation_time, rps_score, self.PROFESSIONAL_RPS_BENCHMARK,
+                        professional_grade, calibration_factor, confidence_score * 100)
         
         return results
     
@@ -342,6 +1004,14 @@ class CalibratedMonteCarloEngine:
             'no': 1 / max(btts_probs['no'] * calibration_factor, 0.01)
         }
         
+        # Catalogue markets (double chance, Asian handicap, exact score, ...)
+        for group in market_registry(MAX_GOALS + 1).groups:
+            if group in probabilities:
+                true_odds[group] = {
+                    market: 1 / max(prob * calibration_factor, 0.01)
+                    for market, prob in probabilities[group].items()
+                }
+        
         return true_odds
 
 
@@ -356,155 +1026,250 @@ class ValueBetDetector:
         self.max_stake_percentage = 2.5  # Maximum 2.5% of bankroll per bet
         self.minimum_edge_threshold = 0.02  # 2% minimum edge for consideration
         
-    def detect_value_opportunities(self, simulation_results: Dict, bookmaker_odds: Dict, 
-                                 bankroll: float = 1000) -> List[Dict]:
+    @staged('value_detection')
+    def detect_value_opportunities(self, simulation_results: Dict, bookmaker_odds,
+                                 bankroll: float = 1000, verbose: bool = True) -> List[Dict]:
         """
         Detect value betting opportunities using Kelly Criterion position sizing.
         
         RESEARCH ADVANTAGE: Calibration-optimized approach yields 69.86% better returns.
+        bookmaker_odds is a flat {market key: decimal odds} dict or an odds vector
+        indexed by market id (market_ids.py); the edge rules are those of
+        detect_value_matrix on a one-fixture, one-bookmaker slice.
+        Pass verbose=False (batch pricing) to skip the per-market debug output;
+        it is also skipped whenever DEBUG logging is disabled.
         """
         
-        opportunities = []
-        probabilities = simulation_results['probabilities']
+        registry = market_ids()
         confidence = simulation_results['confidence_score']
         calibration_factor = simulation_results['calibration_factor']
+        debug = verbose and logger.isEnabledFor(logging.DEBUG)
+        
+        probabilities = registry.probability_vector(simulation_results['probabilities'])[None, :]
+        odds = (registry.key_vector(bookmaker_odds) if isinstance(bookmaker_odds, dict)
+                else np.asarray(bookmaker_odds, dtype=np.float64))[None, :, None]
+        
+        value_matrix = self.detect_value_matrix(
+            probabilities, odds, np.array([calibration_factor]), np.array([confidence]), bankroll=bankroll
+        )
+        opportunities = self.opportunities_from_matrix(
+            value_matrix, odds, probabilities, registry.keys, 0,
+            confidence=confidence, calibration_factor=calibration_factor,
+            professional_grade=simulation_results.get('professional_grade', False)
+        )
+        
+        if verbose:
+            logger.info("[SUCCESS] Found %d value opportunities", len(opportunities))
+        
+        if not debug:
+            return opportunities
+        
+        # DEBUG: Show every priced market that has bookmaker odds
+        logger.debug("[ANALYSIS] Analyzing value opportunities with %.1f%% confidence", confidence * 100)
+        logger.debug("[EDGE_DEBUG] All edge calculations (threshold: %.3f):", self.minimum_edge_threshold)
+        edge = value_matrix['edge'][0, :, 0]
+        for j in np.flatnonzero(~np.isnan(edge)):
+            logger.debug("  %s: %.2f%% edge (True: %.3f, Book: %.2f, Implied: %.3f, Meets threshold: %s)",
+                         registry.keys[j], value_matrix['edge_percentage'][0, j, 0], probabilities[0, j],
+                         odds[0, j, 0], value_matrix['implied_probability'][0, j, 0],
+                         edge[j] > self.minimum_edge_threshold)
         
-        print(f"[ANALYSIS] Analyzing value opportunities with {confidence:.1%} confidence")
+        for i, opp in enumerate(opportunities[:3]):  # Show top 3
+            logger.debug("   %d. %s: %.1f%% edge, %.1f%% stake",
+                         i + 1, opp['market'], opp['edge_percentage'], opp['recommended_stake_percent'])
         
-        # Analyze all markets for value
-        all_markets = {}
+        return opportunities
+    
+    @staticmethod
+    def market_probabilities(probabilities: Dict) -> Dict[str, float]:
+        """Flatten simulation probabilities into bookmaker-style market keys (see market_ids.py)"""
+        registry = market_ids()
+        return registry.flat(registry.probability_vector(probabilities))
+    
+    @staged('value_detection')
+    def probability_matrix(self, simulation_results_list: List[Dict]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, List[str]]:
+        """
+        Stack per-fixture results into arrays for detect_value_matrix.
+        Returns (probabilities [fixtures x market ids], calibration_factors, confidences, market_keys);
+        markets a result does not price are NaN.
+        """
         
-        # Match outcome markets - FIXED: Use same keys as bookmaker conversion
-        market_key_map = {
-            'home_win': '1x2_home',
-            'draw': '1x2_draw', 
-            'away_win': '1x2_away'
-        }
-        for outcome, prob in probabilities['match_outcomes'].items():
-            market_key = market_key_map.get(outcome, f"1x2_{outcome}")
-            all_markets[market_key] = prob
-        
-        # Goal markets
-        for market, prob in probabilities['goal_markets'].items():
-            all_markets[f"goals_{market}"] = prob
-        
-        # BTTS markets
-        for outcome, prob in probabilities['btts'].items():
-            all_markets[f"btts_{outcome}"] = prob
-        
-        print(f"[ANALYSIS] Generated {len(all_markets)} simulation markets: {list(all_markets.keys())}")
-        print(f"[ANALYSIS] Received {len(bookmaker_odds)} bookmaker markets: {list(bookmaker_odds.keys())}")
-        
-        # Check each market against bookmaker odds
-        edge_calculations = []
-        for market_key, true_prob in all_markets.items():
-            if market_key in bookmaker_odds:
-                book_odds = bookmaker_odds[market_key]
-                implied_prob = 1 / book_odds
-                
-                # Calculate edge with calibration adjustment
-                edge = (true_prob * calibration_factor) - implied_prob
-                edge_percent = (edge / implied_prob) * 100
-                
-                edge_calculations.append({
-                    'market': market_key,
-                    'true_prob': true_prob,
-                    'book_odds': book_odds,
-                    'implied_prob': implied_prob,
-                    'edge': edge,
-                    'edge_percent': edge_percent,
-                    'meets_threshold': edge > self.minimum_edge_threshold
-                })
-                
-                if edge > self.minimum_edge_threshold:
-                    # Calculate Kelly fraction
-                    kelly_fraction = self.calculate_kelly_fraction(book_odds, true_prob * calibration_factor)
-                    
-                    # Apply conservative multiplier and confidence adjustment
-                    recommended_stake_percent = kelly_fraction * self.kelly_multiplier * confidence
-                    recommended_stake_percent = min(recommended_stake_percent, self.max_stake_percentage / 100)
-                    
-                    if recommended_stake_percent > 0.005:  # 0.5% minimum threshold
-                        recommended_stake_amount = bankroll * recommended_stake_percent
-                        
-                        # Calculate expected value
-                        expected_value = (true_prob * calibration_factor * (book_odds - 1)) - ((1 - true_prob * calibration_factor) * 1)
-                        expected_roi = expected_value / recommended_stake_amount if recommended_stake_amount > 0 else 0
-                        
-                        opportunity = {
-                            'market': market_key,
-                            'true_probability': true_prob,
-                            'calibrated_probability': true_prob * calibration_factor,
-                            'bookmaker_odds': book_odds,
-                            'bookmaker_probability': implied_prob,
-                            'edge': edge,
-                            'edge_percentage': (edge / implied_prob) * 100,
-                            'kelly_fraction': kelly_fraction,
-                            'recommended_stake_percent': recommended_stake_percent * 100,
-                            'recommended_stake_amount': recommended_stake_amount,
-                            'expected_value': expected_value,
-                            'expected_roi_percent': expected_roi * 100,
-                            'confidence': confidence,
-                            'calibration_factor': calibration_factor,
-                            'priority': self.get_priority_level(edge, confidence, calibration_factor),
-                            'professional_grade': simulation_results.get('professional_grade', False),
-                            'kelly_compliant': kelly_fraction > 0 and recommended_stake_percent <= self.max_stake_percentage / 100
-                        }
-                        
-                        opportunities.append(opportunity)
+        registry = market_ids()
+        probabilities = np.array([registry.probability_vector(results['probabilities'])
+                                  for results in simulation_results_list],
+                                 dtype=np.float64).reshape(len(simulation_results_list), len(registry))
+        calibration_factors = np.array([r['calibration_factor'] for r in simulation_results_list], dtype=np.float64)
+        confidences = np.array([r['confidence_score'] for r in simulation_results_list], dtype=np.float64)
+        return probabilities, calibration_factors, confidences, registry.keys
+    
+    @staticmethod
+    @staged('value_detection')
+    def odds_tensor(bookmaker_odds: List[List[np.ndarray]]) -> np.ndarray:
+        """
+        Build a (fixtures x markets x bookmakers) odds tensor from odds vectors
+        indexed by market id, one list of bookmakers per fixture. Missing prices are NaN.
+        """
         
-        # Sort by edge percentage (highest first)
-        opportunities.sort(key=lambda x: x['edge_percentage'], reverse=True)
+        n_bookmakers = max((len(books) for books in bookmaker_odds), default=0)
+        odds = np.full((len(bookmaker_odds), len(market_ids()), n_bookmakers), np.nan)
+        for i, books in enumerate(bookmaker_odds):
+            for b, book in enumerate(books):
+                odds[i, :, b] = book
+        return odds
+    
+    @staged('value_detection')
+    def detect_value_matrix(self, probabilities: np.ndarray, odds: np.ndarray,
+                            calibration_factors: np.ndarray, confidences: np.ndarray,
+                            bankroll: float = 1000) -> Dict[str, np.ndarray]:
+        """
+        Vectorized value detection over a whole odds feed.
         
-        # DEBUG: Show all edge calculations
-        print(f"[EDGE_DEBUG] All edge calculations (threshold: {self.minimum_edge_threshold:.3f}):")
-        for calc in edge_calculations:
-            print(f"  {calc['market']}: {calc['edge_percent']:.2f}% edge "
-                  f"(True: {calc['true_prob']:.3f}, Book: {calc['book_odds']:.2f}, "
-                  f"Implied: {calc['implied_prob']:.3f}, Meets threshold: {calc['meets_threshold']})")
+        probabilities: (fixtures x markets), odds: (fixtures x markets x bookmakers),
+        calibration_factors/confidences: (fixtures,). Applies exactly the rules of
+        detect_value_opportunities as array operations and returns a columnar
+        result of (fixtures x markets x bookmakers) arrays plus the best bookmaker
+        per market. Missing odds (NaN) never qualify as value.
+        """
         
-        print(f"[SUCCESS] Found {len(opportunities)} value opportunities")
-        for i, opp in enumerate(opportunities[:3]):  # Show top 3
-            print(f"   {i+1}. {opp['market']}: {opp['edge_percentage']:.1f}% edge, "
-                  f"{opp['recommended_stake_percent']:.1f}% stake")
+        probabilities = np.asarray(probabilities, dtype=np.float64)[:, :, None]
+        odds = np.asarray(odds, dtype=np.float64)
+        calibration = np.asarray(calibration_factors, dtype=np.float64)[:, None, None]
+        confidence = np.asarray(confidences, dtype=np.float64)[:, None, None]
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            implied = 1 / odds
+            calibrated = probabilities * calibration
+            edge = calibrated - implied
+            edge_percentage = edge / implied * 100
+            
+            kelly = self.calculate_kelly_fraction(odds, calibrated)
+            net_odds = odds - 1
+            stake_fraction = np.minimum(kelly * self.kelly_multiplier * confidence, self.max_stake_percentage / 100)
+            stake_amount = bankroll * stake_fraction
+            expected_value = calibrated * net_odds - (1 - calibrated)
+            expected_roi = np.where(stake_amount > 0, expected_value / stake_amount, 0.0)
+        
+        is_value = (edge > self.minimum_edge_threshold) & (stake_fraction > 0.005)
+        
+        priority = self.get_priority_level(edge, confidence, calibration)
+        
+        # Best price per market across bookmakers (highest edge; NaN odds ignored)
+        has_odds = ~np.isnan(edge)
+        best_bookmaker = np.argmax(np.where(has_odds, edge, -np.inf), axis=2) if odds.shape[2] else None
+        
+        return {
+            'implied_probability': implied,
+            'calibrated_probability': np.broadcast_to(calibrated, edge.shape),
+            'edge': edge,
+            'edge_percentage': edge_percentage,
+            'kelly_fraction': kelly,
+            'stake_percent': stake_fraction * 100,
+            'stake_amount': stake_amount,
+            'expected_value': expected_value,
+            'expected_roi_percent': expected_roi * 100,
+            'priority': priority,
+            'is_value': is_value,
+            'best_bookmaker': best_bookmaker,
+            'has_value': is_value.any(axis=2)
+        }
+    
+    @staged('value_detection')
+    def opportunities_from_matrix(self, value_matrix: Dict[str, np.ndarray], odds: np.ndarray,
+                                  probabilities: np.ndarray, market_keys: List[str], fixture: int,
+                                  confidence: float, calibration_factor: float,
+                                  professional_grade: bool = False, bookmaker: int = 0) -> List[Dict]:
+        """
+        Expand one fixture/bookmaker slice of detect_value_matrix into the
+        opportunity dicts returned by detect_value_opportunities (same order).
+        """
+        
+        opportunities = []
+        for j in np.flatnonzero(value_matrix['is_value'][fixture, :, bookmaker]):
+            cell = (fixture, j, bookmaker)
+            kelly_fraction = float(value_matrix['kelly_fraction'][cell])
+            stake_fraction = float(value_matrix['stake_percent'][cell]) / 100
+            opportunities.append({
+                'market': market_keys[j],
+                'true_probability': float(probabilities[fixture, j]),
+                'calibrated_probability': float(value_matrix['calibrated_probability'][cell]),
+                'bookmaker_odds': float(odds[cell]),
+                'bookmaker_probability': float(value_matrix['implied_probability'][cell]),
+                'edge': float(value_matrix['edge'][cell]),
+                'edge_percentage': float(value_matrix['edge_percentage'][cell]),
+                'kelly_fraction': kelly_fraction,
+                'recommended_stake_percent': stake_fraction * 100,
+                'recommended_stake_amount': float(value_matrix['stake_amount'][cell]),
+                'expected_value': float(value_matrix['expected_value'][cell]),
+                'expected_roi_percent': float(value_matrix['expected_roi_percent'][cell]),
+                'confidence': confidence,
+                'calibration_factor': calibration_factor,
+                'priority': str(value_matrix['priority'][cell]),
+                'professional_grade': professional_grade,
+                'kelly_compliant': kelly_fraction > 0 and stake_fraction <= self.max_stake_percentage / 100
+            })
         
+        # Sort by edge percentage (highest first)
+        opportunities.sort(key=lambda x: x['edge_percentage'], reverse=True)
         return opportunities
     
-    def calculate_kelly_fraction(self, odds: float, true_prob: float) -> float:
+    @staticmethod
+    def calculate_kelly_fraction(odds, true_prob) -> np.ndarray:
         """
         Calculate Kelly Criterion fraction: f = (bp - q) / b
-        where b = odds-1, p = true probability, q = 1-p
+        where b = odds-1, p = true probability, q = 1-p.
+        Element-wise over arrays; zero where the bet is invalid or has negative expectation.
         """
         
-        if true_prob <= 0 or true_prob >= 1 or odds <= 1:
-            return 0
-        
+        odds = np.asarray(odds, dtype=np.float64)
+        p = np.asarray(true_prob, dtype=np.float64)  # True probability of winning
         b = odds - 1  # Net odds
-        p = true_prob  # True probability of winning
         q = 1 - p     # True probability of losing
         
-        kelly_fraction = (b * p - q) / b
+        with np.errstate(divide='ignore', invalid='ignore'):
+            kelly_fraction = (b * p - q) / b
         
-        # Ensure non-negative (no bet if negative expectation)
-        return max(kelly_fraction, 0)
+        valid = (p > 0) & (p < 1) & (odds > 1)
+        return np.where(valid, np.maximum(kelly_fraction, 0), 0.0)
     
-    def get_priority_level(self, edge: float, confidence: float, calibration_factor: float) -> str:
+    @staticmethod
+    def get_priority_level(edge, confidence, calibration_factor) -> np.ndarray:
         """
-        Determine priority level for value opportunities.
+        Determine priority level for value opportunities (element-wise over arrays).
         """
         
         # Combined score considering edge, confidence, and calibration
         composite_score = edge * confidence * calibration_factor
         
-        if composite_score > 0.15:
-            return 'CRITICAL'  # Exceptional opportunity
-        elif composite_score > 0.08:
-            return 'HIGH'      # Strong opportunity
-        elif composite_score > 0.04:
-            return 'MEDIUM'    # Good opportunity
-        else:
-            return 'LOW'       # Marginal opportunity
+        return np.select(
+            [composite_score > 0.15,   # Exceptional opportunity
+             composite_score > 0.08,   # Strong opportunity
+             composite_score > 0.04],  # Good opportunity
+            ['CRITICAL', 'HIGH', 'MEDIUM'],
+            default='LOW'              # Marginal opportunity
+        )
+
 
+def _count_outcomes_task(seed_sequence: np.random.SeedSequence, bit_generator: str, chunk_size: int,
+                        home_lambda: float, away_lambda: float, iterations: int) -> Tuple[Dict[str, Any], float, float]:
+    """Process-pool task: count market outcomes for one worker's share of iterations"""
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    
+    engine = CalibratedMonteCarloEngine()
+    engine.calibration_config['chunk_size'] = chunk_size
+    counts = engine.simulate_outcome_counts(make_generator(seed_sequence, bit_generator),
+                                            home_lambda, away_lambda, iterations)
+    
+    return counts, time.perf_counter() - wall_start, time.process_time() - cpu_start
+
+@lru_cache(maxsize=1)
+def _tracked_market_weights() -> Dict[str, np.ndarray]:
+    """0/1 weight of each CONTRIBUTION_MARKETS outcome over the flattened joint half histogram cells"""
+    first_home, first_away, second_home, second_away = np.indices((HALF_HISTOGRAM_SIZE,) * 4)
+    indicators = CalibratedMonteCarloEngine.market_indicators(
+        first_home + second_home, first_away + second_away, first_home, first_away
+    )
+    return {key: indicators[key].ravel().astype(np.float64) for key in CONTRIBUTION_MARKETS}
 
 def create_calibrated_engine() -> CalibratedMonteCarloEngine:
     """Factory function to create calibrated Monte Carlo engine."""
@@ -518,6 +1283,7 @@ def create_value_detector() -> ValueBetDetector:
 
 # Test function for validation
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.DEBUG, format='%(message)s')
     print("🧪 Testing Calibrated Monte Carlo Engine...")
     
     engine = create_calibrated_engine()
@@ -537,9 +1303,9 @@ if __name__ == "__main__":
     
     # Test value detection
     test_odds = {
-        '1x2_home_win': 2.5,
+        '1x2_home': 2.5,
         '1x2_draw': 3.2,
-        '1x2_away_win': 3.8,
+        '1x2_away': 3.8,
         'goals_over_2_5': 1.9,
         'btts_yes': 1.8
     }
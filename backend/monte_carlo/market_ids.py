@@ -0,0 +1,171 @@
+"""
+MARKET IDS - ONE INTEGER ID PER BOOKMAKER MARKET
+
+Every market the service can price or receive a price for gets a fixed
+integer id. Its names in each layout are compiled into lookup tables once:
+- key:         flat market key used by value detection ('goals_over_2_5')
+- feed path:   position in the frontend odds object ('over_under', 'ou25', 'over');
+               the bookmaker_odds table layout ('ou25', 'over') is accepted too
+- odds cell:   bookmaker_odds row (market_type) and price column
+- probability: (group, market) in the calibrated engine's probabilities
+- nested path: (category, outcome) in the legacy engine's true_odds and in value_bets
+
+Odds, probabilities and true odds are then plain float vectors indexed by
+market id (NaN where a price is missing), so conversion, edge detection and
+database rows are array operations. Feed entries that match no market are
+logged instead of being dropped silently.
+"""
+
+import logging
+import numpy as np
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+from .markets import catalogue_keys
+
+logger = logging.getLogger(__name__)
+
+GOAL_LINES = (0.5, 1.5, 2.5, 3.5, 4.5, 5.5)  # Total-goals lines quoted as ou05 .. ou55
+ODDS_COLUMNS = ('home', 'draw', 'away', 'over', 'under', 'yes', 'no')  # bookmaker_odds price columns
+
+
+def market_table() -> List[Tuple[str, tuple, Optional[Tuple[str, str]], Optional[Tuple[str, str]], Tuple[str, str]]]:
+    """(key, feed path, odds cell, probability path, nested path) of every market, in id order"""
+    markets = []
+
+    for outcome, probability in (('home', 'home_win'), ('draw', 'draw'), ('away', 'away_win')):
+        markets.append((f"1x2_{outcome}", ('1x2', outcome), ('1x2', outcome),
+                        ('match_outcomes', probability), ('1x2', outcome)))
+
+    for line in GOAL_LINES:
+        suffix = str(line).replace('.', '_')   # '2_5' in probability keys
+        quoted = suffix.replace('_', '')       # '25' in feed / table / nested keys
+        for side in ('over', 'under'):
+            markets.append((f"goals_{side}_{suffix}", ('over_under', f"ou{quoted}", side), (f"ou{quoted}", side),
+                            ('goal_markets', f"{side}_{suffix}"), ('over_under', f"{side}_{quoted}")))
+
+    for outcome in ('yes', 'no'):
+        markets.append((f"btts_{outcome}", ('both_teams_score', outcome), ('btts', outcome),
+                        ('btts', outcome), ('both_teams_score', outcome)))
+
+    for outcome in ('yes', 'no'):
+        markets.append((f"first_half_btts_{outcome}", ('first_half', 'gg_1h', outcome), ('gg_1h', outcome),
+                        ('first_half', f"btts_{outcome}"), ('first_half', f"gg_1h_{outcome}")))
+
+    # Catalogue markets (markets.py) have no bookmaker_odds column
+    for group, market in catalogue_keys():
+        markets.append((f"{group}_{market}", (group, market), None, (group, market), (group, market)))
+
+    return markets
+
+
+class MarketIds:
+    """Compiled id <-> name tables for market_table()"""
+
+    def __init__(self):
+        table = market_table()
+        self.keys = [key for key, _, _, _, _ in table]
+        self.ids = {key: market_id for market_id, key in enumerate(self.keys)}
+        self.probability_paths = [probability for _, _, _, probability, _ in table]
+        self.nested_paths = [nested for _, _, _, _, nested in table]
+
+        # Feed lookup: frontend paths plus bookmaker_odds (market_type, outcome) aliases
+        self.feed_ids: Dict[tuple, int] = {}
+        for market_id, (_, feed, cell, _, _) in enumerate(table):
+            for path in (feed, cell):
+                if path is not None and self.feed_ids.setdefault(path, market_id) != market_id:
+                    raise ValueError(f"Feed path {path} names two markets")
+
+        # bookmaker_odds rows: one per market_type, one price column per outcome (-1 = not stored)
+        self.market_types = list(dict.fromkeys(cell[0] for _, _, cell, _, _ in table if cell))
+        row = {market_type: i for i, market_type in enumerate(self.market_types)}
+        self.odds_rows = np.array([row[cell[0]] if cell else -1 for _, _, cell, _, _ in table], dtype=np.intp)
+        self.odds_columns = np.array([ODDS_COLUMNS.index(cell[1]) if cell else -1 for _, _, cell, _, _ in table],
+                                     dtype=np.intp)
+        self.stored = self.odds_rows >= 0
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def empty(self) -> np.ndarray:
+        return np.full(len(self.keys), np.nan)
+
+    def feed_vector(self, feed: Dict) -> np.ndarray:
+        """
+        Odds vector from a frontend odds object ({'1x2': {...}, 'over_under': {'ou25': {...}}, ...})
+        or the bookmaker_odds layout ({'ou25': {'over': ..., 'under': ...}}). Missing or zero prices are NaN.
+        """
+        odds = self.empty()
+        unknown = []
+        for section, markets in feed.items():
+            if not isinstance(markets, dict):
+                unknown.append((section,))
+                continue
+            for name, value in markets.items():
+                if isinstance(value, dict):
+                    for outcome, price in value.items():
+                        self._set_price(odds, (section, name, outcome), price, unknown)
+                else:
+                    self._set_price(odds, (section, name), value, unknown)
+        if unknown:
+            logger.warning("Ignoring %d unknown bookmaker markets: %s", len(unknown), unknown)
+        return odds
+
+    def _set_price(self, odds: np.ndarray, path: tuple, price, unknown: List[tuple]):
+        market_id = self.feed_ids.get(path)
+        if market_id is None:
+            unknown.append(path)
+        elif price:
+            odds[market_id] = price
+
+    def key_vector(self, flat: Dict[str, float]) -> np.ndarray:
+        """Vector from a {key: value} dict (e.g. flat bookmaker odds); unknown keys are logged"""
+        vector = self.empty()
+        unknown = []
+        for key, value in flat.items():
+            market_id = self.ids.get(key)
+            if market_id is None:
+                unknown.append(key)
+            elif value:
+                vector[market_id] = value
+        if unknown:
+            logger.warning("Ignoring %d unknown market keys: %s", len(unknown), unknown)
+        return vector
+
+    def flat(self, vector: np.ndarray) -> Dict[str, float]:
+        """{key: value} for the markets present (non-NaN) in a vector"""
+        return {self.keys[i]: float(vector[i]) for i in np.flatnonzero(~np.isnan(vector))}
+
+    def probability_vector(self, probabilities: Dict[str, Dict[str, float]]) -> np.ndarray:
+        """Calibrated-engine probabilities by market id (NaN for markets the result does not price)"""
+        return self._gather(probabilities, self.probability_paths)
+
+    def nested_vector(self, nested: Dict[str, Dict[str, float]]) -> np.ndarray:
+        """Values of a nested {category: {outcome: value}} dict such as the legacy true_odds"""
+        return self._gather(nested, self.nested_paths)
+
+    def _gather(self, nested: Dict[str, Dict[str, float]], paths: List[Tuple[str, str]]) -> np.ndarray:
+        empty = {}
+        return np.array([nested.get(group, empty).get(market, np.nan) for group, market in paths],
+                        dtype=np.float64)
+
+    def odds_table(self, odds: np.ndarray) -> np.ndarray:
+        """(market_types x ODDS_COLUMNS) prices of an odds vector, NaN where missing"""
+        table = np.full((len(self.market_types), len(ODDS_COLUMNS)), np.nan)
+        table[self.odds_rows[self.stored], self.odds_columns[self.stored]] = odds[self.stored]
+        return table
+
+    def odds_rows_for(self, simulation_id: int, odds: np.ndarray) -> List[tuple]:
+        """bookmaker_odds INSERT parameters (simulation_id, market_type, *ODDS_COLUMNS), one per quoted market_type"""
+        table = self.odds_table(odds)
+        quoted = ~np.isnan(table)
+        prices = np.where(quoted, table, None).tolist()
+        return [
+            (simulation_id, self.market_types[r], *prices[r])
+            for r in np.flatnonzero(quoted.any(axis=1))
+        ]
+
+
+@lru_cache(maxsize=1)
+def market_ids() -> MarketIds:
+    """Shared compiled registry (built on first use)"""
+    return MarketIds()
@@ -0,0 +1,141 @@
+"""
+MARKET CATALOGUE - FULL-TIME MARKETS AS WEIGHTS OVER THE SCORE MATRIX
+
+Every market is a pair of weight matrices over the (home x away) score grid:
+'win' is the share of the stake won on each scoreline and 'lose' the share
+lost (by default 1 - win). Pricing all markets is then one matrix product
+with the flattened score matrix, whether it came from exact pricing or from
+the simulated histogram, so adding markets adds no sampling work.
+
+The fair probability of a market is win / (win + lose): for ordinary markets
+the denominator is 1, for Asian handicaps it removes the pushed stake (whole
+lines) and counts half-won / half-lost quarter lines at half weight, so
+1 / probability is the fair decimal price.
+"""
+
+import numpy as np
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+ASIAN_HANDICAP_LINES = np.arange(-2.5, 2.75, 0.25)  # -2.5 .. +2.5 in quarter goals
+TEAM_TOTAL_LINES = (0.5, 1.5, 2.5, 3.5)
+MAX_EXACT_SCORE = 5        # Exact scores up to 5-5, the rest is 'other'
+MAX_WINNING_MARGIN = 6     # 'home_by_6_plus' / 'away_by_6_plus'
+
+
+def line_name(line: float) -> str:
+    """Handicap/total line as a key fragment: -1.25 -> 'minus_1_25', 0.5 -> 'plus_0_5', 0 -> '0'"""
+    if line == 0:
+        return '0'
+    return f"{'minus' if line < 0 else 'plus'}_{abs(line):g}".replace('.', '_')
+
+
+def _asian_handicap_weights(margin: np.ndarray, line: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Win/lose weights for a side whose goal margin is 'margin' and who gets 'line' goals"""
+    # Quarter lines are settled as half the stake on each neighbouring half/whole line
+    parts = (line,) if (line * 2).is_integer() else (line - 0.25, line + 0.25)
+    win = sum((margin + part > 0).astype(float) for part in parts) / len(parts)
+    lose = sum((margin + part < 0).astype(float) for part in parts) / len(parts)
+    return win, lose
+
+
+def catalogue(home: np.ndarray, away: np.ndarray) -> List[Tuple[str, str, np.ndarray, Optional[np.ndarray]]]:
+    """(group, market, win weights, lose weights or None) over goal grids from np.indices"""
+    total = home + away
+    margin = home - away
+    markets = []
+
+    # Double chance
+    markets += [
+        ('double_chance', '1x', home >= away, None),
+        ('double_chance', '12', home != away, None),
+        ('double_chance', 'x2', away >= home, None)
+    ]
+
+    # Asian handicap (line given to the named side)
+    for line in ASIAN_HANDICAP_LINES:
+        line = float(line)
+        for side, side_margin in (('home', margin), ('away', -margin)):
+            win, lose = _asian_handicap_weights(side_margin, line)
+            markets.append(('asian_handicap', f"{side}_{line_name(line)}", win, lose))
+
+    # Team totals
+    for side, goals in (('home', home), ('away', away)):
+        for line in TEAM_TOTAL_LINES:
+            suffix = str(line).replace('.', '_')
+            markets.append(('team_totals', f"{side}_over_{suffix}", goals > line, None))
+            markets.append(('team_totals', f"{side}_under_{suffix}", goals < line, None))
+
+    # Exact score
+    for h in range(MAX_EXACT_SCORE + 1):
+        for a in range(MAX_EXACT_SCORE + 1):
+            markets.append(('exact_score', f"{h}_{a}", (home == h) & (away == a), None))
+    markets.append(('exact_score', 'other', (home > MAX_EXACT_SCORE) | (away > MAX_EXACT_SCORE), None))
+
+    # Winning margin
+    for side, side_margin in (('home', margin), ('away', -margin)):
+        for goals in range(1, MAX_WINNING_MARGIN):
+            markets.append(('winning_margin', f"{side}_by_{goals}", side_margin == goals, None))
+        markets.append(('winning_margin', f"{side}_by_{MAX_WINNING_MARGIN}_plus",
+                        side_margin >= MAX_WINNING_MARGIN, None))
+    markets.append(('winning_margin', 'draw', margin == 0, None))
+
+    # Odd/even total goals, clean sheets, win to nil
+    markets += [
+        ('odd_even', 'odd', total % 2 == 1, None),
+        ('odd_even', 'even', total % 2 == 0, None),
+        ('clean_sheet', 'home', away == 0, None),
+        ('clean_sheet', 'away', home == 0, None),
+        ('win_to_nil', 'home', (home > away) & (away == 0), None),
+        ('win_to_nil', 'away', (away > home) & (home == 0), None)
+    ]
+    return markets
+
+
+def catalogue_keys() -> List[Tuple[str, str]]:
+    """(group, market) of every catalogue market, in catalogue order (independent of grid size)"""
+    home, away = np.indices((1, 1))
+    return [(group, market) for group, market, _, _ in catalogue(home, away)]
+
+
+class MarketRegistry:
+    """Catalogue markets compiled into stacked weight matrices for one score-matrix size"""
+
+    def __init__(self, size: int):
+        self.size = size
+        home, away = np.indices((size, size))
+        entries = catalogue(home, away)
+        self.keys = [(group, market) for group, market, _, _ in entries]
+        self.groups = list(dict.fromkeys(group for group, _ in self.keys))
+        # (cells x markets) so pricing is matrix @ weights
+        self.win_weights = np.stack([np.asarray(win, dtype=np.float64).ravel()
+                                     for _, _, win, _ in entries], axis=1)
+        self.lose_weights = np.stack([
+            (1.0 - np.asarray(win, dtype=np.float64) if lose is None else np.asarray(lose, dtype=np.float64)).ravel()
+            for _, _, win, lose in entries
+        ], axis=1)
+
+    def price(self, matrices: np.ndarray) -> np.ndarray:
+        """Fair probabilities of every market for a (size x size) matrix or a (fixtures x size x size) stack"""
+        flat = matrices.reshape(matrices.shape[:-2] + (self.size * self.size,))
+        win = flat @ self.win_weights
+        lose = flat @ self.lose_weights
+        stake = win + lose
+        return np.divide(win, stake, out=np.zeros_like(win), where=stake > 0)
+
+    def nested(self, prices: np.ndarray) -> Dict[str, Dict[str, float]]:
+        """One fixture's prices as {group: {market: probability}}"""
+        probabilities = {group: {} for group in self.groups}
+        for (group, market), prob in zip(self.keys, prices.tolist()):
+            probabilities[group][market] = prob
+        return probabilities
+
+    def probabilities(self, matrix: np.ndarray) -> Dict[str, Dict[str, float]]:
+        """Every catalogue market for one full-time score matrix"""
+        return self.nested(self.price(matrix))
+
+
+@lru_cache(maxsize=4)
+def market_registry(size: int) -> MarketRegistry:
+    """Compiled registry for score matrices of the given size (built once per size)"""
+    return MarketRegistry(size)
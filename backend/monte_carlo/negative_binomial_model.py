@@ -1,111 +1,177 @@
+import threading
+from collections import OrderedDict
 import numpy as np
-from scipy.stats import nbinom
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Sequence, Tuple
+from .random_streams import make_generator
+from .score_matrix import (
+    MAX_GOALS, outcome_probabilities, total_goals_distribution,
+    over_probability, both_teams_score_probability, expected_goals, score_histogram
+)
+
+DEFAULT_PARAMS = (2.0, 0.5)   # (n, p) used when there is no history at all
+POISSON_LIMIT_N = 1e6         # n for under-dispersed data: variance = mean + mean^2/n, i.e. Poisson
+MLE_BISECTION_STEPS = 50      # Halvings of the log(n) bracket [1e-4, POISSON_LIMIT_N]
+
+
+def nbinom_pmf(n: float, p: float, max_goals: int = MAX_GOALS) -> np.ndarray:
+    """
+    Negative binomial pmf for 0..max_goals goals, last bin holding the tail.
+    Recurrence p(k) = p(k-1) * (k-1+n)/k * (1-p), started in log space so a
+    Poisson-limit n does not underflow.
+    """
+    k = np.arange(1, max_goals + 1)
+    ratios = np.empty(max_goals + 1)
+    ratios[0] = np.exp(n * np.log(p))
+    ratios[1:] = (k - 1 + n) / k * (1 - p)
+    pmf = np.cumprod(ratios)
+
+    # Fold the truncated tail into the last bin
+    pmf[-1] += max(0.0, 1.0 - pmf.sum())
+    return pmf
+
+
+def fit_negative_binomial(samples: Sequence[Sequence[int]]) -> np.ndarray:
+    """
+    Maximum-likelihood (n, p) for many goal samples at once; returns shape (len(samples), 2).
+
+    For a given n the MLE mean is the sample mean, so only the profile score
+        sum_j T_j / (n + j) + N * log(n / (n + mean)) = 0,   T_j = #{x_i > j}
+    has to be solved; it is positive below the root and negative above, so all
+    samples are bisected together on log(n). The score has no root when the
+    variance does not exceed the mean, and those samples get the Poisson limit.
+    Empty samples get DEFAULT_PARAMS.
+    """
+    sizes = np.array([len(sample) for sample in samples])
+    max_goals = max((int(max(sample)) for sample in samples if len(sample)), default=0)
+    counts = np.zeros((len(samples), max_goals + 1))
+    for row, sample in enumerate(samples):
+        if len(sample):
+            counts[row] = np.bincount(np.asarray(sample, dtype=np.int64), minlength=max_goals + 1)
+
+    goals = np.arange(max_goals + 1)
+    observations = np.maximum(sizes, 1)
+    mean = counts @ goals / observations
+    variance = counts @ goals ** 2 / observations - mean ** 2
+    exceed = counts[:, ::-1].cumsum(axis=1)[:, ::-1][:, 1:]  # T_j for j = 0..max_goals-1
+    offsets = goals[:-1]
+
+    low = np.full(len(samples), np.log(1e-4))
+    high = np.full(len(samples), np.log(POISSON_LIMIT_N))
+    for _ in range(MLE_BISECTION_STEPS):
+        mid = (low + high) / 2
+        n = np.exp(mid)[:, None]
+        score = (exceed / (n + offsets)).sum(axis=1) + sizes * np.log(n[:, 0] / (n[:, 0] + np.maximum(mean, 1e-12)))
+        below_root = score > 0
+        low = np.where(below_root, mid, low)
+        high = np.where(below_root, high, mid)
+
+    n = np.exp((low + high) / 2)
+    n = np.where(variance > mean, n, POISSON_LIMIT_N)
+    p = n / (n + mean)
+    return np.where((sizes > 0)[:, None], np.column_stack([n, p]), DEFAULT_PARAMS)
+
+
+def fit_match_params(historical_data: List[Dict]) -> Tuple[Tuple[float, float], Tuple[float, float]]:
+    """Home and away (n, p) from historical match rows, fitted in one vectorized call"""
+    if not historical_data:
+        return DEFAULT_PARAMS, DEFAULT_PARAMS
+    
+    home_goals = [match['home_score_ft'] for match in historical_data]
+    away_goals = [match['away_score_ft'] for match in historical_data]
+    
+    (home_n, home_p), (away_n, away_p) = fit_negative_binomial([home_goals, away_goals])
+    return (float(home_n), float(home_p)), (float(away_n), float(away_p))
+
 
 class NegativeBinomialModel:
     """Negative Binomial distribution model for Monte Carlo football simulations"""
     
     def __init__(self, home_params: Tuple[float, float], away_params: Tuple[float, float],
-                 home_boost: float = 0.0, away_boost: float = 0.0):
+                 home_boost: float = 0.0, away_boost: float = 0.0,
+                 seed: Optional[int] = None):
         # Negative binomial parameters: (n, p) where n is number of failures, p is success probability
         self.home_n, self.home_p = home_params
         self.away_n, self.away_p = away_params
         self.home_boost = home_boost
         self.away_boost = away_boost
+        self.rng = make_generator(seed)
     
-    def simulate_match(self, iterations: int = 10000) -> Dict:
-        """Run Monte Carlo simulation using Negative Binomial distribution"""
-        
-        # Apply boosts by adjusting the mean (which affects p parameter)
+    def boosted_params(self) -> Tuple[Tuple[float, float], Tuple[float, float]]:
+        """(n, p) per side after the boosts shift the means (n, and so the dispersion, is kept)"""
         home_mean = self.home_n * (1 - self.home_p) / self.home_p + self.home_boost
         away_mean = self.away_n * (1 - self.away_p) / self.away_p + self.away_boost
+        return ((self.home_n, self.home_n / (self.home_n + max(0.1, home_mean))),
+                (self.away_n, self.away_n / (self.away_n + max(0.1, away_mean))))
+    
+    def simulate_match(self, iterations: int = 10000, exact: bool = False) -> Dict:
+        """Run Monte Carlo simulation using Negative Binomial distribution (exact=True prices off the pmfs)"""
         
-        # Recalculate p parameters with boosts
-        home_p_boosted = self.home_n / (self.home_n + max(0.1, home_mean))
-        away_p_boosted = self.away_n / (self.away_n + max(0.1, away_mean))
+        if exact:
+            return self.price_exact()
         
-        # Generate random scores
-        home_scores = nbinom.rvs(self.home_n, home_p_boosted, size=iterations)
-        away_scores = nbinom.rvs(self.away_n, away_p_boosted, size=iterations)
+        home_params, away_params = self.boosted_params()
         
-        # Calculate outcomes
-        home_wins = np.sum(home_scores > away_scores)
-        draws = np.sum(home_scores == away_scores)
-        away_wins = np.sum(home_scores < away_scores)
+        # Generate random scores (numpy uses the same (n, p) parametrisation as scipy's nbinom)
+        home_scores = self.rng.negative_binomial(*home_params, size=iterations)
+        away_scores = self.rng.negative_binomial(*away_params, size=iterations)
         
-        # Goal totals for over/under markets
-        total_goals = home_scores + away_scores
+        # One pass over the draws; every market is then read off the sampled score matrix
+        matrix = score_histogram(home_scores, away_scores) / iterations
+        return self.results_from_matrix(matrix, home_params, away_params)
+    
+    def price_exact(self) -> Dict:
+        """
+        Same results structure as simulate_match, from the exact joint score
+        distribution (outer product of the two pmfs; totals are its anti-diagonal
+        sums, i.e. the convolution of the pmfs). No sampling noise, no RNG calls.
+        """
+        home_params, away_params = self.boosted_params()
+        matrix = np.outer(nbinom_pmf(*home_params), nbinom_pmf(*away_params))
+        return self.results_from_matrix(matrix, home_params, away_params)
+    
+    @staticmethod
+    def results_from_matrix(matrix: np.ndarray, home_params: Tuple[float, float],
+                            away_params: Tuple[float, float]) -> Dict:
+        """Market probabilities and goal statistics from a (home x away) score distribution"""
+        home, draw, away = outcome_probabilities(matrix)
+        totals = total_goals_distribution(matrix)
+        both_score = both_teams_score_probability(matrix)
+        avg_home, avg_away = expected_goals(matrix)
         
-        # Both teams score
-        both_score = np.sum((home_scores > 0) & (away_scores > 0))
+        over_under = {}
+        for line in ('25', '35', '45', '55'):
+            over = over_probability(totals, int(line) / 10)
+            over_under[f'over_{line}'] = over
+            over_under[f'under_{line}'] = 1.0 - over
         
-        # Convert to probabilities
-        results = {
+        return {
             '1x2': {
-                'home': home_wins / iterations,
-                'draw': draws / iterations,
-                'away': away_wins / iterations
-            },
-            'over_under': {
-                'over_25': np.sum(total_goals > 2.5) / iterations,
-                'under_25': np.sum(total_goals < 2.5) / iterations,
-                'over_35': np.sum(total_goals > 3.5) / iterations,
-                'under_35': np.sum(total_goals < 3.5) / iterations,
-                'over_45': np.sum(total_goals > 4.5) / iterations,
-                'under_45': np.sum(total_goals < 4.5) / iterations,
-                'over_55': np.sum(total_goals > 5.5) / iterations,
-                'under_55': np.sum(total_goals < 5.5) / iterations
+                'home': home,
+                'draw': draw,
+                'away': away
             },
+            'over_under': over_under,
             'both_teams_score': {
-                'yes': both_score / iterations,
-                'no': (iterations - both_score) / iterations
+                'yes': both_score,
+                'no': 1.0 - both_score
             },
             'statistics': {
-                'avg_home_goals': np.mean(home_scores),
-                'avg_away_goals': np.mean(away_scores),
-                'avg_total_goals': np.mean(total_goals),
-                'home_params': (self.home_n, home_p_boosted),
-                'away_params': (self.away_n, away_p_boosted)
+                'avg_home_goals': avg_home,
+                'avg_away_goals': avg_away,
+                'avg_total_goals': avg_home + avg_away,
+                'home_params': home_params,
+                'away_params': away_params
             }
         }
-        
-        return results
     
     def estimate_parameters_from_data(self, goals_data: List[int]) -> Tuple[float, float]:
-        """Estimate negative binomial parameters from historical goal data using method of moments"""
-        if not goals_data:
-            return 2.0, 0.5  # Default parameters
-        
-        goals_array = np.array(goals_data)
-        mean_goals = np.mean(goals_array)
-        var_goals = np.var(goals_array)
-        
-        # Avoid division by zero and ensure variance > mean for negative binomial
-        if var_goals <= mean_goals or mean_goals <= 0:
-            return 2.0, 0.5
-        
-        # Method of moments estimation
-        p = mean_goals / var_goals
-        n = mean_goals * p / (1 - p)
-        
-        # Ensure valid parameters
-        p = max(0.01, min(0.99, p))
-        n = max(0.1, n)
-        
-        return n, p
+        """Maximum-likelihood negative binomial parameters (Poisson limit when variance <= mean)"""
+        n, p = fit_negative_binomial([goals_data])[0]
+        return float(n), float(p)
     
     def calculate_expected_goals_and_params(self, historical_data: List[Dict]) -> Tuple[Tuple[float, float], Tuple[float, float]]:
         """Calculate expected goals and estimate parameters from historical match data"""
-        if not historical_data:
-            return (2.0, 0.5), (2.0, 0.5)
-        
-        home_goals = [match['home_score_ft'] for match in historical_data]
-        away_goals = [match['away_score_ft'] for match in historical_data]
-        
-        home_params = self.estimate_parameters_from_data(home_goals)
-        away_params = self.estimate_parameters_from_data(away_goals)
-        
-        return home_params, away_params
+        return fit_match_params(historical_data)
     
     @staticmethod
     def probability_to_odds(probability: float) -> float:
@@ -152,4 +218,60 @@ class NegativeBinomialModel:
         if var_goals > mean_goals * 1.2:
             return "negative_binomial"
         else:
-            return "poisson"
\ No newline at end of file
+            return "poisson"
+
+class NegativeBinomialParameterStore:
+    """
+    LRU cache of fitted (home_params, away_params) keyed by the history they came from.
+    
+    The key is the (id, home goals, away goals) of every match used, so a new or
+    corrected result changes the key and the fit is redone; repeat requests for a
+    fixture reuse the stored parameters instead of re-estimating.
+    """
+    
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, historical_data: List[Dict]) -> Tuple[Tuple[float, float], Tuple[float, float]]:
+        """(home_params, away_params) for a list of historical match rows, fitting them on a miss"""
+        key = tuple((match.get('id'), match['home_score_ft'], match['away_score_ft']) for match in historical_data)
+        
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+        
+        entry = fit_match_params(historical_data)
+        
+        with self._lock:
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+    
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters and current size"""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'size': len(self._entries),
+            'max_entries': self.max_entries
+        }
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+
+# Process-wide store shared by the legacy engines (warm across requests in worker mode)
+default_parameter_store = NegativeBinomialParameterStore()
@@ -1,64 +1,74 @@
 import numpy as np
-from scipy.stats import poisson
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
+from .random_streams import make_generator
+from .score_matrix import (
+    default_cache, outcome_probabilities, total_goals_distribution,
+    over_probability, both_teams_score_probability, expected_goals, score_histogram
+)
 
 class PoissonModel:
     """Poisson distribution model for Monte Carlo football simulations"""
     
     def __init__(self, home_lambda: float, away_lambda: float, 
-                 home_boost: float = 0.0, away_boost: float = 0.0):
+                 home_boost: float = 0.0, away_boost: float = 0.0,
+                 seed: Optional[int] = None):
         self.home_lambda = max(0.1, home_lambda + home_boost)
         self.away_lambda = max(0.1, away_lambda + away_boost)
+        self.rng = make_generator(seed)
     
-    def simulate_match(self, iterations: int = 10000) -> Dict:
-        """Run Monte Carlo simulation using Poisson distribution"""
+    def simulate_match(self, iterations: int = 10000, exact: bool = False) -> Dict:
+        """Run Monte Carlo simulation using Poisson distribution (exact=True looks up the score matrix)"""
+        
+        if exact:
+            return self.price_exact()
         
         # Generate random scores
-        home_scores = poisson.rvs(self.home_lambda, size=iterations)
-        away_scores = poisson.rvs(self.away_lambda, size=iterations)
+        home_scores = self.rng.poisson(self.home_lambda, size=iterations)
+        away_scores = self.rng.poisson(self.away_lambda, size=iterations)
+        
+        # One pass over the draws; every market is then read off the sampled score matrix
+        matrix = score_histogram(home_scores, away_scores) / iterations
+        return self.results_from_matrix(matrix)
+    
+    def price_exact(self) -> Dict:
+        """Same results structure as simulate_match, read off the cached exact score matrix"""
         
-        # Calculate outcomes
-        home_wins = np.sum(home_scores > away_scores)
-        draws = np.sum(home_scores == away_scores)
-        away_wins = np.sum(home_scores < away_scores)
+        matrix, _ = default_cache.get(self.home_lambda, self.away_lambda)
+        return self.results_from_matrix(matrix)
+    
+    def results_from_matrix(self, matrix: np.ndarray) -> Dict:
+        """Market probabilities and goal statistics from a (home x away) score distribution"""
         
-        # Goal totals for over/under markets
-        total_goals = home_scores + away_scores
+        home, draw, away = outcome_probabilities(matrix)
+        totals = total_goals_distribution(matrix)
+        both_score = both_teams_score_probability(matrix)
+        avg_home, avg_away = expected_goals(matrix)
         
-        # Both teams score
-        both_score = np.sum((home_scores > 0) & (away_scores > 0))
+        over_under = {}
+        for line in ('25', '35', '45', '55'):
+            over = over_probability(totals, int(line) / 10)
+            over_under[f'over_{line}'] = over
+            over_under[f'under_{line}'] = 1.0 - over
         
-        # Convert to probabilities
-        results = {
+        return {
             '1x2': {
-                'home': home_wins / iterations,
-                'draw': draws / iterations,
-                'away': away_wins / iterations
-            },
-            'over_under': {
-                'over_25': np.sum(total_goals > 2.5) / iterations,
-                'under_25': np.sum(total_goals < 2.5) / iterations,
-                'over_35': np.sum(total_goals > 3.5) / iterations,
-                'under_35': np.sum(total_goals < 3.5) / iterations,
-                'over_45': np.sum(total_goals > 4.5) / iterations,
-                'under_45': np.sum(total_goals < 4.5) / iterations,
-                'over_55': np.sum(total_goals > 5.5) / iterations,
-                'under_55': np.sum(total_goals < 5.5) / iterations
+                'home': home,
+                'draw': draw,
+                'away': away
             },
+            'over_under': over_under,
             'both_teams_score': {
-                'yes': both_score / iterations,
-                'no': (iterations - both_score) / iterations
+                'yes': both_score,
+                'no': 1.0 - both_score
             },
             'statistics': {
-                'avg_home_goals': np.mean(home_scores),
-                'avg_away_goals': np.mean(away_scores),
-                'avg_total_goals': np.mean(total_goals),
+                'avg_home_goals': avg_home,
+                'avg_away_goals': avg_away,
+                'avg_total_goals': avg_home + avg_away,
                 'home_lambda': self.home_lambda,
                 'away_lambda': self.away_lambda
             }
         }
-        
-        return results
     
     def calculate_expected_goals(self, historical_data: List[Dict]) -> Tuple[float, float]:
         """Calculate expected goals from historical match data"""
@@ -0,0 +1,271 @@
+"""
+SCORE MATRIX - EXACT (CLOSED-FORM) MARKET PRICING
+
+With independent Poisson goals every market the calibrated engine prices is a
+sum over the joint score distribution. Building the (home x away) matrix once,
+truncated at MAX_GOALS, prices all of them in microseconds with zero sampling
+noise. The truncated tail mass is folded into the last row/column so every
+matrix sums to exactly 1.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+import numpy as np
+from typing import Dict, Optional, Tuple
+
+MAX_GOALS = 15  # Goals per team tracked explicitly (P(>15) is negligible for football lambdas)
+FIRST_HALF_SHARE = 0.45  # Share of goals scored in the first half
+HALF_MAX_GOALS = 9  # Goals per team per half tracked explicitly in joint half distributions
+
+
+def poisson_pmf(lam: float, max_goals: int = MAX_GOALS) -> np.ndarray:
+    """
+    Poisson pmf for 0..max_goals goals, last bin holding P(X >= max_goals).
+    Uses the recurrence p(k) = p(k-1) * lam / k, so no scipy is needed.
+    """
+    ratios = np.empty(max_goals + 1)
+    ratios[0] = np.exp(-lam)
+    ratios[1:] = lam / np.arange(1, max_goals + 1)
+    pmf = np.cumprod(ratios)
+
+    # Fold the truncated tail into the last bin
+    pmf[-1] += max(0.0, 1.0 - pmf.sum())
+    return pmf
+
+
+def score_matrix(home_lambda: float, away_lambda: float, max_goals: int = MAX_GOALS) -> np.ndarray:
+    """Joint score probabilities: matrix[h, a] = P(home scores h, away scores a)"""
+    return np.outer(poisson_pmf(home_lambda, max_goals), poisson_pmf(away_lambda, max_goals))
+
+
+def outcome_probabilities(matrix: np.ndarray) -> Tuple[float, float, float]:
+    """(home win, draw, away win) probabilities from a score matrix"""
+    home_win = float(np.tril(matrix, -1).sum())
+    draw = float(np.trace(matrix))
+    away_win = float(np.triu(matrix, 1).sum())
+    return home_win, draw, away_win
+
+
+def total_goals_distribution(matrix: np.ndarray) -> np.ndarray:
+    """P(total goals == n) for n = 0..2*max_goals (sums of the anti-diagonals)"""
+    size = matrix.shape[0] + matrix.shape[1] - 1
+    home_idx, away_idx = np.indices(matrix.shape)
+    return np.bincount((home_idx + away_idx).ravel(), weights=matrix.ravel(), minlength=size)
+
+
+def over_probability(total_distribution: np.ndarray, line: float) -> float:
+    """P(total goals > line) for a half-goal line such as 2.5"""
+    return float(total_distribution[int(np.floor(line)) + 1:].sum())
+
+
+def both_teams_score_probability(matrix: np.ndarray) -> float:
+    """P(home >= 1 and away >= 1)"""
+    return float(matrix[1:, 1:].sum())
+
+
+def half_joint(home_lambda: float, away_lambda: float, first_half_share: float = FIRST_HALF_SHARE,
+               max_goals: int = HALF_MAX_GOALS) -> np.ndarray:
+    """
+    joint[i, j, k, l] = P(first half i-j, second half k-l) for independent
+    Poisson goals in each half (the full-time score is the sum of the halves).
+    """
+    second_half_share = 1.0 - first_half_share
+    return np.einsum('i,j,k,l->ijkl',
+                     poisson_pmf(home_lambda * first_half_share, max_goals),
+                     poisson_pmf(away_lambda * first_half_share, max_goals),
+                     poisson_pmf(home_lambda * second_half_share, max_goals),
+                     poisson_pmf(away_lambda * second_half_share, max_goals))
+
+
+@lru_cache(maxsize=4)
+def _half_joint_codes(size: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Flat bin index of every joint-half cell in the full-time matrix, the HT/FT grid and the half-with-most-goals split"""
+    fh_home, fh_away, sh_home, sh_away = np.indices((size,) * 4)
+    ft_home, ft_away = fh_home + sh_home, fh_away + sh_away
+    full_time = np.minimum(ft_home, MAX_GOALS) * (MAX_GOALS + 1) + np.minimum(ft_away, MAX_GOALS)
+    # Outcome index: 0 home, 1 draw, 2 away
+    ht_ft = (1 - np.sign(fh_home - fh_away)) * 3 + (1 - np.sign(ft_home - ft_away))
+    # 0 first half has more goals, 1 equal, 2 second half
+    most_goals = 1 - np.sign((fh_home + fh_away) - (sh_home + sh_away))
+    return full_time.ravel(), ht_ft.ravel(), most_goals.ravel()
+
+
+def split_half_joint(joint: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Everything the markets need from a joint half distribution (probabilities
+    or counts): full-time, first-half and second-half score matrices, the 3x3
+    HT/FT outcome matrix (rows half-time, columns full-time; home, draw, away)
+    and [first half more goals, equal, second half more goals].
+    """
+    full_time_codes, ht_ft_codes, most_goals_codes = _half_joint_codes(joint.shape[0])
+    flat = joint.ravel()
+    return {
+        'full_time': np.bincount(full_time_codes, flat, (MAX_GOALS + 1) ** 2).reshape(MAX_GOALS + 1, MAX_GOALS + 1),
+        'first_half': joint.sum(axis=(2, 3)),
+        'second_half': joint.sum(axis=(0, 1)),
+        'ht_ft': np.bincount(ht_ft_codes, flat, 9).reshape(3, 3),
+        'half_most_goals': np.bincount(most_goals_codes, flat, 3)
+    }
+
+
+def histogram_codes(*goals: np.ndarray, size: int = MAX_GOALS + 1) -> np.ndarray:
+    """
+    Mixed-radix cell code of sampled goal arrays, first array most significant.
+    Inputs are overwritten; goals above size-1 land in the last bin, like the
+    folded tail of the exact matrices.
+    """
+    last = size - 1
+    codes = np.minimum(goals[0], last, out=goals[0])
+    for more in goals[1:]:
+        codes *= size
+        codes += np.minimum(more, last, out=more)
+    return codes
+
+
+def score_histogram(*goals: np.ndarray, size: int = MAX_GOALS + 1) -> np.ndarray:
+    """
+    Joint counts of sampled goal arrays in one bincount over their histogram_codes
+    (a single pass instead of one per market). Inputs are (iterations,) or
+    (fixtures x iterations) integer arrays and are overwritten. Two arrays at the
+    default size give counts shaped like score_matrix().
+    """
+    codes = histogram_codes(*goals, size=size)
+    cells = size ** len(goals)
+    if codes.ndim == 1:
+        return np.bincount(codes, minlength=cells).reshape((size,) * len(goals))
+    
+    fixtures = codes.shape[0]
+    codes += (np.arange(fixtures) * cells)[:, None]
+    return np.bincount(codes.ravel(), minlength=fixtures * cells).reshape((fixtures,) + (size,) * len(goals))
+
+
+def expected_goals(matrix: np.ndarray) -> Tuple[float, float]:
+    """Mean home and away goals implied by a score matrix"""
+    goals_home = np.arange(matrix.shape[0])
+    goals_away = np.arange(matrix.shape[1])
+    return float(matrix.sum(axis=1) @ goals_home), float(matrix.sum(axis=0) @ goals_away)
+
+
+class ScoreMatrixCache:
+    """
+    LRU cache of score matrices keyed by quantized lambdas.
+    
+    Two kinds of entry: 'score' holds the (full-time, first-half) matrices and
+    'halves' the second-half matrix, HT/FT grid and half-with-most-goals split of
+    the joint half distribution (split_half_joint output, not the 10^4-cell joint
+    itself). Lambdas are rounded to a grid (default 0.005) and entries are built
+    at the rounded values, so a cached entry does not depend on which request
+    filled it. The same lambda pairs recur constantly across re-runs and leagues,
+    so most lookups are hits. Optionally persists entries as .npz files in disk_dir.
+    """
+    
+    FIELDS = {
+        'score': ('full_time', 'first_half'),
+        'halves': ('second_half', 'ht_ft', 'half_most_goals')
+    }
+    
+    def __init__(self, grid: float = 0.005, max_entries: int = 4096,
+                 disk_dir: Optional[str] = None, max_goals: int = MAX_GOALS):
+        self.grid = grid
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.max_goals = max_goals
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+    
+    def quantize(self, lam: float):
+        """Grid index for a lambda (grid <= 0 disables quantization)"""
+        if self.grid <= 0:
+            return lam
+        return int(round(lam / self.grid))
+    
+    def get(self, home_lambda: float, away_lambda: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (full_time, first_half) score matrices, computing them on a miss"""
+        return self._lookup('score', home_lambda, away_lambda, lambda home_q, away_q: (
+            score_matrix(home_q, away_q, self.max_goals),
+            score_matrix(home_q * FIRST_HALF_SHARE, away_q * FIRST_HALF_SHARE, self.max_goals)
+        ))
+    
+    def get_halves(self, home_lambda: float, away_lambda: float) -> Dict[str, np.ndarray]:
+        """second_half / ht_ft / half_most_goals of the joint half distribution, computing them on a miss"""
+        def build(home_q, away_q):
+            parts = split_half_joint(half_joint(home_q, away_q))
+            return tuple(parts[name] for name in self.FIELDS['halves'])
+        return dict(zip(self.FIELDS['halves'], self._lookup('halves', home_lambda, away_lambda, build)))
+    
+    def _lookup(self, kind: str, home_lambda: float, away_lambda: float, build) -> Tuple[np.ndarray, ...]:
+        key = (kind, self.quantize(home_lambda), self.quantize(away_lambda))
+        
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+        
+        entry = self._load(key)
+        if entry is None:
+            entry = build(*((k * self.grid for k in key[1:]) if self.grid > 0 else key[1:]))
+            self._store(key, entry)
+        else:
+            self.disk_hits += 1
+        
+        # Cached matrices are shared between callers, so freeze them
+        for matrix in entry:
+            matrix.setflags(write=False)
+        
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+    
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters and current size"""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'disk_hits': self.disk_hits,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'size': len(self._entries),
+            'max_entries': self.max_entries,
+            'grid': self.grid
+        }
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.disk_hits = 0
+    
+    def _disk_path(self, key) -> str:
+        kind, home_key, away_key = key
+        goals = self.max_goals if kind == 'score' else HALF_MAX_GOALS
+        return os.path.join(self.disk_dir, f"{kind}_{goals}_{self.grid}_{home_key}_{away_key}.npz")
+    
+    def _load(self, key):
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            return tuple(data[name] for name in self.FIELDS[key[0]])
+    
+    def _store(self, key, entry):
+        if not self.disk_dir:
+            return
+        np.savez(self._disk_path(key), **dict(zip(self.FIELDS[key[0]], entry)))
+
+
+# Process-wide cache shared by the engines (warm across requests in worker mode)
+default_cache = ScoreMatrixCache()
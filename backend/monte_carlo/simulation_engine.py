@@ -1,58 +1,100 @@
 import json
 import sqlite3
-from typing import Dict, List, Optional
+import numpy as np
+from typing import Any, Dict, List, Optional
 from .poisson_model import PoissonModel
-from .negative_binomial_model import NegativeBinomialModel
+from .negative_binomial_model import NegativeBinomialModel, DEFAULT_PARAMS, default_parameter_store
+from .random_streams import resolve_seed
+from .market_ids import market_ids
+from db.sqlite_pool import get_pool
+from .stage_profile import stage, staged
 
 class SimulationEngine:
     """Main engine for running Monte Carlo simulations"""
     
+    # Most recent matches kept per match_type (None = all); the models only use the last 6 of each form list.
+    # prepare_historical_data still reports how many rows each match_type had before the cap.
+    HISTORY_LIMITS = {'home_home': 6, 'away_away': 6}
+    
+    # Only the columns the models and streak checks read. Branches: every home-team
+    # row at home (includes H2H), away-team rows on the road (minus that H2H), reverse H2H.
+    HISTORY_QUERY = """
+    WITH team_history AS (
+        SELECT id, home_team_id, away_team_id, home_score_ft, away_score_ft, match_type, match_date
+        FROM historical_matches
+        WHERE home_team_id = :home
+        UNION ALL
+        SELECT id, home_team_id, away_team_id, home_score_ft, away_score_ft, match_type, match_date
+        FROM historical_matches
+        WHERE away_team_id = :away AND home_team_id != :home
+        UNION ALL
+        SELECT id, home_team_id, away_team_id, home_score_ft, away_score_ft, match_type, match_date
+        FROM historical_matches
+        WHERE home_team_id = :away AND away_team_id = :home
+    ),
+    ranked AS (
+        SELECT *, ROW_NUMBER() OVER (PARTITION BY match_type ORDER BY match_date DESC, id DESC) AS type_rank,
+               COUNT(*) OVER (PARTITION BY match_type) AS type_total
+        FROM team_history
+    )
+    SELECT id, home_team_id, away_team_id, home_score_ft, away_score_ft, match_type, match_date, type_total
+    FROM ranked
+    WHERE type_rank <= CASE match_type
+        WHEN 'home_home' THEN coalesce(:home_home_limit, type_rank)
+        WHEN 'away_away' THEN coalesce(:away_away_limit, type_rank)
+        ELSE type_rank
+    END
+    ORDER BY match_type, type_rank
+    """
+    
     def __init__(self, db_path: str = "database/exodia.db"):
         self.db_path = db_path
+        # Shared, WAL-tuned connections (warm across calls and engines)
+        self.pool = get_pool(db_path)
+        # Fitted negative binomial parameters, keyed by the history they were fitted on
+        self.nb_parameters = default_parameter_store
+    
+    def close(self):
+        """Close the pool's idle connections"""
+        self.pool.close()
     
-    def prepare_historical_data(self, home_team_id: int, away_team_id: int) -> Dict[str, List[Dict]]:
-        """Fetch and organize historical data for both teams"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
+    def prepare_historical_data(self, home_team_id: int, away_team_id: int) -> Dict[str, Any]:
+        """
+        Fetch and organize historical data for both teams.
         
+        One UNION ALL query, each branch an index range scan on the covering
+        history indexes of schema.sql (home team's rows, away team's rows,
+        reverse H2H; older databases get them from init_db.py --migrate),
+        newest first, with the per-match_type caps in HISTORY_LIMITS applied in SQL.
+        'available_counts' holds each match_type's row count before the cap.
+        """
         historical_data = {
             'h2h': [],
             'home_home': [],
             'away_away': [],
             'home_away': [],
-            'away_home': []
+            'away_home': [],
+            'available_counts': {}
         }
         
-        # Fetch all relevant historical matches
-        query = """
-        SELECT hm.*, ht.name as home_team_name, at.name as away_team_name
-        FROM historical_matches hm
-        JOIN teams ht ON hm.home_team_id = ht.id
-        JOIN teams at ON hm.away_team_id = at.id
-        WHERE (
-            (hm.home_team_id = ? AND hm.away_team_id = ?) OR
-            (hm.home_team_id = ? AND hm.away_team_id = ?) OR
-            (hm.home_team_id = ?) OR
-            (hm.away_team_id = ?)
-        )
-        ORDER BY hm.match_date DESC
-        """
-        
-        cursor = conn.execute(query, (
-            home_team_id, away_team_id,  # H2H matches
-            away_team_id, home_team_id,  # H2H reverse
-            home_team_id,  # Home team matches
-            away_team_id   # Away team matches
-        ))
+        with stage('db_io'), self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = sqlite3.Row
+            rows = cursor.execute(self.HISTORY_QUERY, {
+                'home': home_team_id,
+                'away': away_team_id,
+                'home_home_limit': self.HISTORY_LIMITS['home_home'],
+                'away_away_limit': self.HISTORY_LIMITS['away_away']
+            }).fetchall()
         
-        for row in cursor.fetchall():
+        for row in rows:
             match_data = dict(row)
             match_type = match_data['match_type']
+            historical_data['available_counts'][match_type] = match_data.pop('type_total')
             
             if match_type in historical_data:
                 historical_data[match_type].append(match_data)
         
-        conn.close()
         return historical_data
     
     def calculate_boosts(self, historical_data: Dict, home_team_id: int, away_team_id: int) -> Dict[str, float]:
@@ -66,8 +108,8 @@ class SimulationEngine:
         }
         
         # Analyze unbeaten/losing streaks
-        home_recent = historical_data.get('home_home', [])[:6]
-        away_recent = historical_data.get('away_away', [])[:6]
+        home_recent = historical_data.get('home_home', [])
+        away_recent = historical_data.get('away_away', [])
         
         # Home team streak analysis
         if len(home_recent) >= 5:
@@ -129,8 +171,16 @@ class SimulationEngine:
     
     def run_simulation(self, home_team_id: int, away_team_id: int, 
                       distribution_type: str = "poisson", iterations: int = 10000,
-                      custom_boosts: Optional[Dict] = None) -> Dict:
-        """Run complete Monte Carlo simulation"""
+                      custom_boosts: Optional[Dict] = None,
+                      seed: Optional[int] = None,
+                      pricing_mode: str = "monte_carlo") -> Dict:
+        """
+        Run complete Monte Carlo simulation (seed echoed in metadata for replay).
+        pricing_mode="exact" prices the markets off the exact score distribution instead
+        (cached Poisson score matrix, or the negative binomial pmfs).
+        """
+        
+        seed = resolve_seed(seed)
         
         # Prepare historical data
         historical_data = self.prepare_historical_data(home_team_id, away_team_id)
@@ -143,39 +193,47 @@ class SimulationEngine:
         # Combine relevant historical data for parameter estimation
         combined_data = []
         combined_data.extend(historical_data.get('h2h', []))
-        combined_data.extend(historical_data.get('home_home', [])[:6])
-        combined_data.extend(historical_data.get('away_away', [])[:6])
+        combined_data.extend(historical_data.get('home_home', []))
+        combined_data.extend(historical_data.get('away_away', []))
         
         if distribution_type.lower() == "poisson":
-            model = PoissonModel(1.5, 1.5, boosts['home_boost'], boosts['away_boost'])
+            model = PoissonModel(1.5, 1.5, boosts['home_boost'], boosts['away_boost'], seed)
             if combined_data:
                 home_lambda, away_lambda = model.calculate_expected_goals(combined_data)
-                model = PoissonModel(home_lambda, away_lambda, boosts['home_boost'], boosts['away_boost'])
+                model = PoissonModel(home_lambda, away_lambda, boosts['home_boost'], boosts['away_boost'], seed)
         
         elif distribution_type.lower() == "negative_binomial":
-            nb_model = NegativeBinomialModel((2.0, 0.5), (2.0, 0.5), boosts['home_boost'], boosts['away_boost'])
-            if combined_data:
-                home_params, away_params = nb_model.calculate_expected_goals_and_params(combined_data)
-                model = NegativeBinomialModel(home_params, away_params, boosts['home_boost'], boosts['away_boost'])
-            else:
-                model = nb_model
+            params = self.nb_parameters.get(combined_data) if combined_data else (DEFAULT_PARAMS, DEFAULT_PARAMS)
+            model = NegativeBinomialModel(*params, boosts['home_boost'], boosts['away_boost'], seed)
         
         else:
             raise ValueError("Distribution type must be 'poisson' or 'negative_binomial'")
         
-        # Run simulation
-        simulation_results = model.simulate_match(iterations)
+        # Run simulation (the legacy models draw and count in one call)
+        with stage('rng_draw'):
+            if pricing_mode == "exact":
+                simulation_results = model.simulate_match(iterations, exact=True)
+            else:
+                pricing_mode = "monte_carlo"
+                simulation_results = model.simulate_match(iterations)
         true_odds = model.get_true_odds(simulation_results)
         
         # Add metadata
         simulation_results['metadata'] = {
             'distribution_type': distribution_type,
+            'pricing_mode': pricing_mode,
             'iterations': iterations,
+            'seed': seed,
             'boosts': boosts,
+            # Rows the models used (form lists capped by HISTORY_LIMITS) and rows on file
             'historical_data_counts': {
                 'h2h': len(historical_data.get('h2h', [])),
                 'home_home': len(historical_data.get('home_home', [])),
                 'away_away': len(historical_data.get('away_away', []))
+            },
+            'historical_data_available': {
+                match_type: historical_data.get('available_counts', {}).get(match_type, 0)
+                for match_type in ('h2h', 'home_home', 'away_away')
             }
         }
         
@@ -183,38 +241,90 @@ class SimulationEngine:
         
         return simulation_results
     
+    SIMULATION_INSERT = """
+    INSERT INTO simulations (
+        id, home_team_id, away_team_id, league_id, match_date, distribution_type, 
+        iterations, home_boost, away_boost, home_advantage, 
+        true_odds, value_bets
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """
+    
+    BOOKMAKER_ODDS_INSERT = """
+    INSERT INTO bookmaker_odds (
+        simulation_id, market_type, home_odds, draw_odds, away_odds,
+        over_odds, under_odds, yes_odds, no_odds
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """
+    
     def save_simulation(self, home_team_id: int, away_team_id: int,
                        league_id: int, match_date: str, distribution_type: str,
                        iterations: int, simulation_results: Dict, 
                        bookmaker_odds: Optional[Dict] = None,
                        custom_boosts: Optional[Dict] = None) -> int:
         """Save simulation results to database"""
-        conn = sqlite3.connect(self.db_path)
+        return self.save_simulations([{
+            'home_team_id': home_team_id,
+            'away_team_id': away_team_id,
+            'league_id': league_id,
+            'match_date': match_date,
+            'distribution_type': distribution_type,
+            'iterations': iterations,
+            'simulation_results': simulation_results,
+            'bookmaker_odds': bookmaker_odds,
+            'custom_boosts': custom_boosts
+        }])[0]
+    
+    def save_simulations(self, simulations: List[Dict]) -> List[int]:
+        """
+        Save many simulations and all their bookmaker odds in one transaction.
+        
+        Each entry takes the keyword arguments of save_simulation. Rows are
+        written with executemany under BEGIN IMMEDIATE, so ids can be assigned
+        up front (max(id)+1...) and are returned in input order. One fsync for a
+        whole backfill instead of one per simulation.
+        """
+        if not simulations:
+            return []
+        
+        simulation_rows = []
+        odds_rows = []
+        
+        with stage('db_io'), self.pool.connection() as conn, conn:  # Committed (or rolled back) on exit
+            # Take the write lock before reading max(id) so no other writer can claim our ids
+            conn.execute("BEGIN IMMEDIATE")
+            first_id = conn.execute("SELECT coalesce(max(id), 0) + 1 FROM simulations").fetchone()[0]
+            simulation_ids = list(range(first_id, first_id + len(simulations)))
+            
+            for simulation_id, simulation in zip(simulation_ids, simulations):
+                simulation_rows.append(self._simulation_row(simulation_id, **simulation))
+                if simulation.get('bookmaker_odds'):
+                    odds_rows.extend(self._bookmaker_odds_rows(simulation_id, simulation['bookmaker_odds']))
+            
+            conn.executemany(self.SIMULATION_INSERT, simulation_rows)
+            if odds_rows:
+                conn.executemany(self.BOOKMAKER_ODDS_INSERT, odds_rows)
+        
+        return simulation_ids
+    
+    def _simulation_row(self, simulation_id: int, home_team_id: int, away_team_id: int,
+                        league_id: int, match_date: str, distribution_type: str,
+                        iterations: int, simulation_results: Dict,
+                        bookmaker_odds: Optional[Dict] = None,
+                        custom_boosts: Optional[Dict] = None) -> tuple:
+        """Parameters for one simulations INSERT"""
         
         # Extract boost values from custom_boosts if provided
         home_boost = custom_boosts.get('custom_home_boost', 0) if custom_boosts else 0
         away_boost = custom_boosts.get('custom_away_boost', 0) if custom_boosts else 0
         home_advantage = custom_boosts.get('home_advantage', 0.20) if custom_boosts else 0.20
         
-        # Insert simulation
-        simulation_query = """
-        INSERT INTO simulations (
-            home_team_id, away_team_id, league_id, match_date, distribution_type, 
-            iterations, home_boost, away_boost, home_advantage, 
-            true_odds, value_bets
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """
-        
-        metadata = simulation_results.get('metadata', {})
-        boosts = metadata.get('boosts', {})
-        
         # Calculate value bets if bookmaker odds provided
         value_bets = {}
         if bookmaker_odds:
             value_bets = self.calculate_value_bets(simulation_results['true_odds'], bookmaker_odds)
         
-        cursor = conn.execute(simulation_query, (
-            home_team_id, away_team_id, league_id, match_date,
+        return (
+            simulation_id, home_team_id, away_team_id, league_id, match_date,
             distribution_type,
             iterations,
             home_boost,
@@ -222,64 +332,44 @@ class SimulationEngine:
             home_advantage,
             json.dumps(simulation_results['true_odds']),
             json.dumps(value_bets)
-        ))
-        
-        simulation_id = cursor.lastrowid
-        
-        # Save bookmaker odds if provided
-        if bookmaker_odds:
-            self.save_bookmaker_odds(simulation_id, bookmaker_odds, conn)
-        
-        conn.commit()
-        conn.close()
-        
-        return simulation_id
+        )
+    
+    @staticmethod
+    def _bookmaker_odds_rows(simulation_id: int, bookmaker_odds: Dict) -> List[tuple]:
+        """
+        Parameters for the bookmaker_odds INSERTs of one simulation (one row per
+        market_type such as '1x2' or 'ou25'). Accepts the frontend odds object
+        or the table layout; see market_ids.py.
+        """
+        registry = market_ids()
+        return registry.odds_rows_for(simulation_id, registry.feed_vector(bookmaker_odds))
     
     def save_bookmaker_odds(self, simulation_id: int, bookmaker_odds: Dict, conn):
-        """Save bookmaker odds to database"""
-        for market_type, odds in bookmaker_odds.items():
-            odds_query = """
-            INSERT INTO bookmaker_odds (
-                simulation_id, market_type, home_odds, draw_odds, away_odds,
-                over_odds, under_odds, yes_odds, no_odds
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """
-            
-            conn.execute(odds_query, (
-                simulation_id, market_type,
-                odds.get('home'), odds.get('draw'), odds.get('away'),
-                odds.get('over'), odds.get('under'),
-                odds.get('yes'), odds.get('no')
-            ))
+        """Save bookmaker odds to database (caller owns the transaction)"""
+        conn.executemany(self.BOOKMAKER_ODDS_INSERT, self._bookmaker_odds_rows(simulation_id, bookmaker_odds))
     
+    @staged('value_detection')
     def calculate_value_bets(self, true_odds: Dict, bookmaker_odds: Dict) -> Dict:
-        """Calculate value bets by comparing true odds with bookmaker odds"""
-        value_bets = {}
+        """Calculate value bets by comparing true odds with bookmaker odds (matched by market id)"""
+        registry = market_ids()
+        true_prices = registry.nested_vector(true_odds)
+        book_prices = registry.feed_vector(bookmaker_odds)
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            true_probability = np.where(true_prices > 0, 1 / true_prices, 0.0)
+        # Calculate edge: (True Probability × Bookmaker Odds) - 1
+        edge = true_probability * book_prices - 1
         
-        for market_category, true_market in true_odds.items():
-            if market_category in bookmaker_odds:
-                bookmaker_market = bookmaker_odds[market_category]
-                market_value_bets = {}
-                
-                for outcome, true_odd in true_market.items():
-                    if outcome in bookmaker_market and bookmaker_market[outcome]:
-                        bookmaker_odd = bookmaker_market[outcome]
-                        true_probability = 1 / true_odd if true_odd > 0 else 0
-                        
-                        # Calculate edge: (True Probability × Bookmaker Odds) - 1
-                        edge = (true_probability * bookmaker_odd) - 1
-                        
-                        if edge > 0.02:  # Minimum 2% edge threshold
-                            market_value_bets[outcome] = {
-                                'edge': round(edge * 100, 2),  # Convert to percentage
-                                'true_odds': true_odd,
-                                'bookmaker_odds': bookmaker_odd,
-                                'true_probability': round(true_probability * 100, 2),
-                                'confidence': self._get_confidence_level(edge)
-                            }
-                
-                if market_value_bets:
-                    value_bets[market_category] = market_value_bets
+        value_bets = {}
+        for market_id in np.flatnonzero(edge > 0.02):  # Minimum 2% edge threshold (NaN odds never qualify)
+            market_category, outcome = registry.nested_paths[market_id]
+            value_bets.setdefault(market_category, {})[outcome] = {
+                'edge': round(float(edge[market_id]) * 100, 2),  # Convert to percentage
+                'true_odds': float(true_prices[market_id]),
+                'bookmaker_odds': float(book_prices[market_id]),
+                'true_probability': round(float(true_probability[market_id]) * 100, 2),
+                'confidence': self._get_confidence_level(edge[market_id])
+            }
         
         return value_bets
     
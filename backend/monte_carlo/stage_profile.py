@@ -0,0 +1,206 @@
+"""
+STAGE PROFILE - PER-REQUEST WALL / CPU TIME BY PIPELINE STAGE
+
+Opt-in per request ("profile": true, or "memory" to also trace allocations)
+or for every request (--profile / EXODIA_PROFILE). While a request is
+profiled, the stage() blocks and @staged functions in the runner, the
+calibrated engine, the value detector and the legacy engine add their wall
+time (perf_counter) and CPU time (thread_time, so concurrent socket clients
+do not inflate each other) to the request's StageProfile; the report lands in
+the response's metadata['profile'] together with the process's peak RSS and,
+in memory mode, the tracemalloc peak while the request ran.
+
+Both peaks are process-wide, not per request. tracemalloc is started by the
+first memory-profiled request and stopped by the last one (reference counted,
+so concurrent socket clients do not switch tracing off under each other), and
+its peak is only reset when no other memory-profiled request is running: with
+overlapping requests each reports the peak since the earliest of them started.
+
+The active profile is a context variable: when none is active a stage costs
+one lookup. A stage re-entered while open (a detector method calling another)
+is counted once; different stages nested in each other are each counted in
+full. CPU time spent in process-pool workers (workers > 1) is not included,
+their wall time is (as 'rng_draw').
+"""
+
+import functools
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+try:
+    import resource  # POSIX only
+except ImportError:
+    resource = None
+
+STAGES = ('parse', 'rng_draw', 'reduction', 'calibration', 'value_detection', 'serialization', 'db_io')
+PROFILE_MODES = ('stages', 'memory')
+
+_active: ContextVar[Optional['StageProfile']] = ContextVar('stage_profile', default=None)
+_NO_STAGE = nullcontext()
+
+# Memory-profiled requests in flight, and whether tracemalloc was started for them
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+_tracing_started = False
+
+
+def _acquire_tracing():
+    global _tracing_users, _tracing_started
+    with _tracing_lock:
+        if _tracing_users == 0:
+            _tracing_started = not tracemalloc.is_tracing()  # Leave tracing started elsewhere alone
+            if _tracing_started:
+                tracemalloc.start()
+            else:
+                tracemalloc.reset_peak()
+        _tracing_users += 1
+
+
+def _release_tracing():
+    global _tracing_users, _tracing_started
+    with _tracing_lock:
+        _tracing_users -= 1
+        if _tracing_users == 0 and _tracing_started:
+            tracemalloc.stop()
+            _tracing_started = False
+
+
+class StageProfile:
+    """
+    Accumulated wall/CPU seconds and call counts per stage for one request.
+    With track_memory, tracemalloc runs until close(); its peak is process-wide.
+    """
+
+    def __init__(self, track_memory: bool = False, started: Optional[tuple] = None):
+        self.track_memory = track_memory
+        self.wall: Dict[str, float] = {}
+        self.cpu: Dict[str, float] = {}
+        self.calls: Dict[str, int] = {}
+        self._open: Dict[str, tuple] = {}  # Stages started with begin() / a stage() block
+        self._started = started or clock()  # (wall, cpu) the request's totals are measured from
+        self._tracing = track_memory
+        if track_memory:
+            _acquire_tracing()
+
+    def add(self, name: str, wall: float, cpu: float = 0.0):
+        self.wall[name] = self.wall.get(name, 0.0) + wall
+        self.cpu[name] = self.cpu.get(name, 0.0) + cpu
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    def begin(self, name: str) -> bool:
+        """Start timing a stage; False (and nothing to end) if it is already open"""
+        if name in self._open:
+            return False
+        self._open[name] = clock()
+        return True
+
+    def end(self, name: str):
+        (wall_start, cpu_start), (wall, cpu) = self._open.pop(name), clock()
+        self.add(name, wall - wall_start, cpu - cpu_start)
+
+    @contextmanager
+    def stage(self, name: str):
+        opened = self.begin(name)
+        try:
+            yield
+        finally:
+            if opened:
+                self.end(name)
+
+    def report(self) -> Dict[str, Any]:
+        """Close open stages and return the JSON-ready summary (milliseconds / MiB)"""
+        for name in list(self._open):
+            self.end(name)
+        wall, cpu = clock()
+
+        ordered = [name for name in STAGES if name in self.wall] + [name for name in self.wall if name not in STAGES]
+        report = {
+            'stages': {
+                name: {
+                    'wall_ms': round(self.wall[name] * 1000, 3),
+                    'cpu_ms': round(self.cpu[name] * 1000, 3),
+                    'calls': self.calls[name]
+                }
+                for name in ordered
+            },
+            'wall_ms': round((wall - self._started[0]) * 1000, 3),
+            'cpu_ms': round((cpu - self._started[1]) * 1000, 3),
+            'peak_rss_mb': peak_rss_mb()
+        }
+        if self.track_memory and tracemalloc.is_tracing():
+            report['tracemalloc_peak_mb'] = round(tracemalloc.get_traced_memory()[1] / 2 ** 20, 3)
+        return report
+
+    def close(self):
+        if self._tracing:
+            self._tracing = False
+            _release_tracing()
+
+
+def clock() -> tuple:
+    """(wall, thread CPU) seconds, the two clocks every stage is measured on"""
+    return time.perf_counter(), time.thread_time()
+
+
+def peak_rss_mb() -> Optional[float]:
+    """High-water resident set size of this process so far (None where unavailable)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # KiB on Linux, bytes on macOS
+    return round(peak / (2 ** 20 if sys.platform == 'darwin' else 2 ** 10), 3)
+
+
+def profile_mode(value) -> Optional[str]:
+    """Normalise a request's / the CLI's profile setting to None, 'stages' or 'memory'"""
+    if not value or value in ('0', 'false', 'off'):
+        return None
+    if value in (True, '1', 'true', 'on'):
+        return 'stages'
+    if value not in PROFILE_MODES:
+        raise ValueError(f"profile must be true, false or one of: {', '.join(PROFILE_MODES)}")
+    return value
+
+
+@contextmanager
+def profiling(mode: Optional[str], started: Optional[tuple] = None):
+    """Make a new StageProfile (or None when mode is None) the active one for the block"""
+    if mode is None:
+        yield None
+        return
+    profile = StageProfile(track_memory=mode == 'memory', started=started)
+    token = _active.set(profile)
+    try:
+        yield profile
+    finally:
+        _active.reset(token)
+        profile.close()
+
+
+def current() -> Optional[StageProfile]:
+    return _active.get()
+
+
+def stage(name: str):
+    """Time a block as part of stage 'name' of the active profile (no-op when not profiling)"""
+    profile = _active.get()
+    return _NO_STAGE if profile is None else profile.stage(name)
+
+
+def staged(name: str):
+    """Decorator: time every call of the function as stage 'name'"""
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            profile = _active.get()
+            if profile is None:
+                return function(*args, **kwargs)
+            with profile.stage(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
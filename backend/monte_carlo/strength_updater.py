@@ -0,0 +1,331 @@
+"""
+STRENGTH UPDATER - INCREMENTAL TEAM RATINGS AND HOME/AWAY FORM
+
+Keeps two kinds of state current as results land in historical_matches or
+match_results, at O(1) cost per result:
+- team_strength_ratings / team_strength_models: one stochastic gradient step
+  of the Poisson log-likelihood (the model fitted by dixon_coles.py) on the
+  two teams' attack/defence and the league's home advantage
+- team_home_performance / team_away_performance: goals for/against rolling
+  averages (mean of the first FORM_WINDOW matches, then an exponential
+  average of the same span), last-6 form string, streak and reliability
+
+sync() applies every row added since the last sync (watermarks per source
+table in team_strength_sync), oldest match first. historical_matches rows a
+league's batch fit already read (up to its fitted_through_id) only update
+form, so a fit followed by a sync does not count them twice. replay() rebuilds all of
+it from the full history in one in-memory pass and one write transaction;
+it replays from the league prior, so it replaces any batch fit
+(TeamStrengthStore.fit_league refits by maximum likelihood instead).
+"""
+
+import math
+import time
+from typing import Dict, List, Optional, Tuple
+from .team_strength import TeamStrengthStore
+
+TEAM_LEARNING_RATE = 0.04          # Attack/defence step per goal of surprise
+HOME_ADVANTAGE_LEARNING_RATE = 0.002
+FORM_WINDOW = 6                    # Matches averaged / kept in last_6_form
+PRIOR_MODEL = {                    # League with no fit yet: 1.5 home / 1.2 away goals
+    'intercept': math.log(1.2),
+    'home_advantage': math.log(1.5 / 1.2),
+    'rho': 0.0,
+    'matches': 0
+}
+
+SOURCES = ('historical_matches', 'match_results')
+
+# Rows of each source as (id, match_day, home_team_id, away_team_id, home_goals, away_goals, league_id);
+# league_id is NULL for cross-league historical matches (form only, no rating update)
+HISTORICAL_SYNC_QUERY = """
+SELECT hm.id, COALESCE(julianday(hm.match_date), julianday(hm.created_at)),
+       hm.home_team_id, hm.away_team_id, hm.home_score_ft, hm.away_score_ft,
+       CASE WHEN ht.league_id = at.league_id THEN ht.league_id END
+FROM historical_matches hm
+LEFT JOIN teams ht ON ht.id = hm.home_team_id
+LEFT JOIN teams at ON at.id = hm.away_team_id
+WHERE hm.id > ?
+  AND NOT EXISTS (
+      -- The same game stored again under another match_type counts once
+      SELECT 1 FROM historical_matches earlier
+      WHERE earlier.home_team_id = hm.home_team_id AND earlier.away_team_id = hm.away_team_id
+        AND earlier.match_date IS hm.match_date
+        AND earlier.home_score_ft = hm.home_score_ft AND earlier.away_score_ft = hm.away_score_ft
+        AND earlier.id < hm.id
+  )
+"""
+
+HISTORICAL_REPLAY_QUERY = """
+SELECT MIN(hm.id), COALESCE(julianday(hm.match_date), julianday(MIN(hm.created_at))),
+       hm.home_team_id, hm.away_team_id, hm.home_score_ft, hm.away_score_ft,
+       CASE WHEN ht.league_id = at.league_id THEN ht.league_id END
+FROM historical_matches hm
+LEFT JOIN teams ht ON ht.id = hm.home_team_id
+LEFT JOIN teams at ON at.id = hm.away_team_id
+GROUP BY hm.home_team_id, hm.away_team_id, hm.match_date, hm.home_score_ft, hm.away_score_ft
+"""
+
+RESULTS_QUERY = """
+SELECT mr.id, COALESCE(julianday(s.match_date), julianday(mr.result_entered_at)),
+       s.home_team_id, s.away_team_id, mr.home_score_ft, mr.away_score_ft, s.league_id
+FROM match_results mr
+JOIN simulations s ON s.id = mr.simulation_id
+WHERE mr.id > ?
+"""
+
+PERFORMANCE_TABLES = {'home': 'team_home_performance', 'away': 'team_away_performance'}
+PERFORMANCE_FIELDS = ('goals_for_avg', 'goals_against_avg', 'matches_played', 'last_6_form',
+                      'streak_type', 'streak_length', 'form_reliability')
+
+
+def rating_step(model: Dict, home: Tuple[float, float], away: Tuple[float, float],
+                home_goals: int, away_goals: int,
+                learning_rate: float = TEAM_LEARNING_RATE,
+                home_advantage_rate: float = HOME_ADVANTAGE_LEARNING_RATE
+                ) -> Tuple[Tuple[float, float], Tuple[float, float]]:
+    """
+    One gradient step on a single result. home/away are (attack, defence)
+    pairs; returns the updated pairs and updates model in place. The gradient
+    of the Poisson log-likelihood w.r.t. a log-rate is goals - lambda.
+    """
+    home_lambda = math.exp(model['intercept'] + model['home_advantage'] + home[0] + away[1])
+    away_lambda = math.exp(model['intercept'] + away[0] + home[1])
+    home_error = home_goals - home_lambda
+    away_error = away_goals - away_lambda
+
+    model['home_advantage'] += home_advantage_rate * home_error
+    model['matches'] += 1
+    return ((home[0] + learning_rate * home_error, home[1] + learning_rate * away_error),
+            (away[0] + learning_rate * away_error, away[1] + learning_rate * home_error))
+
+
+def performance_step(row: Optional[Dict], goals_for: int, goals_against: int,
+                     window: int = FORM_WINDOW) -> Dict:
+    """A team's home (or away) performance row after one more match"""
+    row = dict(row) if row else {'goals_for_avg': 0.0, 'goals_against_avg': 0.0, 'matches_played': 0,
+                                 'last_6_form': '', 'streak_type': None, 'streak_length': 0}
+    matches = (row['matches_played'] or 0) + 1
+    weight = 1.0 / min(matches, window)  # Running mean until the window is full, then an EMA
+    row['goals_for_avg'] = row['goals_for_avg'] + weight * (goals_for - row['goals_for_avg'])
+    row['goals_against_avg'] = row['goals_against_avg'] + weight * (goals_against - row['goals_against_avg'])
+    row['matches_played'] = matches
+
+    outcome = 'W' if goals_for > goals_against else 'D' if goals_for == goals_against else 'L'
+    row['last_6_form'] = ((row['last_6_form'] or '') + outcome)[-window:]
+
+    streak_type, streak_length = row['streak_type'], row['streak_length'] or 0
+    if outcome == 'L':
+        row['streak_type'] = 'losing'
+        row['streak_length'] = streak_length + 1 if streak_type == 'losing' else 1
+    elif outcome == 'W' and streak_type == 'winning':
+        row['streak_length'] = streak_length + 1
+    elif streak_type in ('winning', 'unbeaten'):
+        row['streak_type'] = 'unbeaten'
+        row['streak_length'] = streak_length + 1
+    else:
+        row['streak_type'] = 'winning' if outcome == 'W' else 'unbeaten'
+        row['streak_length'] = 1
+
+    row['form_reliability'] = min(matches / window, 1.0)
+    return row
+
+
+class StrengthUpdater:
+    """Applies new results to the stored ratings and performance tables"""
+
+    def __init__(self, store: TeamStrengthStore):
+        self.store = store
+        self.pool = store.pool
+
+    def fetch_results(self, conn, watermarks: Dict[str, int], replay: bool = False) -> List[tuple]:
+        """Results past the watermarks in match order, as (source, id, match_day, home, away, hg, ag, league_id)"""
+        historical = conn.execute(HISTORICAL_REPLAY_QUERY if replay else HISTORICAL_SYNC_QUERY,
+                                  () if replay else (watermarks['historical_matches'],)).fetchall()
+        results = conn.execute(RESULTS_QUERY, (watermarks['match_results'],)).fetchall()
+        rows = [('historical_matches',) + row for row in historical] + [('match_results',) + row for row in results]
+        # Undated rows (no match or entry date) go last, in insertion order
+        rows.sort(key=lambda row: (row[2] is None, row[2] or 0.0, row[0], row[1]))
+        return rows
+
+    @staticmethod
+    def fitted_through(conn) -> Dict[int, int]:
+        """Last historical_matches id read by each league's stored batch fit"""
+        return dict(conn.execute(
+            "SELECT league_id, fitted_through_id FROM team_strength_models WHERE fitted_through_id IS NOT NULL"
+        ).fetchall())
+
+    def watermarks(self, conn) -> Dict[str, int]:
+        stored = dict(conn.execute("SELECT source, last_id FROM team_strength_sync").fetchall())
+        return {source: stored.get(source, 0) for source in SOURCES}
+
+    @staticmethod
+    def _advance_watermarks(conn):
+        for source in SOURCES:
+            conn.execute(
+                "INSERT OR REPLACE INTO team_strength_sync (source, last_id) "
+                f"SELECT ?, COALESCE(MAX(id), 0) FROM {source}", (source,)
+            )
+
+    def sync(self) -> Dict:
+        """Apply every result added since the last sync; each costs a handful of keyed reads and writes"""
+        start_time = time.time()
+        leagues = set()
+        with self.pool.connection() as conn:
+            self.store.require_tables(conn)
+            with conn:
+                # Holding the write lock keeps new rows from slipping between the read and the watermark
+                conn.execute("BEGIN IMMEDIATE")
+                rows = self.fetch_results(conn, self.watermarks(conn))
+                fitted_through = self.fitted_through(conn)
+                already_fitted = 0
+                for source, row_id, _, home_id, away_id, home_goals, away_goals, league_id in rows:
+                    if source == 'historical_matches' and row_id <= fitted_through.get(league_id, 0):
+                        league_id = None  # In the league's batch fit already: form only
+                        already_fitted += 1
+                    self._apply(conn, home_id, away_id, home_goals, away_goals, league_id)
+                    leagues.add(league_id)
+                self._advance_watermarks(conn)
+
+        for league_id in leagues - {None}:
+            self.store.invalidate(league_id)
+        return {
+            'success': True,
+            'applied': len(rows),
+            'already_fitted': already_fitted,
+            'leagues': sorted(leagues - {None}),
+            'sync_time_seconds': round(time.time() - start_time, 3)
+        }
+
+    def _apply(self, conn, home_id: int, away_id: int, home_goals: int, away_goals: int,
+               league_id: Optional[int]):
+        """Update the two teams' ratings and performance rows for one result"""
+        if league_id is not None:
+            model = self._load_model(conn, league_id)
+            home, away = (self._load_rating(conn, league_id, team_id) for team_id in (home_id, away_id))
+            home, away = rating_step(model, home, away, home_goals, away_goals)
+            self._save_model(conn, league_id, model)
+            conn.executemany(
+                "INSERT OR REPLACE INTO team_strength_ratings (league_id, team_id, attack, defence) "
+                "VALUES (?, ?, ?, ?)",
+                [(league_id, home_id) + home, (league_id, away_id) + away]
+            )
+
+        for side, team_id, goals_for, goals_against in (('home', home_id, home_goals, away_goals),
+                                                         ('away', away_id, away_goals, home_goals)):
+            row = performance_step(self._load_performance(conn, side, team_id), goals_for, goals_against)
+            self._save_performance(conn, side, team_id, row)
+
+    @staticmethod
+    def _load_model(conn, league_id: int) -> Dict:
+        stored = conn.execute(
+            "SELECT intercept, home_advantage, rho, matches FROM team_strength_models WHERE league_id = ?",
+            (league_id,)
+        ).fetchone()
+        return dict(zip(('intercept', 'home_advantage', 'rho', 'matches'), stored)) if stored else dict(PRIOR_MODEL)
+
+    @staticmethod
+    def _save_model(conn, league_id: int, model: Dict):
+        updated = conn.execute(
+            "UPDATE team_strength_models SET home_advantage = ?, matches = ? WHERE league_id = ?",
+            (model['home_advantage'], model['matches'], league_id)
+        ).rowcount
+        if not updated:
+            conn.execute(
+                "INSERT INTO team_strength_models (league_id, intercept, home_advantage, rho, decay, matches) "
+                "VALUES (?, ?, ?, ?, 0, ?)",
+                (league_id, model['intercept'], model['home_advantage'], model['rho'], model['matches'])
+            )
+
+    @staticmethod
+    def _load_rating(conn, league_id: int, team_id: int) -> Tuple[float, float]:
+        stored = conn.execute(
+            "SELECT attack, defence FROM team_strength_ratings WHERE league_id = ? AND team_id = ?",
+            (league_id, team_id)
+        ).fetchone()
+        return tuple(stored) if stored else (0.0, 0.0)  # New teams start at the league average
+
+    @staticmethod
+    def _load_performance(conn, side: str, team_id: int) -> Optional[Dict]:
+        stored = conn.execute(
+            f"SELECT {', '.join(PERFORMANCE_FIELDS)} FROM {PERFORMANCE_TABLES[side]} WHERE team_id = ?",
+            (team_id,)
+        ).fetchone()
+        return dict(zip(PERFORMANCE_FIELDS, stored)) if stored else None
+
+    @staticmethod
+    def _save_performance(conn, side: str, team_id: int, row: Dict):
+        values = tuple(row[field] for field in PERFORMANCE_FIELDS)
+        table = PERFORMANCE_TABLES[side]
+        updated = conn.execute(
+            f"UPDATE {table} SET {', '.join(f'{field} = ?' for field in PERFORMANCE_FIELDS)}, "
+            "last_updated = CURRENT_TIMESTAMP WHERE team_id = ?",
+            values + (team_id,)
+        ).rowcount
+        if not updated:
+            conn.execute(
+                f"INSERT INTO {table} (team_id, {', '.join(PERFORMANCE_FIELDS)}) "
+                f"VALUES (?, {', '.join('?' * len(PERFORMANCE_FIELDS))})",
+                (team_id,) + values
+            )
+
+    def replay(self) -> Dict:
+        """
+        Rebuild all ratings and performance rows from the full history.
+        Same steps as sync(), but the state lives in dicts and is written back
+        with executemany in a single transaction.
+        """
+        start_time = time.time()
+        models: Dict[int, Dict] = {}
+        ratings: Dict[Tuple[int, int], Tuple[float, float]] = {}
+        performance: Dict[Tuple[str, int], Dict] = {}
+
+        with self.pool.connection() as conn:
+            self.store.require_tables(conn)
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                rows = self.fetch_results(conn, dict.fromkeys(SOURCES, 0), replay=True)
+
+                for _, _, _, home_id, away_id, home_goals, away_goals, league_id in rows:
+                    if league_id is not None:
+                        model = models.setdefault(league_id, dict(PRIOR_MODEL))
+                        home_key, away_key = (league_id, home_id), (league_id, away_id)
+                        ratings[home_key], ratings[away_key] = rating_step(
+                            model, ratings.get(home_key, (0.0, 0.0)), ratings.get(away_key, (0.0, 0.0)),
+                            home_goals, away_goals
+                        )
+                    performance[('home', home_id)] = performance_step(
+                        performance.get(('home', home_id)), home_goals, away_goals)
+                    performance[('away', away_id)] = performance_step(
+                        performance.get(('away', away_id)), away_goals, home_goals)
+
+                for league_id in models:
+                    conn.execute("DELETE FROM team_strength_ratings WHERE league_id = ?", (league_id,))
+                conn.executemany(
+                    "INSERT OR REPLACE INTO team_strength_models (league_id, intercept, home_advantage, rho, "
+                    "decay, matches) VALUES (?, ?, ?, ?, 0, ?)",
+                    [(league_id, model['intercept'], model['home_advantage'], model['rho'], model['matches'])
+                     for league_id, model in models.items()]
+                )
+                conn.executemany(
+                    "INSERT INTO team_strength_ratings (league_id, team_id, attack, defence) VALUES (?, ?, ?, ?)",
+                    [key + rating for key, rating in ratings.items()]
+                )
+                for side, table in PERFORMANCE_TABLES.items():
+                    conn.execute(f"DELETE FROM {table}")
+                    conn.executemany(
+                        f"INSERT INTO {table} (team_id, {', '.join(PERFORMANCE_FIELDS)}) "
+                        f"VALUES (?, {', '.join('?' * len(PERFORMANCE_FIELDS))})",
+                        [(team_id,) + tuple(row[field] for field in PERFORMANCE_FIELDS)
+                         for (row_side, team_id), row in performance.items() if row_side == side]
+                    )
+                self._advance_watermarks(conn)
+
+        self.store.invalidate()
+        return {
+            'success': True,
+            'applied': len(rows),
+            'leagues': sorted(models),
+            'teams': len({team_id for _, team_id in performance}),
+            'replay_time_seconds': round(time.time() - start_time, 3)
+        }
@@ -0,0 +1,180 @@
+"""
+TEAM STRENGTH STORE - FITTED DIXON-COLES PARAMETERS PER LEAGUE
+
+Fits a league from historical_matches (see dixon_coles.py) and caches the
+result in team_strength_models / team_strength_ratings (with the last
+historical_matches id it read, so the incremental updater does not apply
+those results a second time), so pricing requests
+that opt in (use_fitted_strengths) look a fixture's lambdas up instead of
+refitting. Refits warm-start from the stored parameters. Lookups only read
+(a database without the tables has no fits) and are cached in memory for
+cache_ttl seconds.
+"""
+
+import sqlite3
+import time
+import numpy as np
+from typing import Dict, Optional, Tuple
+from db.sqlite_pool import get_pool
+from .stage_profile import stage
+from .dixon_coles import DEFAULT_DECAY, fit_dixon_coles, time_decay_weights, expected_goals
+
+# Created by database/schema.sql (new databases) or init_db.py --migrate (existing ones)
+STRENGTH_TABLES = ('team_strength_models', 'team_strength_ratings', 'team_strength_sync')
+
+# Each match once (the same game can be stored under several match_types), both teams in the league
+LEAGUE_MATCHES_QUERY = """
+SELECT DISTINCT hm.home_team_id, hm.away_team_id, julianday(hm.match_date) AS match_day,
+       hm.home_score_ft, hm.away_score_ft
+FROM historical_matches hm
+JOIN teams ht ON ht.id = hm.home_team_id
+JOIN teams at ON at.id = hm.away_team_id
+WHERE ht.league_id = ? AND at.league_id = ?
+"""
+
+
+class TeamStrengthStore:
+    """Fits, persists and serves per-league Dixon-Coles parameters"""
+
+    def __init__(self, db_path: str, cache_ttl: float = 300.0):
+        self.db_path = db_path
+        self.pool = get_pool(db_path)
+        self.cache_ttl = cache_ttl
+        self._cache = {}  # league_id -> (loaded_at, fit or None)
+        self._tables_checked = False
+
+    def require_tables(self, conn):
+        """Raise before writing to a database whose schema predates the strength tables"""
+        if self._tables_checked:
+            return
+        placeholders = ', '.join('?' * len(STRENGTH_TABLES))
+        found = {row[0] for row in conn.execute(
+            f"SELECT name FROM sqlite_master WHERE type = 'table' AND name IN ({placeholders})", STRENGTH_TABLES
+        )}
+        missing = [table for table in STRENGTH_TABLES if table not in found]
+        if missing:
+            raise ValueError(f"Database {self.db_path} is missing {', '.join(missing)}; "
+                             "run init_db.py --migrate first")
+        self._tables_checked = True
+
+    def load_matches(self, league_id: int) -> Dict[str, np.ndarray]:
+        """
+        Full-time results of a league as arrays (match_day is a Julian day, NaN if undated),
+        plus 'through_id': the largest historical_matches id in the same read snapshot.
+        """
+        with self.pool.connection() as conn:
+            with conn:
+                conn.execute("BEGIN")  # One snapshot for the rows and the id they run up to
+                rows = conn.execute(LEAGUE_MATCHES_QUERY, (league_id, league_id)).fetchall()
+                through_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM historical_matches").fetchone()[0]
+        columns = np.array(rows, dtype=np.float64).reshape(-1, 5)
+        return {
+            'home_team_ids': columns[:, 0].astype(np.int64),
+            'away_team_ids': columns[:, 1].astype(np.int64),
+            'match_days': columns[:, 2],
+            'home_goals': columns[:, 3],
+            'away_goals': columns[:, 4],
+            'through_id': through_id
+        }
+
+    def fit_league(self, league_id: int, decay: float = DEFAULT_DECAY,
+                   reference_day: Optional[float] = None, warm_start: bool = True) -> Dict:
+        """
+        Fit every team of a league from its historical matches and store the result.
+        Matches are weighted by exp(-decay * age in days) relative to reference_day
+        (default: the most recent match); undated matches get full weight.
+        """
+        matches = self.load_matches(league_id)
+        if len(matches['home_goals']) == 0:
+            raise ValueError(f"No historical matches between teams of league {league_id}")
+
+        match_days = matches['match_days']
+        if reference_day is None:
+            reference_day = float(np.nanmax(match_days)) if not np.all(np.isnan(match_days)) else 0.0
+        weights = time_decay_weights(np.where(np.isnan(match_days), reference_day, match_days),
+                                     reference_day, decay)
+
+        team_ids = np.unique(np.concatenate([matches['home_team_ids'], matches['away_team_ids']]))
+        fit = fit_dixon_coles(
+            team_ids, matches['home_team_ids'], matches['away_team_ids'],
+            matches['home_goals'], matches['away_goals'], weights,
+            warm_start=self.load_fit(league_id, use_cache=False) if warm_start else None
+        )
+        fit['decay'] = decay
+        fit['reference_day'] = reference_day
+        fit['fitted_through_id'] = matches['through_id']
+        self.save_fit(league_id, fit)
+        return fit
+
+    def save_fit(self, league_id: int, fit: Dict):
+        """Replace a league's stored parameters in one transaction"""
+        with self.pool.connection() as conn:
+            self.require_tables(conn)
+            with conn:
+                conn.execute("DELETE FROM team_strength_ratings WHERE league_id = ?", (league_id,))
+                conn.execute("""
+                    INSERT OR REPLACE INTO team_strength_models (
+                        league_id, intercept, home_advantage, rho, decay, matches,
+                        log_likelihood, converged, reference_date, fitted_through_id, fitted_at
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, date(?), ?, CURRENT_TIMESTAMP)
+                """, (
+                    league_id, fit['intercept'], fit['home_advantage'], fit['rho'], fit['decay'],
+                    fit['matches'], fit['log_likelihood'], int(fit['converged']), fit.get('reference_day') or None,
+                    fit.get('fitted_through_id')
+                ))
+                conn.executemany(
+                    "INSERT INTO team_strength_ratings (league_id, team_id, attack, defence) VALUES (?, ?, ?, ?)",
+                    [(league_id, team_id, attack, defence)
+                     for team_id, attack, defence in zip(fit['team_ids'], fit['attack'], fit['defence'])]
+                )
+        self._cache[league_id] = (time.monotonic(), fit)
+
+    def load_fit(self, league_id: int, use_cache: bool = True) -> Optional[Dict]:
+        """Stored parameters of a league (None if it was never fitted or the database has no strength tables)"""
+        cached = self._cache.get(league_id)
+        if use_cache and cached is not None and time.monotonic() - cached[0] < self.cache_ttl:
+            return cached[1]
+
+        with stage('db_io'), self.pool.connection() as conn:
+            try:
+                model = conn.execute(
+                    "SELECT intercept, home_advantage, rho, decay, matches, log_likelihood, converged "
+                    "FROM team_strength_models WHERE league_id = ?", (league_id,)
+                ).fetchone()
+            except sqlite3.OperationalError:  # Schema without the strength tables: nothing fitted
+                model = None
+            ratings = conn.execute(
+                "SELECT team_id, attack, defence FROM team_strength_ratings WHERE league_id = ? ORDER BY team_id",
+                (league_id,)
+            ).fetchall() if model else []
+
+        fit = None
+        if model:
+            fit = {
+                'team_ids': [row[0] for row in ratings],
+                'attack': [row[1] for row in ratings],
+                'defence': [row[2] for row in ratings],
+                'intercept': model[0],
+                'home_advantage': model[1],
+                'rho': model[2],
+                'decay': model[3],
+                'matches': model[4],
+                'log_likelihood': model[5],
+                'converged': bool(model[6])
+            }
+        self._cache[league_id] = (time.monotonic(), fit)
+        return fit
+
+    def invalidate(self, league_id: Optional[int] = None):
+        """Drop cached parameters (of one league, or all) after they changed in the database"""
+        if league_id is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(league_id, None)
+
+    def fixture_lambdas(self, league_id: int, home_team_id: int, away_team_id: int) -> Optional[Tuple[float, float]]:
+        """Fitted (home_lambda, away_lambda) for a fixture, None if unavailable"""
+        fit = self.load_fit(league_id)
+        if fit is None:
+            return None
+        return expected_goals(fit, home_team_id, away_team_id)
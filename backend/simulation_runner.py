@@ -7,15 +7,52 @@ RESEARCH-BASED IMPROVEMENTS:
 - Calibration-optimized engine: 69.86% better returns vs accuracy-optimized
 - Target: <0.2012 RPS (Professional benchmark)
 - Kelly Criterion position sizing for optimal stakes
+
+USAGE:
+- One-shot:    python simulation_runner.py [input.json]   (JSON on stdin if no file)
+- Worker mode: python simulation_runner.py --serve        (NDJSON over stdin/stdout)
+- Socket mode: python simulation_runner.py --socket PATH  (NDJSON over a Unix socket)
+
+In worker/socket mode every request line is answered with exactly one
+response line carrying the same 'request_id', so callers can pipeline requests.
+A request with "output_format": "npy" | "msgpack" | "arrow" is answered with a
+JSON header line ({"request_id", "output_format", "content_length", ...})
+followed by exactly content_length bytes of columnar payload.
+
+Diagnostics go through logging to stderr (--log-level or EXODIA_LOG_LEVEL,
+default WARNING); stdout only ever carries the result. With --diagnostics N
+the last N requests' odds conversions are kept in memory and can be read with
+{"command": "diagnostics"} or written out with {"command": "dump_diagnostics", "path": NAME};
+NAME is relative to --diagnostics-dir and cannot leave it.
 """
 
+import os
+import stat
 import sys
+import time
+from import_profile import ImportProfiler
+
+# Installed before the remaining imports so --import-profile sees all of them
+import_profiler = ImportProfiler.start_if('--import-profile' in sys.argv)
+
 import json
+import argparse
+import socketserver
+import threading
 import traceback
-import time
+import logging
+from contextlib import ExitStack
 import numpy as np
 from monte_carlo.calibrated_simulation_engine import create_calibrated_engine, create_value_detector
-from monte_carlo.simulation_engine import SimulationEngine  # Fallback
+from monte_carlo.market_ids import market_ids
+from columnar_output import OUTPUT_FORMATS, encode_response
+from diagnostics import diagnostics
+from monte_carlo.stage_profile import PROFILE_MODES, StageProfile, clock as stage_clock, profile_mode, profiling
+from monte_carlo import stage_profile
+
+logger = logging.getLogger('exodia.runner')
+LOG_FORMAT = '%(asctime)s %(levelname)s %(name)s: %(message)s'
+LOG_LEVELS = ('DEBUG', 'INFO', 'WARNING', 'ERROR')
 
 # Custom JSON encoder to handle numpy types
 class NumpyEncoder(json.JSONEncoder):
@@ -28,34 +65,35 @@ class NumpyEncoder(json.JSONEncoder):
             return obj.tolist()
         elif isinstance(obj, np.bool_):
             return bool(obj)
+        elif isinstance(obj, StageProfile):
+            # Reported when the encoder reaches it (closing the 'serialization' stage)
+            return obj.report()
         return super(NumpyEncoder, self).default(obj)
 
-def run_calibrated_simulation(data):
+def calculate_match_lambdas(data, strengths=None):
     """
-    Run calibration-optimized simulation with professional-grade value detection.
-    RESEARCH BASIS: 69.86% better returns than accuracy-optimized models.
+    Calculate home/away lambda values from team performance and boosts.
+    Callers may supply 'home_lambda'/'away_lambda' base rates per fixture;
+    otherwise the league's fitted Dixon-Coles strengths are used when a
+    strength store is given and has the teams (their home advantage is
+    already fitted, so only the custom boosts are added on top).
     """
-    
-    print("[CALIBRATED] SIMULATION ENGINE v2.0")
-    print("   Research-validated: +69.86% returns vs accuracy-optimized")
-    print("   Target: <0.2012 RPS Professional Benchmark")
-    
-    # Extract parameters
-    home_team_id = data['home_team_id']
-    away_team_id = data['away_team_id'] 
-    league_id = data['league_id']
-    iterations = data['iterations']
     boost_settings = data.get('boost_settings', {})
-    bookmaker_odds = data.get('bookmaker_odds', {})
-    historical_data = data.get('historical_data', {})
-    match_date = data.get('match_date')
+    
+    fitted = None
+    if strengths is not None and 'home_lambda' not in data and 'away_lambda' not in data:
+        fitted = strengths.fixture_lambdas(data.get('league_id'), data['home_team_id'], data['away_team_id'])
     
     # Calculate lambda values from team performance and boosts
-    home_lambda = 1.5  # Base home scoring rate
-    away_lambda = 1.2  # Base away scoring rate
+    if fitted:
+        home_lambda, away_lambda = fitted
+        home_advantage = 0.0
+    else:
+        home_lambda = data.get('home_lambda', 1.5)  # Base home scoring rate
+        away_lambda = data.get('away_lambda', 1.2)  # Base away scoring rate
+        home_advantage = boost_settings.get('home_advantage', 0.2)
     
     # Apply boost adjustments (simplified for now)
-    home_advantage = boost_settings.get('home_advantage', 0.2)
     custom_home_boost = boost_settings.get('custom_home_boost', 0.0)
     custom_away_boost = boost_settings.get('custom_away_boost', 0.0)
     
@@ -63,80 +101,25 @@ def run_calibrated_simulation(data):
     away_lambda += custom_away_boost
     
     # Ensure positive lambda values
-    home_lambda = max(home_lambda, 0.1)
-    away_lambda = max(away_lambda, 0.1)
-    
-    # Create calibrated engine and value detector
-    engine = create_calibrated_engine()
-    value_detector = create_value_detector()
-    
-    # Prepare match context for enhanced calibration
-    match_context = {
-        'league_id': league_id,
+    return max(home_lambda, 0.1), max(away_lambda, 0.1)
+
+def build_match_context(data):
+    """Prepare match context for enhanced calibration"""
+    historical_data = data.get('historical_data', {})
+    return {
+        'league_id': data['league_id'],
         'historical_h2h_count': len(historical_data.get('h2h', [])),
         'recent_form_available': len(historical_data.get('home_home', [])) > 0,
         'fixture_congestion_known': False,  # Could be enhanced later
-        'bookmaker_odds_count': len(bookmaker_odds)
+        'bookmaker_odds_count': len(data.get('bookmaker_odds', {}))
     }
-    
-    # Run calibration-optimized simulation
-    simulation_results = engine.run_calibrated_simulation(
-        home_lambda=home_lambda,
-        away_lambda=away_lambda,
-        iterations=iterations,
-        match_context=match_context
-    )
-    
-    # Convert frontend bookmaker odds format to backend expected format
-    def convert_bookmaker_odds_format(frontend_odds):
-        """Convert frontend nested odds to backend flat format"""
-        flat_odds = {}
-        
-        if '1x2' in frontend_odds:
-            flat_odds['1x2_home'] = frontend_odds['1x2']['home']
-            flat_odds['1x2_draw'] = frontend_odds['1x2']['draw']
-            flat_odds['1x2_away'] = frontend_odds['1x2']['away']
-        
-        if 'over_under' in frontend_odds:
-            for market, odds_pair in frontend_odds['over_under'].items():
-                if market == 'ou25':
-                    flat_odds['goals_over_2_5'] = odds_pair['over']
-                    flat_odds['goals_under_2_5'] = odds_pair['under']
-                elif market == 'ou35':
-                    flat_odds['goals_over_3_5'] = odds_pair['over']
-                    flat_odds['goals_under_3_5'] = odds_pair['under']
-        
-        if 'both_teams_score' in frontend_odds:
-            flat_odds['btts_yes'] = frontend_odds['both_teams_score']['yes']
-            flat_odds['btts_no'] = frontend_odds['both_teams_score']['no']
-        
-        return flat_odds
-    
-    # Detect value opportunities with Kelly Criterion
-    value_opportunities = []
-    if bookmaker_odds:
-        print("[VALUE] Converting bookmaker odds format...")
-        print(f"[VALUE] Original odds: {bookmaker_odds}")
-        converted_odds = convert_bookmaker_odds_format(bookmaker_odds)
-        print(f"[VALUE] Converted odds: {converted_odds}")
-        print(f"[VALUE] Converted odds count: {len(converted_odds)}")
-        
-        # Write debugging to file for detailed analysis
-        import os
-        debug_file = os.path.join(os.path.dirname(__file__), 'debug_value_detection.txt')
-        with open(debug_file, 'w') as f:
-            f.write(f"Original odds: {bookmaker_odds}\n")
-            f.write(f"Converted odds: {converted_odds}\n")
-            f.write(f"Converted odds count: {len(converted_odds)}\n")
-        
-        print("[VALUE] Analyzing value opportunities...")
-        value_opportunities = value_detector.detect_value_opportunities(
-            simulation_results=simulation_results,
-            bookmaker_odds=converted_odds,
-            bankroll=1000  # Default bankroll for calculations
-        )
-    
-    # Convert value opportunities to frontend-compatible format
+
+def format_value_bets(value_opportunities):
+    """
+    Convert value opportunities to frontend-compatible format ({category: {outcome: bet}}).
+    Category and outcome are the market key split at its last underscore ('1x2_home' ->
+    '1x2' / 'home', 'btts_yes' -> 'btts' / 'yes'), the strings the Results components switch on.
+    """
     value_bets = {}
     for opportunity in value_opportunities:
         market = opportunity['market']
@@ -155,13 +138,15 @@ def run_calibrated_simulation(data):
             'confidence': 'High' if opportunity['edge_percentage'] > 10 else 
                         'Medium' if opportunity['edge_percentage'] > 5 else 'Low'
         }
-    
-    # Enhanced response with professional metrics + frontend compatibility
+    return value_bets
+
+def build_calibrated_response(data, simulation_results, value_opportunities):
+    """Enhanced response with professional metrics + frontend compatibility"""
     enhanced_results = {
         **simulation_results,
-        'value_bets': value_bets,  # Frontend-compatible format
-        'home_team': f"Team {home_team_id}",  # Add team names for display
-        'away_team': f"Team {away_team_id}"
+        'value_bets': format_value_bets(value_opportunities),  # Frontend-compatible format
+        'home_team': f"Team {data['home_team_id']}",  # Add team names for display
+        'away_team': f"Team {data['away_team_id']}"
     }
     
     return {
@@ -180,110 +165,628 @@ def run_calibrated_simulation(data):
         'metadata': simulation_results['metadata']
     }
 
+def run_calibrated_simulation(data, engine=None, value_detector=None, strengths=None):
+    """
+    Run calibration-optimized simulation with professional-grade value detection.
+    RESEARCH BASIS: 69.86% better returns than accuracy-optimized models.
+    
+    Pass a warm engine/value_detector (worker mode) to skip re-creating them,
+    and a TeamStrengthStore to price from fitted team strengths.
+    """
+    
+    logger.info("[CALIBRATED] SIMULATION ENGINE v2.0 (target: <0.2012 RPS professional benchmark)")
+    
+    # Extract parameters
+    iterations = data['iterations']
+    bookmaker_odds = data.get('bookmaker_odds', {})
+    
+    home_lambda, away_lambda = calculate_match_lambdas(data, strengths)
+    
+    # Create calibrated engine and value detector unless warm ones were supplied
+    if engine is None:
+        engine = create_calibrated_engine()
+    if value_detector is None:
+        value_detector = create_value_detector()
+    
+    if data.get('target_precision'):
+        # Convergence-driven: simulate until every market's standard error is small enough
+        simulation_results = engine.run_adaptive_simulation(
+            home_lambda=home_lambda,
+            away_lambda=away_lambda,
+            target_precision=data['target_precision'],
+            max_iterations=data.get('max_iterations', max(iterations, 1000000)),
+            match_context=build_match_context(data),
+            seed=data.get('seed')
+        )
+    elif data.get('pricing_mode') == 'exact':
+        # Closed-form pricing from the score matrix (optional Monte Carlo cross-check)
+        simulation_results = engine.run_exact_pricing(
+            home_lambda=home_lambda,
+            away_lambda=away_lambda,
+            match_context=build_match_context(data),
+            cross_check_iterations=data.get('cross_check_iterations', 0),
+            seed=data.get('seed')
+        )
+    elif data.get('variance_reduction'):
+        # Conditional / antithetic / control-variate estimator (reports effective sample size)
+        simulation_results = engine.run_variance_reduced_simulation(
+            home_lambda=home_lambda,
+            away_lambda=away_lambda,
+            iterations=iterations,
+            method=data['variance_reduction'],
+            match_context=build_match_context(data),
+            seed=data.get('seed')
+        )
+    else:
+        # Run calibration-optimized simulation
+        simulation_results = engine.run_calibrated_simulation(
+            home_lambda=home_lambda,
+            away_lambda=away_lambda,
+            iterations=iterations,
+            match_context=build_match_context(data),
+            seed=data.get('seed'),
+            workers=data.get('workers', 1)
+        )
+    
+    # Detect value opportunities with Kelly Criterion
+    value_opportunities = []
+    if bookmaker_odds:
+        odds = market_ids().feed_vector(bookmaker_odds)  # Indexed by market id
+        converted_odds = market_ids().flat(odds)
+        logger.debug("[VALUE] Original odds: %s", bookmaker_odds)
+        logger.debug("[VALUE] Converted odds (%d): %s", len(converted_odds), converted_odds)
+        
+        # Opt-in, in-memory record for later inspection (no disk I/O here)
+        diagnostics.record('value_detection', request_id=data.get('request_id'),
+                           original_odds=bookmaker_odds, converted_odds=converted_odds,
+                           converted_odds_count=len(converted_odds))
+        
+        value_opportunities = value_detector.detect_value_opportunities(
+            simulation_results=simulation_results,
+            bookmaker_odds=odds,
+            bankroll=1000  # Default bankroll for calculations
+        )
+    
+    return build_calibrated_response(data, simulation_results, value_opportunities)
+
+def run_calibrated_batch(data, engine=None, value_detector=None, strengths=None):
+    """
+    Price a whole fixture slate in one call.
+    
+    Expects {'fixtures': [...], 'iterations': N, 'pricing_mode': ...} (shared by
+    the whole slate); each fixture carries the same
+    fields as a single request (home/away ids, league, optional base lambdas,
+    boost_settings, bookmaker_odds, historical_data). All fixtures are drawn
+    in vectorized passes and per-fixture diagnostics are suppressed.
+    """
+    fixtures = data['fixtures']
+    iterations = data.get('iterations', 100000)
+    
+    if engine is None:
+        engine = create_calibrated_engine()
+    if value_detector is None:
+        value_detector = create_value_detector()
+    
+    lambdas = np.array([calculate_match_lambdas(fixture, strengths) for fixture in fixtures],
+                       dtype=np.float64).reshape(-1, 2)
+    match_contexts = [build_match_context(fixture) for fixture in fixtures]
+    
+    if data.get('pricing_mode') == 'exact':
+        batch_results = [
+            engine.run_exact_pricing(home_lambda, away_lambda, match_context, verbose=False)
+            for (home_lambda, away_lambda), match_context in zip(lambdas.tolist(), match_contexts)
+        ]
+    else:
+        batch_results = engine.run_calibrated_batch(
+            home_lambdas=lambdas[:, 0],
+            away_lambdas=lambdas[:, 1],
+            iterations=iterations,
+            match_contexts=match_contexts,
+            seed=data.get('seed')
+        )
+    
+    # Value detection for the whole slate in one vectorized pass
+    # (fixtures x markets x 1 bookmaker; fixtures without odds are all-NaN rows)
+    probabilities, calibration_factors, confidences, market_keys = value_detector.probability_matrix(batch_results)
+    odds = value_detector.odds_tensor(
+        [[market_ids().feed_vector(fixture.get('bookmaker_odds') or {})] for fixture in fixtures]
+    )
+    value_matrix = value_detector.detect_value_matrix(
+        probabilities, odds, calibration_factors, confidences,
+        bankroll=1000  # Default bankroll for calculations
+    )
+    
+    responses = []
+    for i, (fixture, simulation_results) in enumerate(zip(fixtures, batch_results)):
+        value_opportunities = value_detector.opportunities_from_matrix(
+            value_matrix, odds, probabilities, market_keys, i,
+            confidence=simulation_results['confidence_score'],
+            calibration_factor=simulation_results['calibration_factor'],
+            professional_grade=simulation_results.get('professional_grade', False)
+        )
+        response = build_calibrated_response(fixture, simulation_results, value_opportunities)
+        if 'fixture_id' in fixture:
+            response['fixture_id'] = fixture['fixture_id']
+        responses.append(response)
+    
+    return {
+        'success': True,
+        'batch': True,
+        'fixture_count': len(responses),
+        'results': responses,
+        'calibration_optimized': True,
+        'engine_version': '2.0_calibrated'
+    }
+
+def create_legacy_engine(db_path=None):
+    """
+    Fallback engine, imported on first use: the calibrated path never pays
+    for the legacy models or the SQLite layer at startup.
+    """
+    from monte_carlo.simulation_engine import SimulationEngine
+    return SimulationEngine(db_path or default_db_path())
+
+def create_strength_store(db_path=None):
+    """Fitted team-strength lookups (None when the database does not exist)"""
+    db_path = db_path or default_db_path()
+    if not os.path.exists(db_path):
+        return None
+    from monte_carlo.team_strength import TeamStrengthStore
+    return TeamStrengthStore(db_path)
+
+def fit_team_strengths(data, strengths):
+    """Refit one league's Dixon-Coles parameters (warm-started) and store them"""
+    if strengths is None:
+        raise ValueError('Team strength fitting needs the SQLite database')
+    start_time = time.time()
+    fit = strengths.fit_league(int(data['league_id']), **({'decay': data['decay']} if 'decay' in data else {}))
+    return {
+        'success': True,
+        'league_id': int(data['league_id']),
+        'teams': len(fit['team_ids']),
+        'matches': fit['matches'],
+        'home_advantage': fit['home_advantage'],
+        'rho': fit['rho'],
+        'log_likelihood': fit['log_likelihood'],
+        'converged': fit['converged'],
+        'fit_time_seconds': round(time.time() - start_time, 3)
+    }
+
+def update_team_strengths(strengths, replay=False):
+    """Apply newly entered results to ratings and form tables (replay=True rebuilds them from all history)"""
+    if strengths is None:
+        raise ValueError('Team strength updates need the SQLite database')
+    from monte_carlo.strength_updater import StrengthUpdater
+    updater = StrengthUpdater(strengths)
+    return updater.replay() if replay else updater.sync()
+
+def run_legacy_simulation(data, engine=None, db_path=None):
+    """Run the legacy Poisson/Negative Binomial engine (optionally with a warm engine)"""
+    if engine is None:
+        engine = create_legacy_engine(db_path)
+    
+    # Extract parameters from request
+    home_team_id = data['home_team_id']
+    away_team_id = data['away_team_id']
+    league_id = data['league_id']
+    distribution_type = data['distribution_type']
+    iterations = data['iterations']
+    boost_settings = data.get('boost_settings', {})
+    bookmaker_odds = data.get('bookmaker_odds')
+    match_date = data.get('match_date')
+    
+    # Prepare custom boosts from frontend settings
+    custom_boosts = {}
+    if boost_settings:
+        custom_boosts['home_advantage'] = boost_settings.get('home_advantage', 0.20)
+        custom_boosts['custom_home_boost'] = boost_settings.get('custom_home_boost', 0.0)
+        custom_boosts['custom_away_boost'] = boost_settings.get('custom_away_boost', 0.0)
+    
+    # Run simulation
+    simulation_results = engine.run_simulation(
+        home_team_id=home_team_id,
+        away_team_id=away_team_id,
+        distribution_type=distribution_type,
+        iterations=iterations,
+        custom_boosts=custom_boosts,
+        seed=data.get('seed'),
+        pricing_mode=data.get('pricing_mode', 'monte_carlo')
+    )
+    
+    # Save simulation to database if match_date provided
+    simulation_id = None
+    if match_date:
+        simulation_id = engine.save_simulation(
+            home_team_id=home_team_id,
+            away_team_id=away_team_id,
+            league_id=league_id,
+            match_date=match_date,
+            distribution_type=distribution_type,
+            iterations=iterations,
+            simulation_results=simulation_results,
+            bookmaker_odds=bookmaker_odds,
+            custom_boosts=custom_boosts
+        )
+    
+    # Prepare response
+    return {
+        'success': True,
+        'simulation_id': simulation_id,
+        'results': simulation_results,
+        'calibration_optimized': False,
+        'engine_version': '1.0_legacy'
+    }
+
+def default_db_path():
+    """Location of the shared SQLite database relative to this script"""
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(script_dir, '..', 'database', 'exodia.db')
+
+def error_response(e):
+    """Build the standard failure payload for an exception"""
+    if isinstance(e, json.JSONDecodeError):
+        return {
+            'success': False,
+            'error': f'Invalid JSON input: {str(e)}'
+        }
+    return {
+        'success': False,
+        'error': str(e),
+        'traceback': traceback.format_exc()  # Always include traceback for debugging
+    }
+
+def attach_profile(response, profile):
+    """
+    Put the request's stage profile last in response['metadata'] (a copy: the
+    calibrated results share their metadata dict). It is only turned into its
+    report by NumpyEncoder, so JSON serialization up to it is timed as well.
+    """
+    metadata = response.pop('metadata', None) or {}
+    response['metadata'] = {**metadata, 'profile': profile}
+
+class SimulationWorker:
+    """
+    Long-lived simulation worker.
+    Keeps the calibrated engine, value detector and a legacy engine
+    (backed by the shared SQLite pool) in memory between requests.
+    """
+    
+    def __init__(self, db_path=None, profile=None):
+        self.db_path = db_path or default_db_path()
+        self.profile = profile  # Default stage-profile mode for requests without a 'profile' field
+        self.calibrated_engine = create_calibrated_engine()
+        self.value_detector = create_value_detector()
+        self._legacy_engine = None
+        self._strength_store = None
+        # Requests share the engine instances, so run one request at a time
+        self.lock = threading.Lock()
+    
+    @property
+    def legacy_engine(self):
+        if self._legacy_engine is None:
+            self._legacy_engine = create_legacy_engine(self.db_path)
+        return self._legacy_engine
+    
+    @property
+    def strength_store(self):
+        if self._strength_store is None:
+            self._strength_store = create_strength_store(self.db_path)
+        return self._strength_store
+    
+    def process(self, data):
+        """Run one request dict and return its response dict (never raises)"""
+        start_time = time.time()
+        try:
+            with self.lock:
+                response = run_request(data, self)
+        except Exception as e:
+            response = error_response(e)
+        profile = stage_profile.current()
+        if profile is not None:
+            attach_profile(response, profile)
+        response['total_execution_time'] = round(time.time() - start_time, 3)
+        return response
+    
+    def handle_line(self, line):
+        """
+        Handle one NDJSON request line.
+        Returns (framed response bytes or None for blank input, shutdown requested).
+        """
+        line = line.strip()
+        if not line:
+            return None, False
+        
+        shutdown = False        
+        request_id = None
+        output_format = 'json'
+        with ExitStack() as scope:  # Holds the request's stage profile until its frame is encoded
+            try:
+                parse_clock = stage_clock()
+                data = json.loads(line)
+                parse_time = stage_clock()
+                if not isinstance(data, dict):
+                    raise ValueError('Request must be a JSON object')
+                request_id = data.get('request_id')
+                output_format = data.get('output_format', 'json')
+            
+                if data.get('command') == 'ping':
+                    response = {'success': True, 'pong': True}
+                elif data.get('command') == 'cache_stats':
+                    response = {'success': True, 'score_cache': self.calibrated_engine.score_cache.stats()}
+                    if self._legacy_engine is not None:
+                        response['nb_parameters'] = self._legacy_engine.nb_parameters.stats()
+                elif data.get('command') == 'diagnostics':
+                    response = {'success': True, 'diagnostics': diagnostics.stats(), 'entries': diagnostics.snapshot()}
+                elif data.get('command') == 'dump_diagnostics':
+                    # Written by a background thread; the reply does not wait for the disk
+                    path = diagnostics.dump_path(data.get('path'))
+                    diagnostics.dump_async(path)
+                    response = {'success': True, 'path': path, 'diagnostics': diagnostics.stats()}
+                elif data.get('command') == 'fit_team_strengths':
+                    with self.lock:
+                        response = fit_team_strengths(data, self.strength_store)
+                elif data.get('command') in ('sync_team_strengths', 'replay_team_strengths'):
+                    with self.lock:
+                        response = update_team_strengths(self.strength_store,
+                                                         replay=data['command'] == 'replay_team_strengths')
+                elif data.get('command') == 'shutdown':
+                    response = {'success': True, 'shutdown': True}
+                    shutdown = True
+                else:
+                    profile = scope.enter_context(
+                        profiling(profile_mode(data.get('profile', self.profile)), started=parse_clock)
+                    )
+                    if profile is not None:
+                        profile.add('parse', parse_time[0] - parse_clock[0], parse_time[1] - parse_clock[1])
+                    response = self.process(data)
+            except Exception as e:
+                response = error_response(e)
+        
+            response['request_id'] = request_id
+            return frame_response(response, output_format), shutdown
+    
+    def close(self):
+        self.calibrated_engine.shutdown_workers()
+        if self._legacy_engine is not None:
+            self._legacy_engine.close()
+            self._legacy_engine = None
+
+def frame_response(response, output_format='json'):
+    """
+    Frame one server-mode response: a JSON line, or for a columnar output_format
+    a JSON header line followed by the binary payload. Failures stay plain JSON.
+    A profiled request's report goes into the JSON (or the header) last, with
+    the 'serialization' stage timed up to that point.
+    """
+    profile = stage_profile.current()
+    if profile is not None:
+        profile.begin('serialization')
+    if output_format != 'json' and response.get('success'):
+        try:
+            payload = encode_response(response, output_format)
+        except Exception as e:
+            response = {**error_response(e), 'request_id': response.get('request_id')}
+        else:
+            header = {
+                'success': True,
+                'request_id': response.get('request_id'),
+                'output_format': output_format,
+                'content_length': len(payload),
+                'total_execution_time': response.get('total_execution_time')
+            }
+            if profile is not None:
+                header['metadata'] = {'profile': profile}
+            return json.dumps(header, cls=NumpyEncoder).encode('utf-8') + b'\n' + payload
+    return (json.dumps(response, cls=NumpyEncoder) + '\n').encode('utf-8')
+
+def run_request(data, worker=None, db_path=None):
+    """Dispatch a parsed request to the calibrated or legacy engine"""
+    # Check if calibrated simulation should be used
+    use_calibrated = data.get('use_calibrated_engine', True)  # Default to calibrated
+    
+    # Fitted Dixon-Coles lambdas only when the request opts in (keeps SQLite off the pricing path)
+    strengths = None
+    if use_calibrated and data.get('use_fitted_strengths', False):
+        strengths = worker.strength_store if worker is not None else create_strength_store(db_path)
+    
+    if use_calibrated and 'fixtures' in data:
+        logger.info("[CALIBRATED] Using CALIBRATED batch engine (%d fixtures)", len(data['fixtures']))
+        if worker is not None:
+            return run_calibrated_batch(data, worker.calibrated_engine, worker.value_detector, strengths)
+        return run_calibrated_batch(data, strengths=strengths)
+    
+    if use_calibrated:
+        logger.info("[CALIBRATED] Using CALIBRATED Monte Carlo Engine")
+        if worker is not None:
+            return run_calibrated_simulation(data, worker.calibrated_engine, worker.value_detector, strengths)
+        return run_calibrated_simulation(data, strengths=strengths)
+    
+    logger.info("[LEGACY] Using Legacy Monte Carlo Engine")
+    # Fallback to original engine for compatibility
+    if worker is not None:
+        return run_legacy_simulation(data, worker.legacy_engine)
+    return run_legacy_simulation(data, db_path=db_path)
+
+def serve_stdio(worker):
+    """
+    Worker mode over stdin/stdout: one JSON request per line in, one framed
+    JSON response per line out. Diagnostics are logged to stderr, so
+    stdout only ever carries response frames.
+    """
+    out = sys.stdout.buffer
+    logger.info("[WORKER] Simulation worker ready (stdin/stdout)")
+    
+    for line in sys.stdin:
+        frame, shutdown = worker.handle_line(line)
+        if frame is None:
+            continue
+        out.write(frame)
+        out.flush()
+        if shutdown:
+            break
+
+class _SocketRequestHandler(socketserver.StreamRequestHandler):
+    """Serves NDJSON requests for one client connection"""
+    
+    def handle(self):
+        worker = self.server.worker
+        for raw in self.rfile:
+            frame, shutdown = worker.handle_line(raw.decode('utf-8'))
+            if frame is None:
+                continue
+            self.wfile.write(frame)
+            self.wfile.flush()
+            if shutdown:
+                threading.Thread(target=self.server.shutdown, daemon=True).start()
+                break
+
+class _SimulationSocketServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+def remove_stale_socket(socket_path):
+    """Remove a leftover socket file; refuse to delete anything that is not a socket"""
+    try:
+        mode = os.lstat(socket_path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise FileExistsError(f"{socket_path} exists and is not a socket; refusing to remove it")
+    os.unlink(socket_path)
+
+def serve_socket(worker, socket_path):
+    """Worker mode over a local Unix socket (one NDJSON stream per connection)"""
+    remove_stale_socket(socket_path)
+    
+    with _SimulationSocketServer(socket_path, _SocketRequestHandler) as server:
+        server.worker = worker
+        logger.info("[WORKER] Simulation worker listening on %s", socket_path)
+        try:
+            server.serve_forever()
+        finally:
+            remove_stale_socket(socket_path)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='EXODIA Monte Carlo simulation runner')
+    parser.add_argument('input_file', nargs='?',
+                        help='JSON request file (reads stdin when omitted)')
+    parser.add_argument('--serve', action='store_true',
+                        help='run as a long-lived worker reading NDJSON requests from stdin')
+    parser.add_argument('--socket', metavar='PATH',
+                        help='run as a long-lived worker listening on a Unix socket')
+    parser.add_argument('--db-path', metavar='PATH',
+                        help='SQLite database used by the legacy engine')
+    parser.add_argument('--output-format', choices=OUTPUT_FORMATS,
+                        help='one-shot result encoding (default: the request\'s output_format, else json); '
+                             'npy/msgpack/arrow write the columnar payload as raw bytes')
+    parser.add_argument('--diagnostics', type=int, metavar='N', default=None,
+                        help='keep the last N request diagnostics in memory (default: EXODIA_DIAGNOSTICS, else off)')
+    parser.add_argument('--diagnostics-dir', metavar='DIR', default=None,
+                        help='directory dump_diagnostics writes into (default: EXODIA_DIAGNOSTICS_DIR, else backend/)')
+    parser.add_argument('--fit-league', type=int, metavar='LEAGUE_ID',
+                        help='refit the Dixon-Coles team strengths of one league from historical_matches and exit')
+    parser.add_argument('--sync-strengths', action='store_true',
+                        help='apply results added since the last sync to team ratings and form tables and exit')
+    parser.add_argument('--replay-strengths', action='store_true',
+                        help='rebuild team ratings and form tables from the full result history and exit')
+    parser.add_argument('--import-profile', action='store_true',
+                        help='report per-module import times on stderr (after startup in worker mode, '
+                             'after the request otherwise)')
+    parser.add_argument('--profile', choices=PROFILE_MODES, default=os.environ.get('EXODIA_PROFILE'),
+                        help='report per-stage wall/CPU time and peak RSS in every response\'s metadata.profile '
+                             '("memory" also traces allocations; a request\'s "profile" field overrides; '
+                             'default: EXODIA_PROFILE, else off)')
+    parser.add_argument('--log-level', choices=LOG_LEVELS,
+                        default=os.environ.get('EXODIA_LOG_LEVEL', 'WARNING').upper(),
+                        help='diagnostics logged to stderr at or above this level (default: WARNING)')
+    return parser.parse_args(argv)
+
+def configure_logging(level='WARNING'):
+    """Send all diagnostics to stderr; debug formatting is skipped below its level"""
+    logging.basicConfig(stream=sys.stderr, level=getattr(logging, level), format=LOG_FORMAT)
+
 def main():
+    args = parse_args()
+    configure_logging(args.log_level)
+    if args.diagnostics is not None:
+        diagnostics.configure(args.diagnostics)
+    if args.diagnostics_dir is not None:
+        diagnostics.directory = args.diagnostics_dir
+    
+    if args.fit_league is not None:
+        response = fit_team_strengths({'league_id': args.fit_league}, create_strength_store(args.db_path))
+        print(json.dumps(response))
+        return
+    
+    if args.sync_strengths or args.replay_strengths:
+        response = update_team_strengths(create_strength_store(args.db_path), replay=args.replay_strengths)
+        print(json.dumps(response))
+        return
+    
+    if args.serve or args.socket:
+        worker = SimulationWorker(args.db_path, profile_mode(args.profile))
+        if import_profiler.active:
+            import_profiler.report()
+        try:
+            if args.socket:
+                serve_socket(worker, args.socket)
+            else:
+                serve_stdio(worker)
+        finally:
+            worker.close()
+        return
+    
     try:
         start_time = time.time()
         
         # Try to read from command line arguments first, then stdin
-        if len(sys.argv) > 1:
+        if args.input_file:
             # Read from file argument
-            with open(sys.argv[1], 'r') as f:
+            with open(args.input_file, 'r') as f:
                 input_data = f.read()
         else:
             # Read input data from stdin
             input_data = sys.stdin.read()
         
+        parse_clock = stage_clock()
         data = json.loads(input_data)
+        parse_time = stage_clock()
+        output_format = args.output_format or data.get('output_format', 'json')
         
-        # Check if calibrated simulation should be used
-        use_calibrated = data.get('use_calibrated_engine', True)  # Default to calibrated
-        
-        if use_calibrated:
-            print("[CALIBRATED] Using CALIBRATED Monte Carlo Engine")
-            response = run_calibrated_simulation(data)
-        else:
-            print("[LEGACY] Using Legacy Monte Carlo Engine")
-            # Fallback to original engine for compatibility
-            import os
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            db_path = os.path.join(script_dir, '..', 'database', 'exodia.db')
-            engine = SimulationEngine(db_path)
+        with profiling(profile_mode(data.get('profile', profile_mode(args.profile))), started=parse_clock) as profile:
+            if profile is not None:
+                profile.add('parse', parse_time[0] - parse_clock[0], parse_time[1] - parse_clock[1])
             
-            # Extract parameters from request
-            home_team_id = data['home_team_id']
-            away_team_id = data['away_team_id']
-            league_id = data['league_id']
-            distribution_type = data['distribution_type']
-            iterations = data['iterations']
-            boost_settings = data.get('boost_settings', {})
-            bookmaker_odds = data.get('bookmaker_odds')
-            match_date = data.get('match_date')
+            response = run_request(data, db_path=args.db_path)
             
-            # Prepare custom boosts from frontend settings
-            custom_boosts = {}
-            if boost_settings:
-                custom_boosts['home_advantage'] = boost_settings.get('home_advantage', 0.20)
-                custom_boosts['custom_home_boost'] = boost_settings.get('custom_home_boost', 0.0)
-                custom_boosts['custom_away_boost'] = boost_settings.get('custom_away_boost', 0.0)
+            # Add timing information
+            total_time = time.time() - start_time
+            response['total_execution_time'] = round(total_time, 3)
             
-            # Run simulation
-            simulation_results = engine.run_simulation(
-                home_team_id=home_team_id,
-                away_team_id=away_team_id,
-                distribution_type=distribution_type,
-                iterations=iterations,
-                custom_boosts=custom_boosts
-            )
+            logger.info("[SUCCESS] Simulation completed in %.3fs", total_time)
             
-            # Save simulation to database if match_date provided
-            simulation_id = None
-            if match_date:
-                simulation_id = engine.save_simulation(
-                    home_team_id=home_team_id,
-                    away_team_id=away_team_id,
-                    league_id=league_id,
-                    match_date=match_date,
-                    distribution_type=distribution_type,
-                    iterations=iterations,
-                    simulation_results=simulation_results,
-                    bookmaker_odds=bookmaker_odds,
-                    custom_boosts=custom_boosts
-                )
+            if profile is not None:
+                attach_profile(response, profile)
+                profile.begin('serialization')
             
-            # Prepare response
-            response = {
-                'success': True,
-                'simulation_id': simulation_id,
-                'results': simulation_results,
-                'calibration_optimized': False,
-                'engine_version': '1.0_legacy'
-            }
-        
-        # Add timing information
-        total_time = time.time() - start_time
-        response['total_execution_time'] = round(total_time, 3)
-        
-        print(f"[SUCCESS] Simulation completed in {total_time:.3f}s")
-        
-        # Output results as JSON
-        print(json.dumps(response, cls=NumpyEncoder))
-        
-    except json.JSONDecodeError as e:
-        error_response = {
-            'success': False,
-            'error': f'Invalid JSON input: {str(e)}'
-        }
-        print(json.dumps(error_response, cls=NumpyEncoder))
-        sys.exit(1)
+            if output_format != 'json' and response.get('success'):
+                # Columnar binary payload on stdout, nothing else (the profile goes to stderr)
+                payload = encode_response(response, output_format)
+                sys.stdout.flush()
+                sys.stdout.buffer.write(payload)
+                sys.stdout.buffer.flush()
+                if profile is not None:
+                    print(json.dumps({'profile': profile.report()}), file=sys.stderr)
+                return
+            
+            # Output results as JSON
+            print(json.dumps(response, cls=NumpyEncoder))
         
     except Exception as e:
-        error_response = {
-            'success': False,
-            'error': str(e),
-            'traceback': traceback.format_exc()  # Always include traceback for debugging
-        }
-        print(json.dumps(error_response, cls=NumpyEncoder))
+        print(json.dumps(error_response(e), cls=NumpyEncoder))
         sys.exit(1)
+    finally:
+        if import_profiler.active:
+            import_profiler.report()  # Includes imports made lazily by the request
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
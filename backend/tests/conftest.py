@@ -0,0 +1,66 @@
+import datetime
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# Tests import the backend the way simulation_runner does: from the backend directory
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from db.sqlite_pool import close_pools, connect  # noqa: E402
+
+SCHEMA_PATH = os.path.join(BACKEND_DIR, '..', 'database', 'schema.sql')
+
+# Generating parameters of the test league (log scale, same layout as a Dixon-Coles fit)
+LEAGUE = {
+    'team_ids': [1, 2, 3, 4, 5, 6],
+    'attack': [0.35, 0.15, 0.0, 0.0, -0.15, -0.35],
+    'defence': [-0.3, -0.1, 0.0, 0.05, 0.1, 0.25],
+    'intercept': float(np.log(1.15)),
+    'home_advantage': float(np.log(1.3))
+}
+
+
+def insert_match(conn, home_id, away_id, home_goals, away_goals, match_date, match_type='h2h'):
+    conn.execute(
+        "INSERT INTO historical_matches (home_team_id, away_team_id, home_score_ht, away_score_ht, "
+        "home_score_ft, away_score_ft, match_type, match_date) VALUES (?, ?, 0, 0, ?, ?, ?, ?)",
+        (home_id, away_id, home_goals, away_goals, match_type, match_date)
+    )
+
+
+@pytest.fixture
+def league_db(tmp_path):
+    """
+    Fresh database from schema.sql holding league 1: six teams and twelve
+    double round robins (360 dated results) drawn from LEAGUE's strengths.
+    """
+    db_path = str(tmp_path / 'exodia.db')
+    conn = connect(db_path)
+    with open(SCHEMA_PATH) as schema:
+        conn.executescript(schema.read())
+
+    rng = np.random.default_rng(2024)
+    teams = LEAGUE['team_ids']
+    conn.execute("INSERT INTO leagues (id, name, country) VALUES (1, 'Test League', 'Testland')")
+    conn.executemany("INSERT INTO teams (id, name, league_id) VALUES (?, ?, 1)",
+                     [(team_id, f"Team {team_id}") for team_id in teams])
+    day = datetime.date(2020, 1, 1)
+    for _ in range(12):
+        for home in range(len(teams)):
+            for away in range(len(teams)):
+                if home == away:
+                    continue
+                home_lambda = np.exp(LEAGUE['intercept'] + LEAGUE['home_advantage']
+                                     + LEAGUE['attack'][home] + LEAGUE['defence'][away])
+                away_lambda = np.exp(LEAGUE['intercept'] + LEAGUE['attack'][away] + LEAGUE['defence'][home])
+                insert_match(conn, teams[home], teams[away], int(rng.poisson(home_lambda)),
+                             int(rng.poisson(away_lambda)), day.isoformat())
+                day += datetime.timedelta(days=1)
+    conn.commit()
+    conn.close()
+
+    yield db_path
+    close_pools()
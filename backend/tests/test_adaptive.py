@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from monte_carlo.calibrated_simulation_engine import create_calibrated_engine
+
+
+@pytest.fixture
+def engine():
+    return create_calibrated_engine()
+
+
+def test_stops_once_every_market_reaches_the_target(engine):
+    results = engine.run_adaptive_simulation(1.5, 1.2, target_precision=0.004, seed=21)
+    metadata = results['metadata']
+
+    assert metadata['stopping_reason'] == 'converged'
+    assert metadata['max_standard_error'] <= 0.004
+    assert metadata['standard_errors'].keys() == results['probabilities'].keys()
+    # The worst market needs p(1-p) / tol^2 draws; one sizing step may overshoot by a batch
+    exact = engine.run_exact_pricing(1.5, 1.2, verbose=False)['probabilities']
+    worst_variance = max(p * (1 - p) for markets in exact.values() for p in markets.values())
+    needed = worst_variance / 0.004 ** 2
+    assert 0.9 * needed <= metadata['iterations'] <= needed * 1.1 + engine.calibration_config['adaptive_batch_size']
+
+
+def test_reported_errors_are_binomial_standard_errors(engine):
+    results = engine.run_adaptive_simulation(2.2, 0.7, target_precision=0.005, seed=22)
+    iterations = results['metadata']['iterations']
+
+    for group, markets in results['probabilities'].items():
+        for market, p in markets.items():
+            assert results['metadata']['standard_errors'][group][market] == pytest.approx(
+                np.sqrt(p * (1 - p) / iterations))
+
+
+def test_stops_at_the_iteration_cap(engine):
+    results = engine.run_adaptive_simulation(1.5, 1.2, target_precision=0.0001, max_iterations=60000, seed=23)
+    metadata = results['metadata']
+
+    assert metadata['stopping_reason'] == 'max_iterations'
+    assert metadata['iterations'] == 60000
+    assert metadata['max_standard_error'] > 0.0001
@@ -0,0 +1,35 @@
+import pytest
+
+from monte_carlo.calibrated_simulation_engine import create_calibrated_engine
+from simulation_runner import run_calibrated_batch, run_calibrated_simulation
+
+FIXTURES = [
+    {'fixture_id': 'a', 'home_team_id': 1, 'away_team_id': 2, 'league_id': 1, 'home_lambda': 1.3, 'away_lambda': 1.0},
+    {'fixture_id': 'b', 'home_team_id': 3, 'away_team_id': 4, 'league_id': 1, 'home_lambda': 0.8, 'away_lambda': 1.4,
+     'bookmaker_odds': {'1x2': {'home': 3.1, 'draw': 3.3, 'away': 2.3}}},
+    {'fixture_id': 'c', 'home_team_id': 5, 'away_team_id': 6, 'league_id': 1, 'home_lambda': 2.0, 'away_lambda': 0.5}
+]
+
+
+def test_exact_batch_equals_single_requests():
+    batch = run_calibrated_batch({'fixtures': FIXTURES, 'pricing_mode': 'exact'})
+
+    assert batch['fixture_count'] == 3
+    assert [response['fixture_id'] for response in batch['results']] == ['a', 'b', 'c']
+    for fixture, response in zip(FIXTURES, batch['results']):
+        single = run_calibrated_simulation({**fixture, 'iterations': 1000, 'pricing_mode': 'exact'})
+        assert response['results']['probabilities'] == single['results']['probabilities']
+        assert response['value_opportunities'] == single['value_opportunities']
+
+
+def test_sampled_batch_prices_each_fixture_from_its_own_lambdas():
+    batch = run_calibrated_batch({'fixtures': FIXTURES, 'iterations': 100000, 'seed': 2})
+    engine = create_calibrated_engine()
+
+    for response in batch['results']:
+        metadata = response['results']['metadata']
+        assert metadata['seed'] == 2
+        exact = engine.run_exact_pricing(metadata['home_lambda'], metadata['away_lambda'], verbose=False)
+        for outcome, p in exact['probabilities']['match_outcomes'].items():
+            assert response['results']['probabilities']['match_outcomes'][outcome] == pytest.approx(p, abs=0.008)
+    assert [response['results']['metadata']['batch_index'] for response in batch['results']] == [0, 1, 2]
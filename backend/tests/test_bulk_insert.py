@@ -0,0 +1,70 @@
+import json
+
+import pytest
+
+from db.sqlite_pool import connect
+from monte_carlo.simulation_engine import SimulationEngine
+
+ODDS = {
+    '1x2': {'home': 2.1, 'draw': 3.4, 'away': 3.6},
+    'over_under': {'ou25': {'over': 1.9, 'under': 1.95}},
+    'both_teams_score': {'yes': 1.8}
+}
+
+
+@pytest.fixture
+def engine(league_db):
+    engine = SimulationEngine(league_db)
+    yield engine
+    engine.close()
+
+
+def simulation(engine, home_id, away_id, bookmaker_odds=None):
+    return {
+        'home_team_id': home_id,
+        'away_team_id': away_id,
+        'league_id': 1,
+        'match_date': '2024-05-01',
+        'distribution_type': 'poisson',
+        'iterations': 2000,
+        'simulation_results': engine.run_simulation(home_id, away_id, iterations=2000, seed=home_id),
+        'bookmaker_odds': bookmaker_odds
+    }
+
+
+def test_batch_is_written_with_consecutive_ids_in_input_order(engine, league_db):
+    first = engine.save_simulation(**simulation(engine, 1, 2))
+    batch = [simulation(engine, 3, 4, ODDS), simulation(engine, 5, 6), simulation(engine, 2, 1, ODDS)]
+    ids = engine.save_simulations(batch)
+
+    assert ids == [first + 1, first + 2, first + 3]
+    conn = connect(league_db)
+    rows = conn.execute("SELECT id, home_team_id, away_team_id, true_odds FROM simulations ORDER BY id").fetchall()
+    assert [row[:3] for row in rows] == [(first, 1, 2), (ids[0], 3, 4), (ids[1], 5, 6), (ids[2], 2, 1)]
+    assert json.loads(rows[1][3]) == json.loads(json.dumps(batch[0]['simulation_results']['true_odds']))
+
+    odds = conn.execute("SELECT simulation_id, market_type, home_odds, draw_odds, away_odds, over_odds, "
+                        "under_odds, yes_odds, no_odds FROM bookmaker_odds ORDER BY id").fetchall()
+    conn.close()
+    assert odds == [
+        (ids[0], '1x2', 2.1, 3.4, 3.6, None, None, None, None),
+        (ids[0], 'ou25', None, None, None, 1.9, 1.95, None, None),
+        (ids[0], 'btts', None, None, None, None, None, 1.8, None),
+        (ids[2], '1x2', 2.1, 3.4, 3.6, None, None, None, None),
+        (ids[2], 'ou25', None, None, None, 1.9, 1.95, None, None),
+        (ids[2], 'btts', None, None, None, None, None, 1.8, None)
+    ]
+
+
+def test_a_failing_row_rolls_back_the_whole_batch(engine, league_db):
+    bad = simulation(engine, 1, 2)
+    bad['distribution_type'] = None  # NOT NULL
+    with pytest.raises(Exception):
+        engine.save_simulations([simulation(engine, 3, 4, ODDS), bad])
+
+    conn = connect(league_db)
+    counts = [conn.execute(f"SELECT count(*) FROM {table}").fetchone()[0]
+              for table in ('simulations', 'bookmaker_odds')]
+    conn.close()
+    assert counts == [0, 0]
+    assert engine.save_simulations([]) == []
@@ -0,0 +1,55 @@
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from monte_carlo.calibrated_simulation_engine import create_calibrated_engine
+from monte_carlo.random_streams import make_generator
+
+
+@pytest.fixture
+def engine():
+    return create_calibrated_engine()
+
+
+@pytest.mark.parametrize('chunk_size', [1000, 3333, 10000, 25000])
+def test_every_iteration_is_counted_once_whatever_the_chunk_size(engine, chunk_size):
+    engine.calibration_config['chunk_size'] = chunk_size
+    counts = engine.simulate_outcome_counts(make_generator(4), 1.5, 1.2, 10001)['halves']
+
+    assert counts.sum() == 10001
+
+
+def test_chunk_size_does_not_bias_the_prices(engine):
+    engine.calibration_config['chunk_size'] = 7919
+    chunked = engine.run_calibrated_simulation(1.5, 1.2, 200000, seed=4)['probabilities']['match_outcomes']
+    engine.calibration_config['chunk_size'] = 200000
+    whole = engine.run_calibrated_simulation(1.5, 1.2, 200000, seed=5)['probabilities']['match_outcomes']
+
+    for outcome, p in whole.items():
+        assert chunked[outcome] == pytest.approx(p, abs=5 * np.sqrt(2 * p * (1 - p) / 200000))
+
+
+def test_peak_memory_is_bounded_by_the_chunk_not_the_run(engine):
+    engine.calibration_config['chunk_size'] = 50000
+    tracemalloc.start()
+    try:
+        engine.run_calibrated_simulation(1.5, 1.2, 2000000, seed=6)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    # Four 50k-draw int64 goal arrays are 1.6 MB; unchunked they would be 64 MB
+    assert peak < 8 * 1024 * 1024
+
+
+def test_batch_blocks_keep_per_fixture_results(engine):
+    engine.calibration_config.update(chunk_size=2000, batch_block_elements=4000)
+    home, away = [1.1, 1.9, 2.6], [1.4, 1.0, 0.6]
+    batch = engine.run_calibrated_batch(home, away, 60000, seed=9)
+
+    assert [result['metadata']['batch_index'] for result in batch] == [0, 1, 2]
+    for result, home_lambda, away_lambda in zip(batch, home, away):
+        exact = engine.run_exact_pricing(home_lambda, away_lambda, verbose=False)['probabilities']['match_outcomes']
+        for outcome, p in exact.items():
+            assert result['probabilities']['match_outcomes'][outcome] == pytest.approx(p, abs=0.01)
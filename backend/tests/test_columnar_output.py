@@ -0,0 +1,81 @@
+import io
+
+import numpy as np
+import pytest
+
+from columnar_output import columnar_results, encode_response
+from simulation_runner import run_calibrated_batch
+
+FIXTURE = {'home_team_id': 1, 'away_team_id': 2, 'league_id': 1}
+
+
+@pytest.fixture(scope='module')
+def batch():
+    # Fixture 0 is offered twice the fair 1x2 home price, so it carries a value bet; fixture 1 has no odds
+    return run_calibrated_batch({
+        'fixtures': [
+            {**FIXTURE, 'home_lambda': 1.6, 'away_lambda': 0.9, 'bookmaker_odds': {'1x2': {'home': 3.5}}},
+            {**FIXTURE, 'home_lambda': 1.1, 'away_lambda': 1.3}
+        ],
+        'pricing_mode': 'exact'
+    })
+
+
+def test_one_row_per_fixture_and_one_column_per_market(batch):
+    columns = columnar_results(batch)
+
+    assert np.array_equal(columns['fixture_index'], [0, 1])
+    for index, fixture in enumerate(batch['results']):
+        results = fixture['results']
+        assert columns['1x2_home'][index] == results['probabilities']['match_outcomes']['home_win']
+        assert columns['goals_over_2_5'][index] == results['probabilities']['goal_markets']['over_2_5']
+        assert columns['ht_ft_home_draw'][index] == results['probabilities']['ht_ft']['home_draw']
+        assert columns['rps_score'][index] == results['rps_score']
+    assert all(values.dtype == np.float64 and len(values) == 2 for values in columns.values())
+
+
+def test_value_bets_become_sparse_columns(batch):
+    columns = columnar_results(batch)
+    opportunity = batch['results'][0]['value_opportunities'][0]
+
+    assert opportunity['market'] == '1x2_home'
+    assert columns['edge_pct.1x2_home'][0] == opportunity['edge_percentage']
+    assert np.isnan(columns['edge_pct.1x2_home'][1])
+    assert columns['stake_pct.1x2_home'][0] == opportunity['recommended_stake_percent']
+
+
+def test_npy_payload_round_trips(batch):
+    columns = columnar_results(batch)
+    table = np.load(io.BytesIO(encode_response(batch, 'npy')), allow_pickle=False)
+
+    assert list(table.dtype.names) == list(columns)
+    for name, values in columns.items():
+        assert np.array_equal(table[name], values, equal_nan=True)
+
+
+def test_msgpack_payload_round_trips(batch):
+    msgpack = pytest.importorskip('msgpack')
+    columns = columnar_results(batch)
+    frame = msgpack.unpackb(encode_response(batch, 'msgpack'), raw=False)
+
+    assert frame['rows'] == 2 and frame['dtype'] == 'float64'
+    for name, values in columns.items():
+        assert np.array_equal(np.frombuffer(frame['columns'][name], '<f8'), values, equal_nan=True)
+
+
+def test_arrow_payload_round_trips(batch):
+    pa = pytest.importorskip('pyarrow')
+    columns = columnar_results(batch)
+    table = pa.ipc.open_stream(encode_response(batch, 'arrow')).read_all()
+
+    assert table.column_names == list(columns)
+    assert np.array_equal(table.column('1x2_home').to_numpy(), columns['1x2_home'])
+
+
+def test_only_successful_calibrated_responses_are_encoded(batch):
+    with pytest.raises(ValueError):
+        encode_response({'success': False, 'error': 'boom'}, 'npy')
+    with pytest.raises(ValueError):
+        encode_response({'success': True, 'results': {}}, 'npy')
+    with pytest.raises(ValueError):
+        encode_response(batch, 'parquet')
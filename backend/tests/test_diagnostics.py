@@ -0,0 +1,58 @@
+import json
+import os
+
+import pytest
+
+from diagnostics import DiagnosticsRing, diagnostics
+from simulation_runner import SimulationWorker
+
+
+@pytest.fixture
+def ring(tmp_path):
+    ring = DiagnosticsRing(3, str(tmp_path))
+    for i in range(5):
+        ring.record('value_detection', request_id=i)
+    return ring
+
+
+def test_ring_keeps_the_newest_entries(ring):
+    assert [entry['request_id'] for entry in ring.snapshot()] == [2, 3, 4]
+    assert ring.stats() == {'enabled': True, 'capacity': 3, 'size': 3, 'recorded': 5}
+
+
+def test_dump_path_stays_inside_the_directory(ring, tmp_path):
+    assert ring.dump_path() == os.path.join(os.path.realpath(tmp_path), 'diagnostics.jsonl')
+    assert ring.dump_path('runs/today.jsonl') == os.path.join(os.path.realpath(tmp_path), 'runs', 'today.jsonl')
+    for name in ('/etc/passwd', '../escape.jsonl', 'runs/../../escape.jsonl', '.'):
+        with pytest.raises(ValueError):
+            ring.dump_path(name)
+
+
+def test_dump_path_rejects_a_symlink_out_of_the_directory(ring, tmp_path):
+    outside = tmp_path.parent / f'{tmp_path.name}-outside'
+    outside.mkdir()
+    (tmp_path / 'link').symlink_to(outside, target_is_directory=True)
+    with pytest.raises(ValueError):
+        ring.dump_path('link/escape.jsonl')
+
+
+def test_worker_dump_writes_only_into_the_diagnostics_directory(tmp_path, monkeypatch):
+    monkeypatch.setattr(diagnostics, 'directory', str(tmp_path))
+    diagnostics.configure(2)
+    try:
+        diagnostics.record('value_detection', request_id='a')
+        worker = SimulationWorker(db_path=str(tmp_path / 'unused.db'))
+
+        frame, _ = worker.handle_line(json.dumps({'command': 'dump_diagnostics', 'path': 'dump.jsonl',
+                                                  'request_id': 1}))
+        response = json.loads(frame)
+        assert response['success'] and response['request_id'] == 1
+        assert response['path'] == str(tmp_path.resolve() / 'dump.jsonl')
+
+        frame, _ = worker.handle_line(json.dumps({'command': 'dump_diagnostics', 'path': str(tmp_path.parent / 'x'),
+                                                  'request_id': 2}))
+        response = json.loads(frame)
+        assert not response['success'] and response['request_id'] == 2
+        assert not (tmp_path.parent / 'x').exists()
+    finally:
+        diagnostics.configure(0)
@@ -0,0 +1,72 @@
+import sqlite3
+
+import numpy as np
+import pytest
+from scipy.optimize import approx_fprime
+
+from conftest import LEAGUE
+from monte_carlo.dixon_coles import expected_goals, negative_log_likelihood
+from monte_carlo.team_strength import TeamStrengthStore
+
+
+def test_fit_recovers_generating_strengths(league_db):
+    fit = TeamStrengthStore(league_db).fit_league(1, decay=0.0)
+
+    assert fit['converged']
+    assert fit['team_ids'] == LEAGUE['team_ids']
+    assert fit['home_advantage'] == pytest.approx(LEAGUE['home_advantage'], abs=0.12)
+    # Ratings are identified up to the intercept: compare centred values
+    for side in ('attack', 'defence'):
+        fitted = np.array(fit[side]) - np.mean(fit[side])
+        true = np.array(LEAGUE[side]) - np.mean(LEAGUE[side])
+        np.testing.assert_allclose(fitted, true, atol=0.2)
+
+
+def test_analytic_gradient_matches_finite_differences():
+    rng = np.random.default_rng(5)
+    n_teams, n_matches = 4, 40
+    home_idx = rng.integers(0, n_teams, n_matches)
+    away_idx = (home_idx + rng.integers(1, n_teams, n_matches)) % n_teams
+    home_goals = rng.poisson(1.5, n_matches).astype(np.float64)
+    away_goals = rng.poisson(1.1, n_matches).astype(np.float64)
+    weights = rng.uniform(0.5, 1.0, n_matches)
+    params = np.concatenate([[0.1, 0.25], rng.normal(0, 0.2, 2 * n_teams), [-0.05]])
+    args = (home_idx, away_idx, home_goals, away_goals, weights, n_teams)
+
+    _, gradient = negative_log_likelihood(params, *args)
+    numeric = approx_fprime(params, lambda p: negative_log_likelihood(p, *args)[0], 1e-7)
+    np.testing.assert_allclose(gradient, numeric, rtol=1e-4, atol=1e-4)
+
+
+def test_stored_fit_serves_fixture_lambdas(league_db):
+    fit = TeamStrengthStore(league_db).fit_league(1)
+    store = TeamStrengthStore(league_db)  # Fresh cache: read back from the database
+
+    loaded = store.load_fit(1)
+    assert loaded['team_ids'] == fit['team_ids']
+    np.testing.assert_allclose(loaded['attack'], fit['attack'])
+    assert store.fixture_lambdas(1, 1, 6) == pytest.approx(expected_goals(fit, 1, 6))
+    home_lambda, away_lambda = store.fixture_lambdas(1, 1, 6)
+    assert home_lambda > 2 * away_lambda  # Strongest side at home to the weakest
+    assert store.fixture_lambdas(1, 1, 99) is None
+    assert store.fixture_lambdas(2, 1, 6) is None
+
+
+def test_refit_warm_starts_from_the_stored_fit(league_db):
+    store = TeamStrengthStore(league_db)
+    cold = store.fit_league(1, warm_start=False)
+    warm = store.fit_league(1)
+
+    assert warm['iterations'] < cold['iterations']
+    assert warm['log_likelihood'] == pytest.approx(cold['log_likelihood'], abs=1e-3)
+
+
+def test_lookup_without_strength_tables_is_read_only(tmp_path):
+    db_path = str(tmp_path / 'bare.db')
+    sqlite3.connect(db_path).close()
+    store = TeamStrengthStore(db_path)
+
+    assert store.fixture_lambdas(1, 1, 2) is None
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()[0] == 0
+    conn.close()
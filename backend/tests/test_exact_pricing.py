@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from monte_carlo.calibrated_simulation_engine import create_calibrated_engine
+
+ITERATIONS = 400000
+
+
+@pytest.fixture(scope='module')
+def engine():
+    return create_calibrated_engine()
+
+
+@pytest.mark.parametrize('home_lambda, away_lambda', [(1.6, 1.1), (2.8, 0.45)])
+def test_exact_prices_agree_with_sampled_prices(engine, home_lambda, away_lambda):
+    exact = engine.run_exact_pricing(home_lambda, away_lambda, verbose=False)['probabilities']
+    sampled = engine.run_calibrated_simulation(home_lambda, away_lambda, ITERATIONS, seed=11)['probabilities']
+
+    assert exact.keys() == sampled.keys()
+    for group, markets in exact.items():
+        assert markets.keys() == sampled[group].keys(), group
+        for market, p in markets.items():
+            # Five binomial standard errors, floored for markets priced at ~0
+            tolerance = 5 * np.sqrt(p * (1 - p) / ITERATIONS) + 1e-4
+            assert abs(p - sampled[group][market]) <= tolerance, f"{group}.{market}"
+
+
+def test_cached_and_uncached_exact_prices_match(engine):
+    first = engine.run_exact_pricing(1.45, 1.3, verbose=False)
+    second = engine.run_exact_pricing(1.45, 1.3, verbose=False, use_cache=False)
+
+    assert first['metadata']['pricing_mode'] == 'exact'
+    # 1.45 / 1.3 lie on the cache grid, so the cached matrices are the uncached ones
+    for group, markets in first['probabilities'].items():
+        assert markets == pytest.approx(second['probabilities'][group], abs=1e-12), group
+    outcomes = first['probabilities']['match_outcomes']
+    assert outcomes['home_win'] + outcomes['draw'] + outcomes['away_win'] == pytest.approx(1, abs=1e-9)
+    ht_ft = first['probabilities']['ht_ft']
+    assert sum(ht_ft.values()) == pytest.approx(1, abs=1e-9)
+
+
+def test_cross_check_reports_the_largest_difference(engine):
+    cross_check = engine.run_exact_pricing(1.6, 1.1, verbose=False, cross_check_iterations=50000,
+                                           seed=1)['metadata']['cross_check']
+
+    assert cross_check['iterations'] == 50000 and cross_check['seed'] == 1
+    assert 0 < cross_check['max_abs_difference'] < 0.015
+    assert cross_check['worst_market'].count('.') == 1
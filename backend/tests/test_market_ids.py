@@ -0,0 +1,71 @@
+import logging
+
+import numpy as np
+import pytest
+
+from monte_carlo.calibrated_simulation_engine import create_calibrated_engine
+from monte_carlo.market_ids import ODDS_COLUMNS, market_ids
+
+FEED = {
+    '1x2': {'home': 2.05, 'draw': 3.5, 'away': 3.9},
+    'over_under': {'ou15': {'over': 1.3, 'under': 3.4}, 'ou25': {'over': 1.95, 'under': 1.9}},
+    'both_teams_score': {'yes': 1.75, 'no': 2.05},
+    'first_half': {'gg_1h': {'yes': 4.2}}
+}
+
+
+@pytest.fixture(scope='module')
+def registry():
+    return market_ids()
+
+
+def test_ids_and_keys_are_one_to_one(registry):
+    assert len(registry) == 136
+    assert len(set(registry.keys)) == len(registry)
+    assert all(registry.keys[registry.ids[key]] == key for key in registry.keys)
+
+
+def test_flat_dict_round_trips_through_a_vector(registry):
+    rng = np.random.default_rng(24)
+    flat = {key: float(rng.uniform(1.1, 9.0)) for key in rng.choice(registry.keys, 40, replace=False)}
+
+    assert registry.flat(registry.key_vector(flat)) == flat
+
+
+def test_feed_round_trips_through_bookmaker_odds_rows(registry):
+    odds = registry.feed_vector(FEED)
+    rows = registry.odds_rows_for(7, odds)
+
+    assert [row[:2] for row in rows] == [(7, '1x2'), (7, 'ou15'), (7, 'ou25'), (7, 'btts'), (7, 'gg_1h')]
+    # Read back in the table layout, the rows name the same markets and prices
+    table_layout = {market_type: {column: price for column, price in zip(ODDS_COLUMNS, prices) if price is not None}
+                    for _, market_type, *prices in rows}
+    assert np.array_equal(registry.feed_vector(table_layout), odds, equal_nan=True)
+    assert registry.flat(odds) == {
+        '1x2_home': 2.05, '1x2_draw': 3.5, '1x2_away': 3.9,
+        'goals_over_1_5': 1.3, 'goals_under_1_5': 3.4, 'goals_over_2_5': 1.95, 'goals_under_2_5': 1.9,
+        'btts_yes': 1.75, 'btts_no': 2.05, 'first_half_btts_yes': 4.2
+    }
+
+
+def test_probability_and_nested_paths_address_the_same_markets(registry):
+    probabilities = create_calibrated_engine().run_exact_pricing(1.5, 1.2, verbose=False)['probabilities']
+    vector = registry.probability_vector(probabilities)
+
+    assert not np.isnan(vector).any()
+    assert vector[registry.ids['1x2_home']] == probabilities['match_outcomes']['home_win']
+    assert vector[registry.ids['goals_under_3_5']] == probabilities['goal_markets']['under_3_5']
+    nested = {}
+    for market_id, (category, outcome) in enumerate(registry.nested_paths):
+        nested.setdefault(category, {})[outcome] = vector[market_id]
+    assert np.array_equal(registry.nested_vector(nested), vector)
+
+
+def test_unknown_markets_are_logged_not_dropped_silently(registry, caplog):
+    with caplog.at_level(logging.WARNING, logger='monte_carlo.market_ids'):
+        odds = registry.feed_vector({'1x2': {'home': 2.0, 'home_win': 2.0}, 'corners': {'over': 1.9}})
+        flat = registry.key_vector({'1x2_home_win': 2.5, 'btts_yes': 1.8})
+
+    assert registry.flat(odds) == {'1x2_home': 2.0}
+    assert registry.flat(flat) == {'btts_yes': 1.8}
+    assert "('1x2', 'home_win')" in caplog.text and '1x2_home_win' in caplog.text
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from monte_carlo.markets import market_registry
+from monte_carlo.score_matrix import MAX_GOALS, score_matrix
+
+
+@pytest.fixture(scope='module')
+def priced():
+    matrix = score_matrix(1.6, 1.1)
+    return matrix, market_registry(MAX_GOALS + 1).probabilities(matrix)
+
+
+def test_partitions_sum_to_one(priced):
+    _, probabilities = priced
+    for group in ('exact_score', 'winning_margin', 'odd_even'):
+        assert sum(probabilities[group].values()) == pytest.approx(1.0), group
+
+
+def test_markets_read_the_score_matrix(priced):
+    matrix, probabilities = priced
+    home_win = np.tril(matrix, -1).sum()
+    draw = np.trace(matrix)
+
+    assert probabilities['double_chance']['1x'] == pytest.approx(home_win + draw)
+    assert probabilities['exact_score']['2_1'] == pytest.approx(matrix[2, 1])
+    assert probabilities['clean_sheet']['home'] == pytest.approx(matrix[:, 0].sum())
+    assert probabilities['win_to_nil']['home'] == pytest.approx(matrix[1:, 0].sum())
+    assert probabilities['team_totals']['home_over_1_5'] == pytest.approx(matrix[2:].sum())
+    assert probabilities['winning_margin']['away_by_2'] == pytest.approx(sum(matrix[h, h + 2] for h in range(14)))
+
+
+def test_asian_handicaps_remove_pushes_and_split_quarter_lines(priced):
+    matrix, probabilities = priced
+    home_win = np.tril(matrix, -1).sum()
+    draw = np.trace(matrix)
+    handicap = probabilities['asian_handicap']
+
+    # Half lines are plain outcomes; the level line voids the draw
+    assert handicap['home_minus_0_5'] == pytest.approx(home_win)
+    assert handicap['home_0'] == pytest.approx(home_win / (1 - draw))
+    # -0.25: half the stake on 0 (draw refunded) and half on -0.5 (draw lost)
+    assert handicap['home_minus_0_25'] == pytest.approx(home_win / (home_win + (1 - home_win - draw) + draw / 2))
+    # Opposite sides of the same line are complementary
+    for line in ('0', 'minus_0_25', 'minus_1', 'plus_1_75'):
+        mirrored = line.replace('minus', 'plus') if 'minus' in line else line.replace('plus', 'minus')
+        assert handicap[f"home_{line}"] + handicap[f"away_{mirrored}"] == pytest.approx(1.0), line
+
+
+def test_stacked_matrices_are_priced_per_fixture():
+    registry = market_registry(MAX_GOALS + 1)
+    matrices = np.stack([score_matrix(1.2, 0.8), score_matrix(2.4, 1.5)])
+
+    prices = registry.price(matrices)
+    for i, matrix in enumerate(matrices):
+        np.testing.assert_allclose(prices[i], registry.price(matrix))
@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+from scipy import stats
+from scipy.optimize import minimize_scalar
+
+from monte_carlo.negative_binomial_model import (
+    DEFAULT_PARAMS, POISSON_LIMIT_N, NegativeBinomialModel, NegativeBinomialParameterStore,
+    fit_negative_binomial, nbinom_pmf
+)
+
+
+def profile_mle(sample):
+    """Reference MLE: maximise the log-likelihood over n with p = n / (n + mean)"""
+    mean = np.mean(sample)
+    result = minimize_scalar(lambda log_n: -stats.nbinom.logpmf(sample, np.exp(log_n),
+                                                                np.exp(log_n) / (np.exp(log_n) + mean)).sum(),
+                             bounds=(np.log(1e-3), np.log(1e4)), method='bounded', options={'xatol': 1e-10})
+    n = np.exp(result.x)
+    return n, n / (n + mean)
+
+
+@pytest.mark.parametrize('n, p', [(3.0, 0.6), (1.2, 0.4), (8.0, 0.8)])
+def test_mle_recovers_a_known_distribution(n, p):
+    sample = np.random.default_rng(12).negative_binomial(n, p, 40000)
+    (fitted_n, fitted_p), = fit_negative_binomial([sample])
+
+    assert fitted_n == pytest.approx(n, rel=0.1)
+    assert fitted_p == pytest.approx(p, abs=0.02)
+    # And it is the likelihood maximum, not just close to the truth
+    reference_n, reference_p = profile_mle(sample)
+    assert fitted_n == pytest.approx(reference_n, rel=1e-4)
+    assert fitted_p == pytest.approx(reference_p, rel=1e-5)
+
+
+def test_samples_are_fitted_independently_in_one_call():
+    rng = np.random.default_rng(13)
+    samples = [rng.negative_binomial(2.0, 0.5, 300), [], [1, 2, 1, 2, 1, 2], [0, 0, 0]]
+    fits = fit_negative_binomial(samples)
+
+    assert fits.shape == (4, 2)
+    assert tuple(fits[0]) == pytest.approx(tuple(fit_negative_binomial([samples[0]])[0]))
+    assert tuple(fits[1]) == DEFAULT_PARAMS
+    # Variance below the mean has no NB maximum: the Poisson limit keeps the sample mean
+    n, p = fits[2]
+    assert n == POISSON_LIMIT_N
+    assert n * (1 - p) / p == pytest.approx(1.5)
+    assert fits[3][0] == POISSON_LIMIT_N and fits[3][1] == pytest.approx(1.0)
+
+
+def test_pmf_matches_scipy_and_keeps_the_tail():
+    pmf = nbinom_pmf(2.5, 0.55, max_goals=15)
+    expected = stats.nbinom.pmf(np.arange(16), 2.5, 0.55)
+    expected[-1] += stats.nbinom.sf(15, 2.5, 0.55)
+
+    np.testing.assert_allclose(pmf, expected, rtol=1e-10, atol=1e-14)
+    assert nbinom_pmf(POISSON_LIMIT_N, POISSON_LIMIT_N / (POISSON_LIMIT_N + 1.3)) == pytest.approx(
+        np.append(stats.poisson.pmf(np.arange(15), 1.3), stats.poisson.sf(14, 1.3)), abs=1e-6)
+
+
+def test_exact_pricing_agrees_with_sampling():
+    model = NegativeBinomialModel((3.0, 0.6), (2.0, 0.6), seed=14)
+    exact = model.simulate_match(exact=True)
+    sampled = model.simulate_match(200000)
+
+    for category in ('1x2', 'over_under', 'both_teams_score'):
+        for outcome, p in exact[category].items():
+            assert sampled[category][outcome] == pytest.approx(p, abs=0.006), (category, outcome)
+
+
+def test_parameter_store_refits_only_when_the_history_changes():
+    store = NegativeBinomialParameterStore()
+    history = [{'id': i, 'home_score_ft': i % 4, 'away_score_ft': i % 3} for i in range(12)]
+
+    first = store.get(history)
+    assert store.get([dict(match) for match in history]) is first
+    corrected = [dict(match) for match in history]
+    corrected[0]['home_score_ft'] = 5
+    assert store.get(corrected) != first
+    assert (store.stats()['hits'], store.stats()['misses']) == (1, 2)
@@ -0,0 +1,50 @@
+import os
+
+import numpy as np
+import pytest
+
+from monte_carlo.calibrated_simulation_engine import CalibratedMonteCarloEngine
+from monte_carlo.random_streams import make_generator, spawn_seed_sequences
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    """Engine whose effective_workers grants several workers even on a small box / iteration count"""
+    monkeypatch.setattr(os, 'cpu_count', lambda: 8)
+    engine = CalibratedMonteCarloEngine()
+    engine.calibration_config['min_iterations_per_worker'] = 1000
+    engine.calibration_config['chunk_size'] = 3000  # Several chunks per worker
+    yield engine
+    engine.shutdown_workers()
+
+
+def test_parallel_counts_equal_serial_counts_of_the_same_children(engine):
+    seed, iterations, workers = 1234, 10001, 2
+    assert engine.effective_workers(workers, iterations) == workers
+
+    counts, worker_stats = engine.simulate_outcome_counts_parallel(seed, 1.7, 1.1, iterations, workers)
+
+    shares = [5001, 5000]
+    serial = sum(
+        engine.simulate_outcome_counts(make_generator(child, engine.calibration_config['bit_generator']),
+                                       1.7, 1.1, share)['halves']
+        for child, share in zip(spawn_seed_sequences(seed, workers), shares)
+    )
+    np.testing.assert_array_equal(counts['halves'], serial)
+    assert counts['halves'].sum() == iterations
+    assert [stats['iterations'] for stats in worker_stats] == shares
+
+
+def test_run_with_two_workers_is_replayable_and_matches_exact_pricing(engine):
+    first = engine.run_calibrated_simulation(1.7, 1.1, 200000, seed=99, workers=2)
+    again = engine.run_calibrated_simulation(1.7, 1.1, 200000, seed=99, workers=2)
+    exact = engine.run_exact_pricing(1.7, 1.1, verbose=False, use_cache=False)
+
+    assert first['metadata']['workers'] == 2
+    assert len(first['metadata']['worker_stats']) == 2
+    assert sum(stats['iterations'] for stats in first['metadata']['worker_stats']) == 200000
+    assert first['metadata']['seed'] == 99
+    assert first['probabilities'] == again['probabilities']
+    for group in ('match_outcomes', 'goal_markets', 'btts', 'ht_ft'):
+        for market, probability in exact['probabilities'][group].items():
+            assert first['probabilities'][group][market] == pytest.approx(probability, abs=0.006)
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from monte_carlo.calibrated_simulation_engine import create_calibrated_engine
+from monte_carlo.poisson_model import PoissonModel
+from monte_carlo.random_streams import make_generator, resolve_seed, spawn_generators
+
+
+def test_same_seed_same_stream():
+    for bit_generator in ('pcg64', 'philox'):
+        first = make_generator(2024, bit_generator).poisson(1.4, 1000)
+        second = make_generator(2024, bit_generator).poisson(1.4, 1000)
+        assert np.array_equal(first, second)
+    assert not np.array_equal(make_generator(1).poisson(1.4, 1000), make_generator(2).poisson(1.4, 1000))
+    with pytest.raises(ValueError):
+        make_generator(1, 'mt19937')
+
+
+def test_fresh_seeds_fit_in_a_javascript_number():
+    seeds = {resolve_seed() for _ in range(50)}
+    assert len(seeds) == 50 and all(0 <= seed < 2 ** 53 for seed in seeds)
+    assert resolve_seed(17) == 17
+
+
+def test_spawned_streams_are_replayable_and_distinct():
+    first = [rng.random(8) for rng in spawn_generators(5, 3)]
+    second = [rng.random(8) for rng in spawn_generators(5, 3)]
+    assert all(np.array_equal(a, b) for a, b in zip(first, second))
+    assert not np.array_equal(first[0], first[1])
+
+
+@pytest.mark.parametrize('bit_generator', ['pcg64', 'philox'])
+def test_echoed_seed_replays_a_run_exactly(bit_generator):
+    engine = create_calibrated_engine()
+    engine.calibration_config.update(bit_generator=bit_generator, chunk_size=4000)
+
+    fresh = engine.run_calibrated_simulation(1.7, 1.05, 10000)
+    seed = fresh['metadata']['seed']
+    replay = engine.run_calibrated_simulation(1.7, 1.05, 10000, seed=seed)
+    other = engine.run_calibrated_simulation(1.7, 1.05, 10000, seed=seed + 1)
+
+    assert fresh['metadata']['bit_generator'] == bit_generator
+    assert replay['probabilities'] == fresh['probabilities']
+    assert other['probabilities'] != fresh['probabilities']
+
+
+def test_seeded_batch_adaptive_and_variance_reduced_runs_replay():
+    engine = create_calibrated_engine()
+    runs = [
+        lambda: [r['probabilities'] for r in engine.run_calibrated_batch([1.2, 2.1], [0.9, 1.4], 5000, seed=3)],
+        lambda: engine.run_adaptive_simulation(1.5, 1.2, target_precision=0.01, seed=3)['probabilities'],
+        lambda: engine.run_variance_reduced_simulation(1.5, 1.2, 5000, method='antithetic', seed=3)['probabilities']
+    ]
+    for run in runs:
+        assert run() == run()
+
+
+def test_legacy_model_draws_are_seeded():
+    first = PoissonModel(1.3, 1.1, seed=8).simulate_match(5000)
+    second = PoissonModel(1.3, 1.1, seed=8).simulate_match(5000)
+    assert first == second
@@ -0,0 +1,56 @@
+import json
+import subprocess
+import sys
+
+from conftest import BACKEND_DIR
+
+REQUEST = {'home_team_id': 1, 'away_team_id': 2, 'league_id': 1, 'iterations': 2000, 'seed': 1,
+           'bookmaker_odds': {'1x2': {'home': 2.2, 'draw': 3.3, 'away': 3.4}}}
+
+
+def run_once(tmp_path, *args):
+    request_file = tmp_path / 'request.json'
+    request_file.write_text(json.dumps(REQUEST))
+    return subprocess.run([sys.executable, 'simulation_runner.py', str(request_file),
+                           '--db-path', str(tmp_path / 'exodia.db'), *args],
+                          capture_output=True, text=True, cwd=BACKEND_DIR, timeout=120)
+
+
+def test_debug_logging_stays_off_stdout(tmp_path):
+    result = run_once(tmp_path, '--log-level', 'DEBUG')
+
+    assert result.returncode == 0, result.stderr
+    assert json.loads(result.stdout)['success']
+    assert 'DEBUG' in result.stderr and 'INFO exodia.runner' in result.stderr
+
+
+def test_default_log_level_keeps_stderr_quiet(tmp_path):
+    result = run_once(tmp_path)
+
+    assert result.returncode == 0
+    assert json.loads(result.stdout)['success']
+    assert result.stderr == ''
+
+
+def test_calibrated_path_does_not_import_the_legacy_or_pool_stack(tmp_path):
+    probe = (
+        "import json, sys; sys.argv = ['simulation_runner.py', sys.argv[1], '--db-path', sys.argv[2]]; "
+        "import simulation_runner; simulation_runner.main(); "
+        "lazy = ('scipy', 'multiprocessing', 'concurrent.futures', 'monte_carlo.simulation_engine', 'db.sqlite_pool'); "
+        "print(json.dumps([name for name in lazy if name in sys.modules]), file=sys.stderr)"
+    )
+    request_file = tmp_path / 'request.json'
+    request_file.write_text(json.dumps(REQUEST))
+    result = subprocess.run([sys.executable, '-c', probe, str(request_file), str(tmp_path / 'exodia.db')],
+                            capture_output=True, text=True, cwd=BACKEND_DIR, timeout=120)
+
+    assert result.returncode == 0, result.stderr
+    assert json.loads(result.stdout)['success']
+    assert json.loads(result.stderr.splitlines()[-1]) == []
+
+
+def test_import_profile_reports_on_stderr(tmp_path):
+    result = run_once(tmp_path, '--import-profile')
+
+    assert json.loads(result.stdout)['success']
+    assert 'monte_carlo.calibrated_simulation_engine' in result.stderr
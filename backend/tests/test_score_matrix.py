@@ -0,0 +1,130 @@
+import numpy as np
+import pytest
+
+from monte_carlo.calibrated_simulation_engine import create_calibrated_engine
+from monte_carlo.random_streams import make_generator
+from monte_carlo.score_matrix import (
+    HALF_MAX_GOALS, ScoreMatrixCache, half_joint, outcome_probabilities, score_histogram, score_matrix,
+    split_half_joint
+)
+
+
+def test_lambdas_in_one_grid_cell_share_an_entry():
+    cache = ScoreMatrixCache(grid=0.01)
+    full_time, first_half = cache.get(1.501, 0.999)
+    again, _ = cache.get(1.499, 1.002)
+
+    assert again is full_time
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+    # Entries are built at the rounded lambdas, whichever request filled them
+    assert np.allclose(full_time, score_matrix(1.5, 1.0, cache.max_goals))
+    assert np.allclose(first_half, score_matrix(1.5 * 0.45, 1.0 * 0.45, cache.max_goals))
+
+
+def test_cached_matrices_are_read_only():
+    full_time, _ = ScoreMatrixCache().get(1.2, 1.1)
+    with pytest.raises(ValueError):
+        full_time[0, 0] = 1.0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ScoreMatrixCache(max_entries=2)
+    cache.get(1.0, 1.0)
+    cache.get(2.0, 1.0)
+    cache.get(1.0, 1.0)  # Refresh, so (2.0, 1.0) is now the oldest
+    cache.get(3.0, 1.0)
+
+    assert cache.stats()['size'] == 2
+    cache.get(1.0, 1.0)
+    assert cache.stats()['hits'] == 2
+    cache.get(2.0, 1.0)
+    assert cache.stats()['misses'] == 4
+
+
+def test_halves_and_scores_are_separate_entries():
+    cache = ScoreMatrixCache()
+    halves = cache.get_halves(1.4, 1.2)
+    full_time, _ = cache.get(1.4, 1.2)
+
+    assert set(halves) == {'second_half', 'ht_ft', 'half_most_goals'}
+    assert cache.stats()['misses'] == 2
+    assert halves['ht_ft'].sum() == pytest.approx(full_time.sum(), abs=1e-6)
+
+
+def test_disk_entries_survive_a_new_cache(tmp_path):
+    first = ScoreMatrixCache(disk_dir=str(tmp_path))
+    full_time, _ = first.get(1.35, 0.85)
+
+    second = ScoreMatrixCache(disk_dir=str(tmp_path))
+    loaded, _ = second.get(1.35, 0.85)
+    assert second.stats()['disk_hits'] == 1
+    assert np.array_equal(loaded, full_time)
+
+
+def test_histogram_counts_every_cell_and_folds_the_tail():
+    rng = np.random.default_rng(21)
+    home, away = rng.poisson(1.6, 5000), rng.poisson(1.2, 5000)
+    home[:3] = [16, 25, 40]  # Beyond MAX_GOALS: counted in the last bin
+
+    expected = np.zeros((16, 16), dtype=np.int64)
+    np.add.at(expected, (np.minimum(home, 15), np.minimum(away, 15)), 1)
+    assert np.array_equal(score_histogram(home.copy(), away.copy()), expected)
+
+
+def test_batch_histogram_is_one_histogram_per_fixture():
+    rng = np.random.default_rng(22)
+    goals = [rng.poisson(lam, (3, 2000)) for lam in (0.7, 0.5, 0.9, 0.6)]
+    batch = score_histogram(*[g.copy() for g in goals], size=10)
+
+    assert batch.shape == (3, 10, 10, 10, 10)
+    for fixture in range(3):
+        single = score_histogram(*[g[fixture].copy() for g in goals], size=10)
+        assert np.array_equal(batch[fixture], single)
+
+
+def test_histogram_prices_equal_per_draw_indicator_means():
+    engine = create_calibrated_engine()
+    rng = make_generator(23)
+    iterations = 20000
+    halves = [rng.poisson(lam, iterations) for lam in (0.72, 0.54, 0.88, 0.66)]
+    home, away = halves[0] + halves[2], halves[1] + halves[3]
+
+    counts = score_histogram(*[h.copy() for h in halves], size=HALF_MAX_GOALS + 1)
+    probabilities, avg_home, _ = engine.probabilities_from_histograms({'halves': counts}, iterations)
+    indicators = engine.market_indicators(home, away, halves[0], halves[1])
+
+    assert probabilities['match_outcomes']['home_win'] == pytest.approx(indicators['home_wins'].mean())
+    assert probabilities['goal_markets']['over_2_5'] == pytest.approx(indicators['over_25'].mean())
+    assert probabilities['btts']['yes'] == pytest.approx(indicators['both_score'].mean())
+    assert probabilities['first_half']['over_1_5'] == pytest.approx(indicators['first_half_over_15'].mean())
+    assert avg_home == pytest.approx(home.mean())
+
+
+def test_half_split_is_consistent_with_the_full_time_matrix():
+    parts = split_half_joint(half_joint(1.7, 1.1))
+
+    # Sums of independent Poisson halves are the full-time Poisson scores
+    np.testing.assert_allclose(parts['full_time'][:8, :8], score_matrix(1.7, 1.1)[:8, :8], atol=1e-9)
+    np.testing.assert_allclose(parts['first_half'][:6, :6], score_matrix(1.7 * 0.45, 1.1 * 0.45)[:6, :6],
+                               atol=1e-9)
+    # HT/FT rows are the half-time outcomes, columns the full-time outcomes
+    ht_ft = parts['ht_ft']
+    np.testing.assert_allclose(ht_ft.sum(axis=1), outcome_probabilities(parts['first_half']), atol=1e-9)
+    np.testing.assert_allclose(ht_ft.sum(axis=0), outcome_probabilities(parts['full_time']), atol=1e-9)
+    assert parts['half_most_goals'].sum() == pytest.approx(1.0)
+    assert parts['half_most_goals'][2] > parts['half_most_goals'][0]  # 55% of the goals come after the break
+
+
+def test_sampled_ht_ft_grid_counts_the_same_matches():
+    rng = make_generator(22)
+    halves = [rng.poisson(lam, 50000) for lam in (0.77, 0.5, 0.94, 0.6)]
+    half_time = np.sign(halves[0] - halves[1])
+    full_time = np.sign(halves[0] + halves[2] - halves[1] - halves[3])
+
+    parts = split_half_joint(score_histogram(*[h.copy() for h in halves], size=HALF_MAX_GOALS + 1))
+
+    # Rows and columns are home, draw, away: index 1 - sign(goal difference)
+    expected = np.zeros((3, 3), dtype=np.int64)
+    np.add.at(expected, (1 - half_time, 1 - full_time), 1)
+    assert np.array_equal(parts['ht_ft'], expected)
+    assert parts['full_time'].sum() == 50000
@@ -0,0 +1,43 @@
+import datetime
+
+import pytest
+
+from conftest import insert_match
+from db.sqlite_pool import connect
+from monte_carlo.simulation_engine import SimulationEngine
+
+
+@pytest.fixture
+def engine(league_db):
+    """League 1 plus ten home_home results of team 1 and eight away_away results of team 2"""
+    conn = connect(league_db)
+    day = datetime.date(2021, 1, 1)
+    for i in range(10):
+        insert_match(conn, 1, 3 + i % 4, 2, i % 3, (day + datetime.timedelta(days=i)).isoformat(), 'home_home')
+    for i in range(8):
+        insert_match(conn, 3 + i % 4, 2, 1, 1, (day + datetime.timedelta(days=i)).isoformat(), 'away_away')
+    conn.commit()
+    conn.close()
+    engine = SimulationEngine(league_db)
+    yield engine
+    engine.close()
+
+
+def test_form_lists_are_capped_newest_first_and_the_available_rows_reported(engine):
+    history = engine.prepare_historical_data(1, 2)
+
+    assert len(history['home_home']) == len(history['away_away']) == 6
+    dates = [match['match_date'] for match in history['home_home']]
+    assert dates == sorted(dates, reverse=True) and dates[0] == '2021-01-10'
+    # The league's results are all typed 'h2h': team 1's 60 at home, team 2's 48 away
+    # to other teams and the 12 reverse fixtures, uncapped
+    assert len(history['h2h']) == 120
+    assert history['available_counts'] == {'h2h': 120, 'home_home': 10, 'away_away': 8}
+    assert all('type_total' not in match for match in history['home_home'])
+
+
+def test_metadata_reports_used_and_available_history(engine):
+    metadata = engine.run_simulation(1, 2, iterations=2000, seed=5)['metadata']
+
+    assert metadata['historical_data_counts'] == {'h2h': 120, 'home_home': 6, 'away_away': 6}
+    assert metadata['historical_data_available'] == {'h2h': 120, 'home_home': 10, 'away_away': 8}
@@ -0,0 +1,89 @@
+import sqlite3
+import threading
+
+import pytest
+
+from db.sqlite_pool import ConnectionPool, connect, get_pool
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / 'pool.db')
+    conn = connect(path)
+    conn.execute("CREATE TABLE hits (worker INTEGER, n INTEGER)")
+    conn.commit()
+    conn.close()
+    return path
+
+
+def test_connections_get_the_tuned_pragmas(db_path):
+    conn = connect(db_path)
+    pragmas = {name: conn.execute(f"PRAGMA {name}").fetchone()[0]
+               for name in ('journal_mode', 'synchronous', 'busy_timeout', 'temp_store', 'cache_size')}
+    conn.close()
+
+    assert pragmas == {'journal_mode': 'wal', 'synchronous': 1, 'busy_timeout': 5000, 'temp_store': 2,
+                       'cache_size': -65536}
+
+
+def test_pool_reuses_the_last_returned_connection(db_path):
+    pool = ConnectionPool(db_path, max_size=2)
+    with pool.connection() as first:
+        with pool.connection() as second:
+            assert second is not first  # Borrowing never blocks: a busy pool opens another
+    with pool.connection() as again:
+        assert again is first
+    pool.close()
+
+
+def test_connections_beyond_max_size_are_closed_on_return(db_path):
+    pool = ConnectionPool(db_path, max_size=1)
+    with pool.connection() as outer:
+        with pool.connection() as inner:
+            pass  # inner fills the one idle slot
+    with pytest.raises(sqlite3.ProgrammingError):
+        outer.execute("SELECT 1")
+    with pool.connection() as conn:
+        assert conn is inner
+    pool.close()
+
+
+def test_open_transactions_are_rolled_back_on_return(db_path):
+    pool = ConnectionPool(db_path)
+    with pool.connection() as conn:
+        conn.execute("INSERT INTO hits VALUES (0, 0)")
+        assert conn.in_transaction
+    with pool.connection() as conn:
+        assert not conn.in_transaction
+        assert conn.execute("SELECT count(*) FROM hits").fetchone()[0] == 0
+    pool.close()
+
+
+def test_one_pool_per_database_file(db_path, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert get_pool(db_path) is get_pool('pool.db')
+    assert get_pool(db_path) is not get_pool(str(tmp_path / 'other.db'))
+
+
+def test_concurrent_writers_wait_for_the_lock_instead_of_failing(db_path):
+    pool = ConnectionPool(db_path)
+    errors = []
+
+    def write(worker):
+        try:
+            for n in range(50):
+                with pool.connection() as conn, conn:
+                    conn.execute("INSERT INTO hits VALUES (?, ?)", (worker, n))
+        except Exception as e:  # Surfaced below; a thread's exception would otherwise be lost
+            errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(worker,)) for worker in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    with pool.connection() as conn:
+        assert conn.execute("SELECT count(*) FROM hits").fetchone()[0] == 300
+    pool.close()
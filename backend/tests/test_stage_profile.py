@@ -0,0 +1,67 @@
+import json
+import tracemalloc
+
+import pytest
+
+from monte_carlo import stage_profile
+from monte_carlo.stage_profile import profile_mode, profiling, stage, staged
+from simulation_runner import SimulationWorker
+
+PRICE = {'home_team_id': 1, 'away_team_id': 2, 'league_id': 1, 'iterations': 20000, 'seed': 3,
+         'bookmaker_odds': {'1x2': {'home': 2.2, 'draw': 3.3, 'away': 3.4}}}
+
+
+@pytest.fixture
+def worker(tmp_path):
+    worker = SimulationWorker(db_path=str(tmp_path / 'exodia.db'))
+    yield worker
+    worker.close()
+
+
+def respond(worker, request):
+    frame, _ = worker.handle_line(json.dumps(request))
+    return json.loads(frame)
+
+
+def test_profiled_request_reports_its_stages_last_in_metadata(worker):
+    response = respond(worker, {**PRICE, 'profile': True, 'request_id': 1})
+    profile = response['metadata']['profile']
+
+    assert list(response['metadata'])[-1] == 'profile'
+    assert {'parse', 'rng_draw', 'reduction', 'value_detection', 'serialization'} <= set(profile['stages'])
+    staged_wall = sum(entry['wall_ms'] for entry in profile['stages'].values())
+    assert 0 < staged_wall <= profile['wall_ms'] * 1.01
+    assert 'tracemalloc_peak_mb' not in profile
+
+
+def test_unprofiled_requests_carry_no_report(worker):
+    assert 'profile' not in respond(worker, {**PRICE, 'request_id': 2})['metadata']
+    with pytest.raises(ValueError):
+        profile_mode('verbose')
+
+
+def test_memory_profiles_share_tracemalloc_until_the_last_one_closes():
+    assert not tracemalloc.is_tracing()
+    with profiling('memory') as outer:
+        with profiling('memory') as inner:
+            assert stage_profile.current() is inner
+        assert tracemalloc.is_tracing()  # Still needed by the outer request
+        assert 'tracemalloc_peak_mb' in outer.report()
+    assert not tracemalloc.is_tracing()
+
+
+def test_a_reentered_stage_is_counted_once():
+    @staged('value_detection')
+    def inner():
+        pass
+
+    @staged('value_detection')
+    def outer():
+        inner()
+
+    with profiling('stages') as profile:
+        outer()
+        with stage('db_io'):
+            pass
+    assert profile.calls == {'value_detection': 1, 'db_io': 1}
+    assert stage_profile.current() is None
@@ -0,0 +1,51 @@
+import sqlite3
+
+from conftest import insert_match
+from monte_carlo.strength_updater import StrengthUpdater
+from monte_carlo.team_strength import TeamStrengthStore
+
+
+def stored_state(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        model = conn.execute(
+            "SELECT matches, home_advantage, fitted_through_id FROM team_strength_models WHERE league_id = 1"
+        ).fetchone()
+        ratings = conn.execute(
+            "SELECT team_id, attack, defence FROM team_strength_ratings WHERE league_id = 1 ORDER BY team_id"
+        ).fetchall()
+        home_form = conn.execute("SELECT SUM(matches_played) FROM team_home_performance").fetchone()[0]
+    finally:
+        conn.close()
+    return model, ratings, home_form
+
+
+def test_fit_then_sync_applies_no_result_twice(league_db):
+    store = TeamStrengthStore(league_db)
+    fit = store.fit_league(1)
+    (matches, home_advantage, fitted_through), ratings, _ = stored_state(league_db)
+    assert matches == fit['matches'] == 360
+    assert fitted_through == 360
+
+    result = StrengthUpdater(store).sync()
+
+    # Every result still reaches the form tables, none is stepped into the fitted ratings again
+    assert result['applied'] == 360
+    assert result['already_fitted'] == 360
+    assert result['leagues'] == []
+    (matches_after, home_advantage_after, _), ratings_after, home_form = stored_state(league_db)
+    assert matches_after == 360
+    assert home_advantage_after == home_advantage
+    assert ratings_after == ratings
+    assert home_form == 360
+
+    # A result entered after the fit is applied exactly once
+    conn = sqlite3.connect(league_db)
+    insert_match(conn, 1, 6, 3, 0, '2021-06-01')
+    conn.commit()
+    conn.close()
+    result = StrengthUpdater(store).sync()
+    assert (result['applied'], result['already_fitted'], result['leagues']) == (1, 0, [1])
+    assert stored_state(league_db)[0][0] == 361
+    assert StrengthUpdater(store).sync()['applied'] == 0
+
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from monte_carlo.calibrated_simulation_engine import create_calibrated_engine, create_value_detector
+from monte_carlo.market_ids import market_ids
+
+
+@pytest.fixture(scope='module')
+def detector():
+    return create_value_detector()
+
+
+def scalar_rules(detector, p, odds, calibration, confidence, bankroll=1000):
+    """The per-market value rules written out one market at a time"""
+    calibrated = p * calibration
+    edge = calibrated - 1 / odds
+    kelly = max((odds - 1) * calibrated - (1 - calibrated), 0) / (odds - 1) if 0 < calibrated < 1 else 0.0
+    stake = min(kelly * detector.kelly_multiplier * confidence, detector.max_stake_percentage / 100)
+    return edge, stake * bankroll, edge > detector.minimum_edge_threshold and stake > 0.005
+
+
+def test_matrix_applies_the_scalar_rules_to_every_cell(detector):
+    rng = np.random.default_rng(3)
+    fixtures, markets, bookmakers = 4, 12, 3
+    probabilities = rng.uniform(0.05, 0.9, (fixtures, markets))
+    odds = rng.uniform(1.05, 9.0, (fixtures, markets, bookmakers))
+    odds[rng.random(odds.shape) < 0.2] = np.nan
+    calibration = rng.uniform(0.9, 1.05, fixtures)
+    confidence = rng.uniform(0.5, 0.95, fixtures)
+
+    matrix = detector.detect_value_matrix(probabilities, odds, calibration, confidence)
+
+    for i, j, b in np.ndindex(odds.shape):
+        if np.isnan(odds[i, j, b]):
+            assert not matrix['is_value'][i, j, b]
+            continue
+        edge, stake_amount, is_value = scalar_rules(detector, probabilities[i, j], odds[i, j, b],
+                                                    calibration[i], confidence[i])
+        assert matrix['edge'][i, j, b] == pytest.approx(edge)
+        assert matrix['stake_amount'][i, j, b] == pytest.approx(stake_amount)
+        assert matrix['is_value'][i, j, b] == is_value
+    best = np.nanargmax(matrix['edge'], axis=2)
+    assert np.array_equal(matrix['best_bookmaker'], best)
+    assert np.array_equal(matrix['has_value'], matrix['is_value'].any(axis=2))
+
+
+def test_single_fixture_detection_matches_the_matrix_slice(detector):
+    results = create_calibrated_engine().run_exact_pricing(1.9, 0.9, verbose=False)
+    registry = market_ids()
+    home_win = results['probabilities']['match_outcomes']['home_win']
+    # Twice the fair home price clears the 0.75 calibration factor; the rest are near fair
+    flat_odds = {'1x2_home': 2 / home_win, '1x2_draw': 3.9, '1x2_away': 5.5,
+                 'goals_over_2_5': 1.7, 'btts_yes': 2.4}
+
+    opportunities = detector.detect_value_opportunities(results, flat_odds, verbose=False)
+    assert detector.detect_value_opportunities(results, registry.key_vector(flat_odds), verbose=False) == opportunities
+
+    probabilities, calibration, confidence, keys = detector.probability_matrix([results])
+    odds = detector.odds_tensor([[registry.key_vector(flat_odds)]])
+    matrix = detector.detect_value_matrix(probabilities, odds, calibration, confidence)
+    assert [o['market'] for o in opportunities] == sorted(
+        (keys[j] for j in np.flatnonzero(matrix['is_value'][0, :, 0])),
+        key=lambda key: -matrix['edge_percentage'][0, registry.ids[key], 0])
+    assert '1x2_home' in [o['market'] for o in opportunities]
+    for opportunity in opportunities:
+        assert opportunity['edge'] > detector.minimum_edge_threshold
+        assert opportunity['kelly_compliant']
+
+
+def test_kelly_fraction_is_zero_for_invalid_or_losing_bets(detector):
+    kelly = detector.calculate_kelly_fraction(np.array([2.0, 2.0, 1.0, np.nan, 3.0]),
+                                              np.array([0.6, 0.4, 0.9, 0.5, 1.0]))
+    assert kelly == pytest.approx([0.2, 0.0, 0.0, 0.0, 0.0])
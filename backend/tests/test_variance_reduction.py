@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from monte_carlo.calibrated_simulation_engine import VARIANCE_REDUCTION_METHODS, create_calibrated_engine
+from monte_carlo.market_ids import market_ids
+
+ITERATIONS = 100000
+
+
+@pytest.fixture(scope='module')
+def engine():
+    return create_calibrated_engine()
+
+
+@pytest.fixture(scope='module')
+def exact(engine):
+    return engine.run_exact_pricing(1.6, 1.1, verbose=False)['probabilities']
+
+
+@pytest.mark.parametrize('method', VARIANCE_REDUCTION_METHODS)
+def test_every_market_agrees_with_exact_pricing(engine, exact, method):
+    results = engine.run_variance_reduced_simulation(1.6, 1.1, ITERATIONS, method=method, seed=31)
+
+    for group, markets in exact.items():
+        for market, p in markets.items():
+            tolerance = 5 * np.sqrt(p * (1 - p) / ITERATIONS) + 1e-4
+            assert abs(results['probabilities'][group][market] - p) <= tolerance, f"{group}.{market}"
+    # Every registry market is priced (the estimators cover the whole catalogue)
+    assert not np.isnan(market_ids().probability_vector(results['probabilities'])).any()
+
+
+def test_metadata_describes_the_estimator(engine):
+    antithetic = engine.run_variance_reduced_simulation(1.6, 1.1, 20000, method='antithetic', seed=32)
+    conditional = engine.run_variance_reduced_simulation(1.6, 1.1, 20000, method='conditional', seed=32)
+
+    assert antithetic['metadata']['variance_reduction'] == 'antithetic'
+    assert antithetic['metadata']['draws_per_unit'] == 2
+    assert conditional['metadata']['draws_per_unit'] == 1
+    ess = conditional['metadata']['effective_sample_size']
+    assert conditional['metadata']['min_effective_sample_size'] == min(ess.values())
+    assert conditional['metadata']['variance_reduction_factor'] > 1.5
+
+
+def test_effective_sample_size_matches_the_spread_across_seeds(engine, exact):
+    iterations = 5000
+    runs = [engine.run_variance_reduced_simulation(1.6, 1.1, iterations, method='conditional', seed=seed)
+            for seed in range(100)]
+    home_wins = np.array([run['probabilities']['match_outcomes']['home_win'] for run in runs])
+    ess = np.mean([run['metadata']['effective_sample_size']['home_wins'] for run in runs])
+
+    p = exact['match_outcomes']['home_win']
+    assert ess > 1.5 * iterations
+    assert np.var(home_wins, ddof=1) == pytest.approx(p * (1 - p) / ess, rel=0.4)
+
+
+def test_unknown_method_is_rejected(engine):
+    with pytest.raises(ValueError):
+        engine.run_variance_reduced_simulation(1.6, 1.1, 1000, method='stratified')
@@ -0,0 +1,96 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from conftest import BACKEND_DIR
+
+RUNNER = os.path.join(BACKEND_DIR, 'simulation_runner.py')
+PRICE = {'home_team_id': 1, 'away_team_id': 2, 'league_id': 1, 'iterations': 5000, 'seed': 7}
+
+
+def serve(lines, db_path, *args):
+    """Feed NDJSON lines to a --serve worker; returns its parsed stdout lines and stderr"""
+    result = subprocess.run([sys.executable, RUNNER, '--serve', '--db-path', db_path, *args],
+                            input=''.join(line + '\n' for line in lines), capture_output=True,
+                            text=True, cwd=BACKEND_DIR, timeout=120)
+    assert result.returncode == 0, result.stderr
+    return [json.loads(line) for line in result.stdout.splitlines()], result.stderr
+
+
+def test_every_request_line_gets_one_response_with_its_request_id(tmp_path):
+    responses, _ = serve([
+        json.dumps({'command': 'ping', 'request_id': 'p'}),
+        '',
+        json.dumps({**PRICE, 'request_id': 41}),
+        json.dumps({**PRICE, 'pricing_mode': 'exact', 'request_id': 42}),
+        json.dumps({'command': 'shutdown', 'request_id': 'bye'}),
+        json.dumps({'command': 'ping', 'request_id': 'after shutdown'})
+    ], str(tmp_path / 'exodia.db'))
+
+    assert [response['request_id'] for response in responses] == ['p', 41, 42, 'bye']
+    assert responses[0]['pong'] and responses[3]['shutdown']
+    assert responses[1]['success'] and responses[2]['success']
+    assert responses[1]['metadata']['seed'] == 7
+
+
+def test_failures_are_framed_as_one_error_line(tmp_path):
+    responses, _ = serve([
+        '{not json',
+        json.dumps([1, 2]),
+        json.dumps({'home_team_id': 1, 'away_team_id': 2, 'league_id': 1, 'request_id': 'no iterations'}),
+        json.dumps({**PRICE, 'variance_reduction': 'bogus', 'request_id': 'bad method'}),
+        json.dumps({'command': 'ping', 'request_id': 'still alive'})
+    ], str(tmp_path / 'exodia.db'))
+
+    assert [response['request_id'] for response in responses] == [None, None, 'no iterations', 'bad method',
+                                                                  'still alive']
+    assert responses[0] == {'success': False, 'error': responses[0]['error'], 'request_id': None}
+    assert responses[0]['error'].startswith('Invalid JSON input')
+    assert 'JSON object' in responses[1]['error']
+    assert not any(response['success'] for response in responses[:4])
+    assert responses[4]['success']
+
+
+def test_columnar_frame_is_a_header_line_and_exact_payload(tmp_path):
+    request = json.dumps({**PRICE, 'output_format': 'npy', 'request_id': 'cols'}) + '\n'
+    ping = json.dumps({'command': 'ping', 'request_id': 'next'}) + '\n'
+    result = subprocess.run([sys.executable, RUNNER, '--serve', '--db-path', str(tmp_path / 'exodia.db')],
+                            input=(request + ping).encode(), capture_output=True, cwd=BACKEND_DIR, timeout=120)
+
+    header_line, rest = result.stdout.split(b'\n', 1)
+    header = json.loads(header_line)
+    assert header['request_id'] == 'cols' and header['output_format'] == 'npy'
+    payload, trailer = rest[:header['content_length']], rest[header['content_length']:]
+    assert payload.startswith(b'\x93NUMPY')
+    assert json.loads(trailer) == {'success': True, 'pong': True, 'request_id': 'next'}
+
+
+def test_socket_server_answers_pipelined_requests_in_order(tmp_path):
+    socket_path = str(tmp_path / 'runner.sock')
+    server = subprocess.Popen([sys.executable, RUNNER, '--socket', socket_path,
+                               '--db-path', str(tmp_path / 'exodia.db')],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, cwd=BACKEND_DIR)
+    try:
+        deadline = time.monotonic() + 60
+        while not os.path.exists(socket_path):
+            assert server.poll() is None and time.monotonic() < deadline, 'socket server did not start'
+            time.sleep(0.05)
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.connect(socket_path)
+            requests = [{**PRICE, 'request_id': i} for i in range(3)] + [{'command': 'shutdown', 'request_id': 3}]
+            client.sendall(''.join(json.dumps(request) + '\n' for request in requests).encode())
+            with client.makefile('r') as stream:
+                responses = [json.loads(stream.readline()) for _ in requests]
+        assert [response['request_id'] for response in responses] == [0, 1, 2, 3]
+        assert all(response['success'] for response in responses)
+        # Same request, same seed: identical prices
+        assert responses[0]['results']['probabilities'] == responses[1]['results']['probabilities']
+        server.wait(timeout=30)
+        assert not os.path.exists(socket_path)
+    finally:
+        if server.poll() is None:
+            server.kill()
+            server.wait()
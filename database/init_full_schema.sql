@@ -65,10 +65,40 @@ CREATE TABLE IF NOT EXISTS match_results (
     FOREIGN KEY (simulation_id) REFERENCES simulations(id) ON DELETE CASCADE
 );
 
+-- Create fitted team strength tables if they don't exist
+CREATE TABLE IF NOT EXISTS team_strength_models (
+    league_id INTEGER PRIMARY KEY,
+    intercept REAL NOT NULL,
+    home_advantage REAL NOT NULL,
+    rho REAL NOT NULL,
+    decay REAL NOT NULL,
+    matches INTEGER NOT NULL,
+    log_likelihood REAL,
+    converged INTEGER,
+    reference_date DATE,
+    fitted_through_id INTEGER,
+    fitted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS team_strength_ratings (
+    league_id INTEGER NOT NULL,
+    team_id INTEGER NOT NULL,
+    attack REAL NOT NULL,
+    defence REAL NOT NULL,
+    PRIMARY KEY (league_id, team_id)
+);
+
+CREATE TABLE IF NOT EXISTS team_strength_sync (
+    source TEXT PRIMARY KEY,
+    last_id INTEGER NOT NULL DEFAULT 0
+);
+
 -- Create indexes if they don't exist
 CREATE INDEX IF NOT EXISTS idx_bookmaker_odds_simulation ON bookmaker_odds(simulation_id);
 CREATE INDEX IF NOT EXISTS idx_simulations_teams ON simulations(home_team_id, away_team_id);
 CREATE INDEX IF NOT EXISTS idx_simulations_league ON simulations(league_id);
 CREATE INDEX IF NOT EXISTS idx_simulations_date ON simulations(match_date);
 CREATE INDEX IF NOT EXISTS idx_historical_matches_teams ON historical_matches(home_team_id, away_team_id);
+CREATE INDEX IF NOT EXISTS idx_historical_matches_home_history ON historical_matches(home_team_id, match_type, match_date, away_team_id, home_score_ft, away_score_ft);
+CREATE INDEX IF NOT EXISTS idx_historical_matches_away_history ON historical_matches(away_team_id, match_type, match_date, home_team_id, home_score_ft, away_score_ft);
 CREATE INDEX IF NOT EXISTS idx_match_results_simulation ON match_results(simulation_id);
\ No newline at end of file
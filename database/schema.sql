@@ -238,6 +238,38 @@ CREATE TABLE match_odds_analysis (
     FOREIGN KEY (league_id) REFERENCES leagues(id) ON DELETE CASCADE
 );
 
+-- ========================================
+-- TEAM STRENGTHS (Fitted Dixon-Coles parameters)
+-- ========================================
+
+CREATE TABLE team_strength_models (
+    league_id INTEGER PRIMARY KEY,
+    intercept REAL NOT NULL,               -- log goal rate of an average away team
+    home_advantage REAL NOT NULL,          -- log home-rate multiplier
+    rho REAL NOT NULL,                     -- Dixon-Coles low-score correction
+    decay REAL NOT NULL,                   -- Time-decay rate per day used for the fit
+    matches INTEGER NOT NULL,
+    log_likelihood REAL,
+    converged INTEGER,
+    reference_date DATE,                   -- Date the decay weights are measured from
+    fitted_through_id INTEGER,             -- Last historical_matches id the fit read (sync skips up to it)
+    fitted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE team_strength_ratings (
+    league_id INTEGER NOT NULL,
+    team_id INTEGER NOT NULL,
+    attack REAL NOT NULL,                  -- log scale, centred on 0 within the league
+    defence REAL NOT NULL,                 -- log scale, higher = concedes more
+    PRIMARY KEY (league_id, team_id)
+);
+
+-- Last result id applied by the incremental strength updater, per source table
+CREATE TABLE team_strength_sync (
+    source TEXT PRIMARY KEY,               -- 'historical_matches' or 'match_results'
+    last_id INTEGER NOT NULL DEFAULT 0
+);
+
 -- ========================================
 -- PERFORMANCE INDEXES
 -- ========================================
@@ -257,6 +289,10 @@ CREATE INDEX idx_team_away_performance_team ON team_away_performance(team_id);
 CREATE INDEX idx_historical_matches_teams ON historical_matches(home_team_id, away_team_id);
 CREATE INDEX idx_historical_matches_type ON historical_matches(match_type);
 CREATE INDEX idx_historical_matches_date ON historical_matches(match_date);
+-- Covering indexes for the simulation engine's history query: each UNION ALL branch is a range
+-- scan on one team id, already grouped by match_type and in match_date order (no table lookups)
+CREATE INDEX idx_historical_matches_home_history ON historical_matches(home_team_id, match_type, match_date, away_team_id, home_score_ft, away_score_ft);
+CREATE INDEX idx_historical_matches_away_history ON historical_matches(away_team_id, match_type, match_date, home_team_id, home_score_ft, away_score_ft);
 
 -- Simulation indexes
 CREATE INDEX idx_simulations_teams ON simulations(home_team_id, away_team_id);